@@ -1,10 +1,15 @@
 from fastapi import APIRouter
+from .board import router as board_router
 from .bot import router as bot_router
-from .cat import router as cat_router
+from .cat import router as cat_router, stats_router as cat_stats_router
 from .cat_image import router as cat_image_router
+from .events import router as events_router
 
 v1_router = APIRouter()
 
+v1_router.include_router(board_router)
 v1_router.include_router(bot_router)
+v1_router.include_router(cat_stats_router)
 v1_router.include_router(cat_router)
 v1_router.include_router(cat_image_router)
+v1_router.include_router(events_router)
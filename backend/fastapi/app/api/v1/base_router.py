@@ -1,10 +1,31 @@
-from typing import Any, Callable, List, Type, TypeVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Sequence, Type, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, create_model
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.utils.logger import logger
+from app.db.database import get_db, get_read_db, get_read_session_factory
+from app.db.instrumentation import query_budget
+from app.db.replica import reads_from_primary
+from app.schemas.bulk import (
+    MAX_BULK_SIZE,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    BulkDeleteResult,
+    BulkItemResult,
+    BulkResponse,
+)
+from app.settings import settings
+from app.utils.broadcast import Broadcaster
+from app.utils.cache import TTLCache
+from app.utils.filtering import sort_options
+from app.utils.http_cache import is_not_modified, make_etag, not_modified_response, validator_headers
+from app.utils.id_generator import canonical_ulid
+from app.utils.logging import logger
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.serialization import JSON_MEDIA_TYPE, fast_json_response, json_bytes
+from app.utils.single_flight import make_single_flight
 
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType")
@@ -12,6 +33,34 @@ UpdateSchemaType = TypeVar("UpdateSchemaType")
 GetAllModelT = TypeVar("GetAllModelT") # New TypeVar for get_all_response_model
 ServiceType = TypeVar("ServiceType")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows are coalesced into chunks of about this size before being sent
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+
+async def _ndjson_stream(service: Any, session_factory: Any, **kwargs: Any) -> AsyncIterator[bytes]:
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the export opens (and owns) its own session.
+    async with session_factory() as session:
+        buffer = bytearray()
+        sent_first = False
+        try:
+            async for item in service.stream(session, **kwargs):
+                buffer += json_bytes(item)
+                buffer += b"\n"
+                # Flush the first row immediately so the client sees the first byte early
+                if not sent_first or len(buffer) >= NDJSON_CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+                    sent_first = True
+        except Exception as e:
+            # Headers are already sent; all we can do is log and end the stream.
+            # Errors pass values as arguments so the dedup filter groups them by template.
+            logger.error("Error streaming items: %s", e)
+            return
+        if buffer:
+            yield bytes(buffer)
+
 
 def generic_router_factory(
     service: ServiceType,
@@ -23,90 +72,443 @@ def generic_router_factory(
     get_all_response_model: Type[GetAllModelT], # Changed type hint
     update_response_model: Type[ModelType] = None,
     delete_response_model: Type[ModelType] = None,
+    cache: Optional[TTLCache] = None,
+    fast_response: bool = True,
+    query_budgets: Optional[Dict[str, int]] = None,
+    filter_schema: Optional[Type[BaseModel]] = None,
+    sort_fields: Optional[Sequence[str]] = None,
+    broadcaster: Optional[Broadcaster] = None,
+    coalesce_reads: bool = True,
 ) -> APIRouter:
     router = APIRouter(prefix=prefix, tags=tags)
 
+    # Maximum number of SQL statements per route, keyed by operation name
+    # (create, bulk_create, bulk_update, bulk_delete, list, get, update, delete).
+    # Enforced by QueryTimingMiddleware: a warning, or a 500 in strict mode.
+    def _budget(operation: str) -> List[Any]:
+        if query_budgets is None or operation not in query_budgets:
+            return []
+        return [Depends(query_budget(query_budgets[operation]))]
+
+    # When the service already returns an instance of the declared response
+    # model, serialize it straight to bytes instead of letting FastAPI dump,
+    # re-validate and encode it again. Anything else takes the normal path.
+    def _respond(
+        item: Any,
+        model: Any,
+        response: Optional[Response] = None,
+        headers: Optional[dict] = None,
+        status_code: int = 200,
+    ) -> Any:
+        if fast_response:
+            fast = fast_json_response(item, model, status_code=status_code, headers=headers)
+            if fast is not None:
+                return fast
+        if headers and response is not None:
+            response.headers.update(headers)
+        return item
+
+    # Single-flight reads: identical concurrent GETs (same route, query string
+    # and conditional headers) share one service call and its serialized
+    # response. Only the first request's session touches the database; the
+    # others never check out a connection. Nothing is kept after the call
+    # finishes, so this never serves stale data the way a cache can.
+    coalesce = coalesce_reads and settings.single_flight_enabled
+    list_flight = make_single_flight(f"{prefix}/") if coalesce else None
+    item_flight = make_single_flight(f"{prefix}/{{item_id}}") if coalesce else None
+
+    # A write drops the in-flight reads it may affect (every list read, and the
+    # item reads for the written ids), so a GET that arrives after the write
+    # starts a new read instead of joining one that began before it.
+    def _forget_reads(item_ids: Sequence[Any]) -> None:
+        if list_flight is not None:
+            list_flight.forget(lambda key: True)
+        if item_flight is not None:
+            written = {str(item_id) for item_id in item_ids}
+            item_flight.forget(lambda key: key[0] in written)
+
+    def _render(item: Any, model: Any, headers: Optional[dict] = None) -> Response:
+        # Serialize to bytes up front so that the response can be shared
+        if type(item) is not model:
+            item = model.model_validate(item, from_attributes=True)
+        return Response(json_bytes(item), headers=headers, media_type=JSON_MEDIA_TYPE)
+
+    async def _shared(flight: Any, key: Any, load: Callable[[], Any]) -> Response:
+        async def snapshot() -> Any:
+            shared = await load()
+            headers = {name: value for name, value in shared.headers.items() if name != "content-length"}
+            return shared.status_code, headers, shared.body
+        # Every waiter gets its own Response: middleware mutates headers in place
+        status_code, headers, body = await flight.do(key, snapshot)
+        return Response(body, status_code=status_code, headers=headers)
+
+    # Row-level change events for the change feed (/api/v1/events): published
+    # after a successful write, never blocking the request on slow subscribers.
+    entity = prefix.strip("/")
+
+    def _publish(op: str, item_id: Any, item: Any = None) -> None:
+        if broadcaster is None:
+            return
+        # The write is already committed: a failed broadcast must not turn it into a 500
+        try:
+            broadcaster.publish({"entity": entity, "op": op, "id": str(item_id), "item": item})
+        except Exception as e:
+            logger.error("Error publishing change event %s %s: %s", op, item_id, e)
+
+    # Declarative filtering: the fields of filter_schema become optional query
+    # parameters (validated by FastAPI) and are passed to get_multi / stream
+    # as filters=. Sorting accepts "field" or "-field" for each of sort_fields
+    # and is passed to get_multi as sort=. Both are pushed down into SQL by the
+    # service, which should back them with indexes.
+    if filter_schema is not None:
+        def _filters(filters: filter_schema = Depends()) -> Any:
+            return filters
+    else:
+        def _filters() -> Any:
+            return None
+
+    if sort_fields:
+        def _sort(sort: Optional[Literal[sort_options(sort_fields)]] = Query(None)) -> Optional[str]:
+            return sort
+    else:
+        def _sort() -> Optional[str]:
+            return None
+
+    # Services that implement get_version(db) -> (version, max(updated_at))
+    # get ETag / Last-Modified validators on the list route. The version is
+    # any value that changes whenever a row is inserted, updated or deleted.
+    versioned = hasattr(service, "get_version")
+    # Services that implement update_by_id / remove_by_id do the existence
+    # check and the write in one statement (UPDATE/DELETE ... RETURNING);
+    # they return None or raise ValueError when the row does not exist.
+    fused_update = hasattr(service, "update_by_id")
+    fused_delete = hasattr(service, "remove_by_id")
+
+    # Read-through lookup by id. Writes below invalidate the entry; a read
+    # that started before the invalidation is not stored (generation check),
+    # so a GET racing a PUT cannot put the old row back. Rows read from a
+    # lagging replica are not cached either (fill=False).
+    async def _get_cached(db: AsyncSession, item_id: Any, fill: bool = True) -> Any:
+        if cache is not None:
+            item = cache.get(item_id)
+            if item is not None:
+                return item
+            generation = cache.generation()
+        item = await service.get(db, id=item_id)
+        if cache is not None and item and fill:
+            cache.set(item_id, item, generation=generation)
+        return item
+
+    # Writes made by other workers arrive through the change feed backend
+    # (EVENTS_BACKEND=unix) and invalidate this worker's copy. A lost event
+    # leaves the entry stale until its TTL expires.
+    if cache is not None and broadcaster is not None:
+        def _invalidate_on_change(event: Dict[str, Any]) -> None:
+            if event.get("entity") == entity and event.get("op") != "created":
+                cache.invalidate(event.get("id"))
+
+        broadcaster.add_listener(_invalidate_on_change)
+
     # Determine the response model for update and delete operations
     actual_update_response_model = update_response_model if update_response_model else response_model
     actual_delete_response_model = delete_response_model if delete_response_model else response_model
 
-    @router.post("/", response_model=response_model, status_code=201)
+    @router.post("/", response_model=response_model, status_code=201, dependencies=_budget("create"))
     async def create_item(
         item_in: create_schema,
         db: AsyncSession = Depends(get_db),
     ) -> ModelType:
         try:
             item = await service.create(db, obj_in=item_in)
-            return item
+            if cache is not None and getattr(item, "id", None) is not None:
+                cache.set(str(item.id), item)
+            _forget_reads([item.id])
+            _publish("created", item.id, item)
+            return _respond(item, response_model, status_code=201)
         except Exception as e:
-            logger.error(f"Error creating item: {e}")
+            logger.error("Error creating item: %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
-    @router.get("/", response_model=get_all_response_model)
+    # Bulk routes are registered only for services implementing the *_multi
+    # methods, and before "/{item_id}" so that DELETE /bulk is not an item id.
+    if hasattr(service, "create_multi"):
+        @router.post("/bulk", response_model=BulkResponse[response_model], dependencies=_budget("bulk_create"))
+        async def create_items_bulk(
+            items_in: List[create_schema] = Body(..., min_length=1, max_length=MAX_BULK_SIZE),
+            db: AsyncSession = Depends(get_db),
+        ) -> Any:
+            try:
+                items = await service.create_multi(db, objs_in=items_in)
+            except Exception as e:
+                logger.error("Error creating items in bulk: %s", e)
+                raise HTTPException(status_code=500, detail="Internal server error")
+            _forget_reads([item.id for item in items])
+            for item in items:
+                if cache is not None:
+                    cache.set(str(item.id), item)
+                _publish("created", item.id, item)
+            return _respond(
+                BulkResponse[response_model](
+                    results=[
+                        BulkItemResult[response_model](index=index, id=str(item.id), status=201, item=item)
+                        for index, item in enumerate(items)
+                    ]
+                ),
+                BulkResponse[response_model],
+            )
+
+    if hasattr(service, "update_multi"):
+        bulk_update_schema = create_model(
+            f"{update_schema.__name__}BulkItem", __base__=update_schema, id=(str, ...)
+        )
+
+        @router.patch(
+            "/bulk",
+            response_model=BulkResponse[actual_update_response_model],
+            dependencies=_budget("bulk_update"),
+        )
+        async def update_items_bulk(
+            items_in: List[bulk_update_schema] = Body(..., min_length=1, max_length=MAX_BULK_SIZE),
+            db: AsyncSession = Depends(get_db),
+        ) -> Any:
+            updates = [
+                (canonical_ulid(item_in.id), update_schema(**item_in.model_dump(exclude={"id"}, exclude_unset=True)))
+                for item_in in items_in
+            ]
+            try:
+                updated = await service.update_multi(db, objs_in=updates)
+            except Exception as e:
+                logger.error("Error updating items in bulk: %s", e)
+                raise HTTPException(status_code=500, detail="Internal server error")
+            finally:
+                if cache is not None:
+                    for item_id, _ in updates:
+                        cache.invalidate(item_id)
+                _forget_reads([item_id for item_id, _ in updates])
+            for item_id, item in updated.items():
+                _publish("updated", item_id, item)
+            results = []
+            for index, (item_id, _) in enumerate(updates):
+                item = updated.get(item_id)
+                if item is None:
+                    results.append(
+                        BulkItemResult[actual_update_response_model](
+                            index=index, id=item_id, status=404, detail="Item not found for update"
+                        )
+                    )
+                else:
+                    results.append(
+                        BulkItemResult[actual_update_response_model](
+                            index=index, id=item_id, status=200, item=item
+                        )
+                    )
+            return _respond(
+                BulkResponse[actual_update_response_model](results=results),
+                BulkResponse[actual_update_response_model],
+            )
+
+    if hasattr(service, "remove_multi"):
+        @router.delete("/bulk", response_model=BulkDeleteResponse, dependencies=_budget("bulk_delete"))
+        async def delete_items_bulk(
+            request_in: BulkDeleteRequest,
+            db: AsyncSession = Depends(get_db),
+        ) -> Any:
+            # Stored ids are upper case; results, cache and events use that form
+            ids = [canonical_ulid(item_id) for item_id in request_in.ids]
+            try:
+                deleted = await service.remove_multi(db, ids=ids)
+            except Exception as e:
+                logger.error("Error deleting items in bulk: %s", e)
+                raise HTTPException(status_code=500, detail="Internal server error")
+            finally:
+                if cache is not None:
+                    for item_id in ids:
+                        cache.invalidate(item_id)
+                _forget_reads(ids)
+            for item_id in deleted:
+                _publish("deleted", item_id)
+            return _respond(
+                BulkDeleteResponse(
+                    results=[
+                        BulkDeleteResult(index=index, id=item_id, status=200)
+                        if item_id in deleted
+                        else BulkDeleteResult(
+                            index=index, id=item_id, status=404, detail="Item not found for deletion"
+                        )
+                        for index, item_id in enumerate(ids)
+                    ]
+                ),
+                BulkDeleteResponse,
+            )
+
+    @router.get("/", response_model=get_all_response_model, dependencies=_budget("list"))
     async def get_all_items(
-        db: AsyncSession = Depends(get_db),
-        skip: int = 0,
-        limit: int = 100,
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_read_db),
+        session_factory: Any = Depends(get_read_session_factory),
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        stream: bool = False,
+        filters: Any = Depends(_filters),
+        sort: Optional[str] = Depends(_sort),
     ) -> GetAllModelT: # Changed return type hint
-        try:
-            items = await service.get_multi(db, skip=skip, limit=limit)
-            return items
-        except Exception as e:
-            logger.error(f"Error retrieving items: {e}")
-            raise HTTPException(status_code=500, detail="Internal server error")
+        # Only forward the options this router was configured with, so services
+        # without filtering/sorting keep their get_multi(db, cursor, limit) signature.
+        options: Dict[str, Any] = {}
+        if filter_schema is not None:
+            options["filters"] = filters
+        # Opt-in full export as NDJSON (?stream=1 or Accept: application/x-ndjson)
+        if hasattr(service, "stream") and (
+            stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+        ):
+            return StreamingResponse(
+                _ndjson_stream(service, session_factory, **options), media_type=NDJSON_MEDIA_TYPE
+            )
+        if sort_fields:
+            options["sort"] = sort
+
+        async def load(render: bool = False) -> Any:
+            # Keyset pagination: cursor is the opaque next_cursor of the previous page
+            try:
+                headers = None
+                if versioned:
+                    # Validator from a cheap aggregate; an unchanged list is answered
+                    # with 304 without loading any rows. If-Modified-Since is not
+                    # honoured here: deletes do not move max(updated_at), and two
+                    # writes in the same second share it.
+                    version, last_modified = await service.get_version(db)
+                    etag = make_etag("list", version, request.url.query)
+                    if request.headers.get("if-none-match") is not None and is_not_modified(request, etag):
+                        return not_modified_response(etag, last_modified)
+                    headers = validator_headers(etag, last_modified)
+                items = await service.get_multi(db, cursor=cursor, limit=limit, **options)
+                if render:
+                    return _render(items, get_all_response_model, headers)
+                return _respond(items, get_all_response_model, response, headers)
+            except ValueError as e:
+                logger.warning(f"Invalid list request: cursor={cursor}, error: {e}")
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                logger.error("Error retrieving items: %s", e)
+                raise HTTPException(status_code=500, detail="Internal server error")
 
-    @router.get("/{item_id}", response_model=response_model)
+        if list_flight is None:
+            return await load()
+        key = (request.url.query, request.headers.get("if-none-match"), reads_from_primary(request))
+        return await _shared(list_flight, key, lambda: load(render=True))
+
+    @router.get("/{item_id}", response_model=response_model, dependencies=_budget("get"))
     async def get_item(
         item_id: Any,
-        db: AsyncSession = Depends(get_db),
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_read_db),
     ) -> ModelType:
-        try:
-            item = await service.get(db, id=item_id)
-            if not item:
-                raise ValueError("Item not found")
-            return item
-        except ValueError as e:
-            logger.warning(f"Item not found: {item_id}, error: {e}")
-            raise HTTPException(status_code=404, detail=str(e))
-        except Exception as e:
-            logger.error(f"Error retrieving item {item_id}: {e}")
-            raise HTTPException(status_code=500, detail="Internal server error")
+        item_id = canonical_ulid(item_id)
+
+        async def load(render: bool = False) -> Any:
+            try:
+                item = await _get_cached(db, item_id, fill=reads_from_primary(request))
+                if not item:
+                    raise ValueError("Item not found")
+                headers = None
+                version = getattr(item, "version", None)
+                last_modified = getattr(item, "updated_at", None)
+                if version is not None:
+                    # The row version changes on every UPDATE; updated_at has one
+                    # second precision on SQLite (and is the transaction start on
+                    # PostgreSQL), so If-Modified-Since is not honoured for it.
+                    etag = make_etag("item", item_id, version)
+                    if request.headers.get("if-none-match") is not None and is_not_modified(request, etag):
+                        return not_modified_response(etag, last_modified)
+                    headers = validator_headers(etag, last_modified)
+                elif last_modified is not None:
+                    etag = make_etag("item", item_id, last_modified.isoformat())
+                    if is_not_modified(request, etag, last_modified):
+                        return not_modified_response(etag, last_modified)
+                    headers = validator_headers(etag, last_modified)
+                if render:
+                    return _render(item, response_model, headers)
+                return _respond(item, response_model, response, headers)
+            except ValueError as e:
+                logger.warning(f"Item not found: {item_id}, error: {e}")
+                raise HTTPException(status_code=404, detail=str(e))
+            except Exception as e:
+                logger.error("Error retrieving item %s: %s", item_id, e)
+                raise HTTPException(status_code=500, detail="Internal server error")
+
+        if item_flight is None:
+            return await load()
+        key = (
+            str(item_id),
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+            reads_from_primary(request),
+        )
+        return await _shared(item_flight, key, lambda: load(render=True))
 
-    @router.put("/{item_id}", response_model=actual_update_response_model)  # Use actual_update_response_model
+    @router.put("/{item_id}", response_model=actual_update_response_model, dependencies=_budget("update"))
     async def update_item(
         item_id: Any,
         item_in: update_schema,
         db: AsyncSession = Depends(get_db),
     ) -> ModelType:  # The return type hint might need adjustment if models differ significantly
+        item_id = canonical_ulid(item_id)
         try:
-            item = await service.get(db, id=item_id)
-            if not item:
-                raise ValueError("Item not found for update")
-            updated_item = await service.update(db, db_obj=item, obj_in=item_in)
-            return updated_item
+            try:
+                if fused_update:
+                    # One UPDATE ... RETURNING detects the missing row and builds the response
+                    updated_item = await service.update_by_id(db, id=item_id, obj_in=item_in)
+                    if not updated_item:
+                        raise ValueError("Item not found for update")
+                else:
+                    item = await _get_cached(db, item_id)
+                    if not item:
+                        raise ValueError("Item not found for update")
+                    updated_item = await service.update(db, db_obj=item, obj_in=item_in)
+            finally:
+                # Also drops a stale copy a concurrent read may have cached meanwhile
+                if cache is not None:
+                    cache.invalidate(item_id)
+                _forget_reads([item_id])
+            _publish("updated", item_id, updated_item)
+            return _respond(updated_item, actual_update_response_model)
         except ValueError as e:
             logger.warning(f"Item not found for update: {item_id}, error: {e}")
             raise HTTPException(status_code=404, detail=str(e))
         except Exception as e:
-            logger.error(f"Error updating item {item_id}: {e}")
+            logger.error("Error updating item %s: %s", item_id, e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
-    @router.delete("/{item_id}", response_model=actual_delete_response_model)  # Use actual_delete_response_model
+    @router.delete("/{item_id}", response_model=actual_delete_response_model, dependencies=_budget("delete"))
     async def delete_item(
         item_id: Any,
         db: AsyncSession = Depends(get_db),
     ) -> ModelType:  # The return type hint might need to be Union[ModelType, DeleteModelType] if they differ
+        item_id = canonical_ulid(item_id)
         try:
-            item = await service.get(db, id=item_id)
-            if not item:
-                raise ValueError("Item not found for deletion")
-            deleted_item = await service.remove(db, id=item_id)
-            return deleted_item
+            try:
+                if fused_delete:
+                    deleted_item = await service.remove_by_id(db, id=item_id)
+                    if not deleted_item:
+                        raise ValueError("Item not found for deletion")
+                else:
+                    item = await _get_cached(db, item_id)
+                    if not item:
+                        raise ValueError("Item not found for deletion")
+                    deleted_item = await service.remove(db, id=item_id)
+            finally:
+                if cache is not None:
+                    cache.invalidate(item_id)
+                _forget_reads([item_id])
+            _publish("deleted", item_id)
+            return _respond(deleted_item, actual_delete_response_model)
         except ValueError as e:
             logger.warning(f"Item not found for deletion: {item_id}, error: {e}")
             raise HTTPException(status_code=404, detail=str(e))
         except Exception as e:
-            logger.error(f"Error deleting item {item_id}: {e}")
+            logger.error("Error deleting item %s: %s", item_id, e)
             raise HTTPException(status_code=500, detail="Internal server error")
 
     return router
@@ -0,0 +1,41 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.db.database import get_read_session_factory
+from app.db.instrumentation import query_budget
+from app.schemas.board import BoardResponse
+from app.services.board import BoardService
+from app.utils.http_cache import is_not_modified, make_etag, not_modified_response, validator_headers
+from app.utils.logging import logger
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.serialization import fast_json_response
+
+router = APIRouter(prefix="/board", tags=["board"])
+
+
+# One version query, then the first page of bots and of cats on two sessions
+# concurrently. Later pages come from the list routes with the next cursors.
+@router.get("", response_model=BoardResponse, dependencies=[Depends(query_budget(3))])
+async def get_board(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session_factory: Any = Depends(get_read_session_factory),
+) -> Any:
+    try:
+        # Validator from the row versions of both tables in a single SELECT;
+        # an unchanged board is answered with 304 without loading rows.
+        # The version session is closed before the two load sessions open, so
+        # a request holds at most two connections. The rows are read after
+        # the version, so they are never older than the ETag they are served with.
+        async with session_factory() as db:
+            version, last_modified = await BoardService.get_board_version(db)
+        etag = make_etag("board", version, limit)
+        if request.headers.get("if-none-match") is not None and is_not_modified(request, etag):
+            return not_modified_response(etag, last_modified)
+
+        board = await BoardService.get_board(session_factory, limit=limit)
+        return fast_json_response(board, BoardResponse, headers=validator_headers(etag, last_modified))
+    except Exception as e:
+        logger.error(f"Error retrieving board: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,10 +1,15 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
 from fastapi import APIRouter, Depends
 from fastapi import HTTPException
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.bot import (
+    BOT_SORT_FIELDS,
     BotCreate,
+    BotFilter,
     BotResponse,
     BotAllResponse,
     UpdateBotResponse,
@@ -12,23 +17,51 @@ from app.schemas.bot import (
     DeleteBotResponse,
 )
 
-from app.db.database import get_db
+from app.db.database import get_db, get_session_factory
 from app.services.chat_bot import ChatBotService
 from app.utils.logging import logger # Ensure logger is imported if not already
+from app.utils.broadcast import broadcaster
+from app.utils.cache import make_entity_cache
+from app.utils.write_batcher import make_write_batcher
 from app.api.v1.base_router import generic_router_factory # Corrected import name
 
+async def _create_bots_batch(bots: List[BotCreate]) -> List[BotResponse]:
+    # A batch outlives any single request, so it opens (and owns) its own session
+    async with get_session_factory()() as session:
+        return await ChatBotService.create_chat_bots(session=session, bots=bots)
+
+
+# Opt-in (WRITE_BATCHING_ENABLED): concurrent single creates share one multi-row INSERT
+create_batcher = make_write_batcher("bot", _create_bots_batch)
+
 # Adapter class to bridge ChatBotService and generic_router_factory
 class ChatBotServiceAdapter:
     async def create(self, db: AsyncSession, obj_in: BotCreate) -> BotResponse:
+        if create_batcher is not None:
+            return await create_batcher.submit(obj_in)
         # Note: ChatBotService.create_chat_bot returns BotResponse which matches
         return await ChatBotService.create_chat_bot(session=db, bot=obj_in)
 
-    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> BotAllResponse: # Changed return type to BotAllResponse
-        # ChatBotService.get_all_bots doesn't support pagination (skip, limit).
-        # It directly returns BotAllResponse.
-        # We call it and ignore skip/limit for now.
-        # If pagination is critical, ChatBotService.get_all_bots would need modification.
-        return await ChatBotService.get_all_bots(session=db) # Return the direct response
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[BotFilter] = None,
+        sort: Optional[str] = None,
+    ) -> BotAllResponse:
+        # Filtering, sorting and keyset pagination are pushed down into SQL;
+        # next_cursor is set on BotAllResponse.
+        return await ChatBotService.get_all_bots(session=db, cursor=cursor, limit=limit, filters=filters, sort=sort)
+
+    async def get_version(self, db: AsyncSession) -> Tuple[Tuple[Any, ...], Optional[datetime]]:
+        # (row count, sum(version), max(id)) + max(updated_at): the list validator
+        # for ETag / 304 handling and the Last-Modified header.
+        return await ChatBotService.get_bots_version(session=db)
+
+    def stream(self, db: AsyncSession, filters: Optional[BotFilter] = None) -> AsyncIterator[BotResponse]:
+        # Used by the factory's NDJSON mode; rows come from a server-side cursor.
+        return ChatBotService.stream_bots(session=db, filters=filters)
 
     async def get(self, db: AsyncSession, id: str) -> BotResponse:
         # ChatBotService.get_bot_by_id returns BotResponse
@@ -47,6 +80,26 @@ class ChatBotServiceAdapter:
         # ChatBotService.delete_bot returns DeleteBotResponse
         return await ChatBotService.delete_bot(bot_id=id, session=db)
 
+    # Fused single-statement paths used by generic_router_factory for PUT/DELETE:
+    # UPDATE/DELETE ... RETURNING both detects a missing row and produces the response.
+    async def update_by_id(self, db: AsyncSession, id: str, obj_in: UpdateBotRequest) -> UpdateBotResponse:
+        return await ChatBotService.update_bot(bot_id=id, request=obj_in, session=db)
+
+    async def remove_by_id(self, db: AsyncSession, id: str) -> DeleteBotResponse:
+        return await ChatBotService.delete_bot(bot_id=id, session=db)
+
+    # Bulk operations: one multi-row statement per call, one transaction per request
+    async def create_multi(self, db: AsyncSession, objs_in: List[BotCreate]) -> List[BotResponse]:
+        return await ChatBotService.create_chat_bots(session=db, bots=objs_in)
+
+    async def update_multi(
+        self, db: AsyncSession, objs_in: List[Tuple[str, UpdateBotRequest]]
+    ) -> Dict[str, UpdateBotResponse]:
+        return await ChatBotService.update_bots(session=db, requests=objs_in)
+
+    async def remove_multi(self, db: AsyncSession, ids: List[str]) -> Set[str]:
+        return await ChatBotService.delete_bots(session=db, bot_ids=ids)
+
 # Instantiate the adapter
 adapted_chatbot_service = ChatBotServiceAdapter()
 
@@ -61,4 +114,19 @@ router = generic_router_factory(
     get_all_response_model=BotAllResponse, # Changed back to BotAllResponse
     update_response_model=UpdateBotResponse,
     delete_response_model=DeleteBotResponse,
+    cache=make_entity_cache("bot"),
+    broadcaster=broadcaster,
+    filter_schema=BotFilter,
+    sort_fields=BOT_SORT_FIELDS,
+    # SQL statements per request with RETURNING support (PostgreSQL, SQLite >= 3.35)
+    query_budgets={
+        "create": 1,
+        "bulk_create": 1,
+        "bulk_update": 3,
+        "bulk_delete": 1,
+        "list": 2,
+        "get": 1,
+        "update": 1,
+        "delete": 1,
+    },
 )
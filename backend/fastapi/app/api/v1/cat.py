@@ -4,19 +4,36 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.cat import (
+    CAT_SORT_FIELDS,
     CatCreate,
+    CatFilter,
     CatResponse,
     CatAllResponse,
+    CatStatsResponse,
     UpdateCatResponse,
     UpdateCatRequest,
     DeleteCatResponse,
 )
 
-from app.db.database import get_db
+from app.db.database import get_read_db, get_session_factory
 from app.services.cat import CatService
 from app.utils.logging import logger # Ensure logger is imported
+from app.utils.broadcast import broadcaster
+from app.utils.cache import make_entity_cache
+from app.utils.write_batcher import make_write_batcher
 from app.api.v1.base_router import generic_router_factory
-from typing import List # Required for List type hint if not already present
+from app.db.instrumentation import query_budget
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple # Required for List type hint if not already present
+
+async def _create_cats_batch(cats: List[CatCreate]) -> List[CatResponse]:
+    # A batch outlives any single request, so it opens (and owns) its own session
+    async with get_session_factory()() as db:
+        return await CatService.create_cats(db=db, cats_data=cats)
+
+
+# Opt-in (WRITE_BATCHING_ENABLED): concurrent single creates share one multi-row INSERT
+create_batcher = make_write_batcher("cat", _create_cats_batch)
 
 # Adapter class to bridge CatService and generic_router_factory
 class CatServiceAdapter:
@@ -25,12 +42,30 @@ class CatServiceAdapter:
     # db_service = CatService (this line is not needed if directly calling static methods)
 
     async def create(self, db: AsyncSession, obj_in: CatCreate) -> CatResponse:
+        if create_batcher is not None:
+            return await create_batcher.submit(obj_in)
         return await CatService.create_cat(db=db, cat_data=obj_in)
 
-    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> CatAllResponse:
-        # CatService.get_all_cats doesn't support pagination (skip, limit).
-        # It directly returns CatAllResponse as required.
-        return await CatService.get_all_cats(db=db)
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[CatFilter] = None,
+        sort: Optional[str] = None,
+    ) -> CatAllResponse:
+        # Filtering, sorting and keyset pagination are pushed down into SQL;
+        # next_cursor is set on CatAllResponse.
+        return await CatService.get_all_cats(db=db, cursor=cursor, limit=limit, filters=filters, sort=sort)
+
+    async def get_version(self, db: AsyncSession) -> Tuple[Tuple[Any, ...], Optional[datetime]]:
+        # (row count, sum(version), max(id)) + max(updated_at): the list validator
+        # for ETag / 304 handling and the Last-Modified header.
+        return await CatService.get_cats_version(db=db)
+
+    def stream(self, db: AsyncSession, filters: Optional[CatFilter] = None) -> AsyncIterator[CatResponse]:
+        # Used by the factory's NDJSON mode; rows come from a server-side cursor.
+        return CatService.stream_cats(db=db, filters=filters)
 
     async def get(self, db: AsyncSession, id: str) -> CatResponse:
         return await CatService.get_cat_by_id(db=db, cat_id=id)
@@ -45,6 +80,26 @@ class CatServiceAdapter:
     async def remove(self, db: AsyncSession, id: str) -> DeleteCatResponse:
         return await CatService.delete_cat(cat_id=id, db=db)
 
+    # Fused single-statement paths used by generic_router_factory for PUT/DELETE:
+    # UPDATE/DELETE ... RETURNING both detects a missing row and produces the response.
+    async def update_by_id(self, db: AsyncSession, id: str, obj_in: UpdateCatRequest) -> UpdateCatResponse:
+        return await CatService.update_cat(cat_id=id, update_data=obj_in, db=db)
+
+    async def remove_by_id(self, db: AsyncSession, id: str) -> DeleteCatResponse:
+        return await CatService.delete_cat(cat_id=id, db=db)
+
+    # Bulk operations: one multi-row statement per call, one transaction per request
+    async def create_multi(self, db: AsyncSession, objs_in: List[CatCreate]) -> List[CatResponse]:
+        return await CatService.create_cats(db=db, cats_data=objs_in)
+
+    async def update_multi(
+        self, db: AsyncSession, objs_in: List[Tuple[str, UpdateCatRequest]]
+    ) -> Dict[str, UpdateCatResponse]:
+        return await CatService.update_cats(db=db, updates=objs_in)
+
+    async def remove_multi(self, db: AsyncSession, ids: List[str]) -> Set[str]:
+        return await CatService.delete_cats(db=db, cat_ids=ids)
+
 # Instantiate the adapter
 adapted_cat_service = CatServiceAdapter()
 
@@ -59,4 +114,36 @@ router = generic_router_factory(
     get_all_response_model=CatAllResponse, # Using CatAllResponse directly
     update_response_model=UpdateCatResponse,
     delete_response_model=DeleteCatResponse,
-)
\ No newline at end of file
+    cache=make_entity_cache("cat"),
+    broadcaster=broadcaster,
+    filter_schema=CatFilter,
+    sort_fields=CAT_SORT_FIELDS,
+    # SQL statements per request with RETURNING support (PostgreSQL, SQLite >= 3.35).
+    # Writes include one upsert into the cat_stats summary table; updates that
+    # touch breed/age/weight also read (and lock) the previous values.
+    query_budgets={
+        "create": 2,
+        "bulk_create": 2,
+        "bulk_update": 4,
+        "bulk_delete": 2,
+        "list": 2,
+        "get": 1,
+        "update": 3,
+        "delete": 2,
+    },
+)
+
+# Registered ahead of the factory router (see app/api/v1/__init__.py) so that
+# "/cat/stats" is not captured by "/cat/{item_id}".
+stats_router = APIRouter(prefix="/cat", tags=["cat"])
+
+
+@stats_router.get("/stats", response_model=CatStatsResponse, dependencies=[Depends(query_budget(1))])
+async def get_cat_stats(db: AsyncSession = Depends(get_read_db)) -> CatStatsResponse:
+    # Read from the incrementally maintained summary table: cost is bounded by
+    # the number of (breed, age) pairs, not by the number of cats.
+    try:
+        return await CatService.get_cat_stats(db=db)
+    except Exception as e:
+        logger.error(f"Error retrieving cat stats: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
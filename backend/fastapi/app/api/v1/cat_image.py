@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.schemas.cat_image import CatImageResponse
 from app.services.cat_image import CatImageService
 
 router = APIRouter(prefix="/cat-images", tags=["cat-images"])
 
 
-def get_cat_image_service():
-    return CatImageService()
+def get_cat_image_service(request: Request):
+    # 起動時に作成した共有サービス（コネクションプールと先読みキューを持つ）
+    service = getattr(request.app.state, "cat_image_service", None)
+    if service is None:
+        # 起動処理を通らない場合（Lambda など）は初回に作成し、以降の呼び出しで使い回す
+        service = CatImageService.create()
+        request.app.state.cat_image_service = service
+    return service
 
 
 @router.get("/", response_model=CatImageResponse)
 async def get_cat_image(
     cat_image_service: CatImageService = Depends(get_cat_image_service),
 ):
-    image_url = await cat_image_service.get_cat_image_url()
+    try:
+        image_url = await cat_image_service.get_cat_image_url()
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred while fetching cat image",
+        )
     return CatImageResponse(url=image_url)
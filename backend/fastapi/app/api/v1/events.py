@@ -0,0 +1,78 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.settings import settings
+from app.utils.broadcast import CLOSED, RESYNC, Subscription, broadcaster
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+async def _next_event(subscription: Subscription) -> object:
+    # None means nothing arrived within the heartbeat interval
+    try:
+        return await asyncio.wait_for(subscription.get(), settings.events_heartbeat_seconds)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def _sse_stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    try:
+        # EventSource reconnects after this many milliseconds and sends Last-Event-ID
+        yield b"retry: 3000\n\n"
+        while True:
+            event = await _next_event(subscription)
+            if event is None:
+                # Comment line: keeps proxies from closing an idle connection
+                yield b": keep-alive\n\n"
+            elif event is CLOSED:
+                return
+            elif event is RESYNC:
+                yield b"event: resync\ndata: {}\n\n"
+            else:
+                event_id, message = event
+                yield f"id: {event_id}\ndata: {message}\n\n".encode("utf-8")
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@router.get("", include_in_schema=False)
+async def stream_events(last_event_id: Optional[str] = Header(None)) -> StreamingResponse:
+    # Server-Sent Events: one "data:" line per row-level change
+    # ({"entity": "cat", "op": "created" | "updated" | "deleted", "id": ..., "item": ...}).
+    # "event: resync" means events were dropped and the client should reload.
+    subscription = await broadcaster.subscribe(last_event_id)
+    return StreamingResponse(
+        _sse_stream(subscription),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, last_event_id: Optional[str] = None) -> None:
+    # Same feed over a WebSocket: {"type": "change", "id": ..., "data": {...}},
+    # {"type": "resync"} and {"type": "ping"} messages as JSON text frames.
+    await websocket.accept()
+    subscription = await broadcaster.subscribe(last_event_id)
+    try:
+        while True:
+            event = await _next_event(subscription)
+            if event is None:
+                await websocket.send_text('{"type": "ping"}')
+            elif event is CLOSED:
+                await websocket.close()
+                return
+            elif event is RESYNC:
+                await websocket.send_text('{"type": "resync"}')
+            else:
+                event_id, message = event
+                await websocket.send_text(f'{{"type": "change", "id": "{event_id}", "data": {message}}}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,25 @@
+"""猫の集計表 (cat_stats) を cats テーブルから作り直す
+
+    python -m app.commands.rebuild_cat_stats
+
+集計表は猫の作成・更新・削除と同じトランザクションで差分更新されるが、
+SQLで直接 cats を書き換えた後などのずれはこのコマンドで直す。
+PostgreSQL では作り直している間 cats への書き込みを待たせる。
+"""
+import asyncio
+
+from app.db.database import get_engine, get_session_factory
+from app.services.cat_stats import CatStatsService
+
+
+async def main() -> int:
+    try:
+        async with get_session_factory()() as session:
+            return await CatStatsService.rebuild(session)
+    finally:
+        await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    rows = asyncio.run(main())
+    print(f"rebuilt cat_stats: {rows} rows")
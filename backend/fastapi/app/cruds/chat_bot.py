@@ -1,7 +1,25 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import delete, insert, select, update
+from app.db.statements import delete_returning, update_returning, version_columns
 from app.models.chat_bot import ChatBot
-from app.schemas.bot import BotCreate
+from app.schemas.bot import BotCreate, BotFilter
+from app.utils.filtering import FilterSpec, apply_filters, parse_sort
+from app.utils.id_generator import generate_ulids
+from app.utils.pagination import DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, keyset_page, split_page
+
+# BotFilter の項目と WHERE 句の対応
+BOT_FILTERS: FilterSpec = {
+    "name": (ChatBot.name, "eq"),
+    "color": (ChatBot.color, "eq"),
+}
+# BOT_SORT_FIELDS の列
+BOT_SORT_COLUMNS = {
+    "name": ChatBot.name,
+    "created_at": ChatBot.created_at,
+}
 
 
 class ChatBotCRUD:
@@ -20,17 +38,46 @@ class ChatBotCRUD:
         return new_bot
 
     @staticmethod
-    async def get_all_bots(session: AsyncSession) -> list[ChatBot]:
-        bots = await session.execute(select(ChatBot))
-        return bots.scalars().all()
+    async def get_all_bots(
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        filters: Optional[BotFilter] = None,
+        sort: Optional[str] = None,
+    ) -> tuple[list[ChatBot], Optional[str]]:
+        sort_column, descending, sort_key = parse_sort(sort, BOT_SORT_COLUMNS)
+        stmt = apply_filters(select(ChatBot), filters, BOT_FILTERS)
+        bots = await session.execute(
+            keyset_page(stmt, ChatBot.id, cursor, limit, sort_column, descending)
+        )
+        return split_page(bots.scalars().all(), limit, sort_key)
+
+    @staticmethod
+    async def get_version(session: AsyncSession) -> tuple[tuple[Any, ...], Optional[datetime]]:
+        # (件数, version の合計, 最大ID) と最終更新日時
+        result = await session.execute(select(*version_columns(ChatBot)))
+        *version, last_modified = result.one()
+        return tuple(version), last_modified
 
     @staticmethod
-    async def update_bot(bot_id: str, session: AsyncSession, **kwargs) -> ChatBot:
-        await session.execute(
-            update(ChatBot).where(ChatBot.id == bot_id).values(**kwargs)
+    async def stream_bots(
+        session: AsyncSession,
+        batch_size: int = STREAM_BATCH_SIZE,
+        filters: Optional[BotFilter] = None,
+    ) -> AsyncIterator[ChatBot]:
+        stmt = apply_filters(select(ChatBot), filters, BOT_FILTERS)
+        bots = await session.stream(
+            stmt.order_by(ChatBot.id).execution_options(yield_per=batch_size)
         )
+        async for bot in bots.scalars():
+            yield bot
+
+    @staticmethod
+    async def update_bot(bot_id: str, session: AsyncSession, **kwargs) -> Optional[ChatBot]:
+        # 存在確認と更新後の値の取得を UPDATE ... RETURNING の1文で行う
+        bot = await update_returning(session, ChatBot, bot_id, kwargs)
         await session.commit()
-        return await ChatBotCRUD.get_bot_by_id(bot_id, session)
+        return bot
 
     @staticmethod
     async def get_bot_by_id(bot_id: str, session: AsyncSession) -> ChatBot:
@@ -39,10 +86,61 @@ class ChatBotCRUD:
         return bot
 
     @staticmethod
-    async def delete_bot(bot_id: str, session: AsyncSession) -> ChatBot:
-        result = await session.execute(select(ChatBot).where(ChatBot.id == bot_id))
-        bot = result.scalars().one_or_none()
+    async def delete_bot(bot_id: str, session: AsyncSession) -> Optional[ChatBot]:
+        bot = await delete_returning(session, ChatBot, bot_id)
         if bot:
-            await session.delete(bot)
             await session.commit()
         return bot
+
+    @staticmethod
+    async def create_chat_bots(
+        session: AsyncSession, bots: list[BotCreate]
+    ) -> list[ChatBot]:
+        result = await session.scalars(
+            insert(ChatBot).returning(ChatBot, sort_by_parameter_order=True),
+            # IDは連続したブロックで払い出す（主キーのインデックスの末尾に順に入る）
+            [
+                {"id": bot_id, "name": bot.name, "color": bot.color}
+                for bot_id, bot in zip(generate_ulids(len(bots)), bots)
+            ],
+        )
+        new_bots = result.all()
+        await session.commit()
+        return new_bots
+
+    @staticmethod
+    async def update_bots(
+        session: AsyncSession, updates: list[dict]
+    ) -> list[ChatBot]:
+        # updates: [{"id": ..., <column>: <value>, ...}]。存在しないIDは無視される
+        ids = {row["id"] for row in updates}
+        existing = set(
+            (await session.scalars(select(ChatBot.id).where(ChatBot.id.in_(ids)))).all()
+        )
+        params = [row for row in updates if row["id"] in existing and len(row) > 1]
+        if params:
+            await session.execute(update(ChatBot), params)
+        bots = await session.scalars(
+            select(ChatBot)
+            .where(ChatBot.id.in_(existing))
+            .execution_options(populate_existing=True)
+        )
+        updated_bots = bots.all()
+        await session.commit()
+        return updated_bots
+
+    @staticmethod
+    async def delete_bots(session: AsyncSession, bot_ids: list[str]) -> set[str]:
+        stmt = delete(ChatBot).where(ChatBot.id.in_(set(bot_ids)))
+        if session.get_bind().dialect.delete_returning:
+            result = await session.scalars(
+                stmt.returning(ChatBot.id).execution_options(synchronize_session=False)
+            )
+            deleted = set(result.all())
+        else:
+            deleted = set(
+                (await session.scalars(select(ChatBot.id).where(ChatBot.id.in_(set(bot_ids))))).all()
+            )
+            await session.execute(stmt.execution_options(synchronize_session=False))
+        await session.commit()
+        return deleted
@@ -1,46 +1,135 @@
-from typing import Any, AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import os
+from typing import Any, AsyncGenerator, Optional
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.settings import settings
+from app.db.engine import build_engine
+from app.db.instrumentation import install_query_hooks
+from app.db.replica import reads_from_primary
 from urllib.parse import quote_plus
 from app.utils.logging import logger
 
-ai_bot_db_user: str = settings.ai_bot_db_user
-ai_bot_db_password: str = quote_plus(settings.ai_bot_db_password)
-ai_bot_db_name: str = settings.ai_bot_db_name
-ai_bot_db_host: str = settings.ai_bot_db_host
-ai_bot_cloud_sql_connection_name: str = settings.ai_bot_cloud_sql_connection_name
-
 
 def _get_database_url() -> str:
-    from app.settings import Settings
-    import os
+    if settings.database_url:
+        return settings.database_url
 
-    settings = Settings()
-    
     # Use SQLite for development/testing if PostgreSQL is not available
     if settings.environment == "development" and settings.ai_bot_db_host == "localhost":
         return "sqlite+aiosqlite:///./test.db"
-    
-    return f"postgresql+asyncpg://{settings.ai_bot_db_user}:{settings.ai_bot_db_password}@{settings.ai_bot_db_host}:5432/{settings.ai_bot_db_name}"
+
+    return (
+        f"postgresql+asyncpg://{settings.ai_bot_db_user}:{quote_plus(settings.ai_bot_db_password)}"
+        f"@{settings.ai_bot_db_host}:5432/{settings.ai_bot_db_name}"
+    )
+
+
+# エンジンとセッションファクトリは最初に使うときに作る（Lambda のコールドスタート短縮）。
+# 作成後はプロセス内で使い回すので、ウォームな呼び出しでは作り直さない
+_engine: Optional[AsyncEngine] = None
+_session_factory: Any = None
+_read_engine: Optional[AsyncEngine] = None
+_read_session_factory: Any = None
+
+
+def _forget_engines() -> None:
+    # fork した子プロセスは親のエンジン（プール内の接続とイベントループ）を使わず、
+    # 最初に使うときに自分のエンジンを作る。親の接続は閉じずに参照だけを捨てる
+    global _engine, _session_factory, _read_engine, _read_session_factory
+    _engine = _session_factory = _read_engine = _read_session_factory = None
+
+
+os.register_at_fork(after_in_child=_forget_engines)
+
+
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        database_url = _get_database_url()
+        logger.info(f"Connecting to database: {database_url}")
+        _engine = build_engine(database_url, settings)
+        # リクエストごとのSQL回数・時間の集計（app/db/instrumentation.py）
+        install_query_hooks(_engine)
+    return _engine
+
+
+def get_read_engine() -> AsyncEngine:
+    """リードレプリカのエンジン（read_database_url が無ければプライマリと同じ）"""
+    global _read_engine
+    if not settings.read_database_url:
+        return get_engine()
+    if _read_engine is None:
+        logger.info(f"Connecting to read replica: {settings.read_database_url}")
+        _read_engine = build_engine(settings.read_database_url, settings)
+        install_query_hooks(_read_engine)
+    return _read_engine
 
 
-DATABASE_URL: str = _get_database_url()
-logger.info(f"Connecting to database: {DATABASE_URL}")
+def _make_session_factory(engine: AsyncEngine) -> Any:
+    return sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+def get_session_factory() -> Any:
+    # ストリーミングレスポンスはリクエストのDependsより長生きするため、
+    # セッションはレスポンス生成側でこのファクトリから開く
+    global _session_factory
+    if _session_factory is None:
+        # 非同期セッションオブジェクトを作成
+        _session_factory = _make_session_factory(get_engine())
+    return _session_factory
+
+
+def _get_replica_session_factory() -> Any:
+    global _read_session_factory
+    if _read_session_factory is None:
+        _read_session_factory = _make_session_factory(get_read_engine())
+    return _read_session_factory
+
+
+def get_read_session_factory(request: Request, primary: Any = Depends(get_session_factory)) -> Any:
+    """読み取り用のセッションファクトリ（レプリカ。書き込み直後のクライアントはプライマリ）"""
+    if reads_from_primary(request):
+        return primary
+    return _get_replica_session_factory()
 
-engine: Any = create_async_engine(DATABASE_URL, echo=settings.environment == "development")
-# 非同期セッションオブジェクトを作成
-AsyncSessionLocal: Any = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    autocommit=False,
-    autoflush=False,
-    expire_on_commit=False,
-)
 
 Base: Any = declarative_base()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         yield session
+
+
+async def get_read_db(
+    request: Request, primary: AsyncSession = Depends(get_db)
+) -> AsyncGenerator[AsyncSession, None]:
+    """読み取り専用のルート用のセッション
+
+    レプリカを使わない場合は get_db のセッションをそのまま返す（get_db の
+    dependency_overrides もそのまま効く）。セッションは最初のSQLで接続するので、
+    レプリカを使う場合にプライマリの接続を取ることはない。
+    """
+    if reads_from_primary(request):
+        yield primary
+        return
+    async with _get_replica_session_factory()() as session:
+        yield session
+
+
+def __getattr__(name: str) -> Any:
+    # 従来の `from app.db.database import engine, AsyncSessionLocal` も遅延作成で動かす
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_session_factory()
+    if name == "DATABASE_URL":
+        return _get_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,191 @@
+import logging
+import time
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from app.settings import Settings
+from app.utils.logging import logger
+from app.utils.metrics import metric_lines
+
+# これを超えるプール待ちは警告ログに出す
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class EngineProfile(BaseModel):
+    """デプロイ形態ごとのコネクションプール設定"""
+
+    null_pool: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    # asyncpg のプリペアドステートメントキャッシュ（接続ごと）
+    statement_cache_size: int = 100
+
+
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    # uvicorn 常駐プロセス。既定の 5+10 では詰まるので広めに取り、古い接続は張り直す
+    "server": EngineProfile(
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=10.0,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_cache_size=500,
+    ),
+    # Lambda は呼び出し間でプロセスが凍結され、プール内の接続が失効するため持たない
+    "lambda": EngineProfile(null_pool=True, statement_cache_size=100),
+    # テストはイベントループごとにエンジンを使い回さない
+    "test": EngineProfile(null_pool=True, statement_cache_size=0),
+}
+
+
+class PoolWaitStats:
+    """コネクションプールからの取得待ち時間の累計"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.slow_checkouts = 0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += wait
+        if wait > self.max_wait_seconds:
+            self.max_wait_seconds = wait
+        if wait >= SLOW_CHECKOUT_SECONDS:
+            self.slow_checkouts += 1
+            logger.warning(f"コネクションプールの取得に {wait * 1000:.1f}ms かかりました")
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "checkouts": self.checkouts,
+            "total_wait_seconds": self.total_wait_seconds,
+            "avg_wait_seconds": self.total_wait_seconds / self.checkouts if self.checkouts else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "slow_checkouts": self.slow_checkouts,
+        }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """取得待ち時間を pool_wait_stats に記録するキュープール"""
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_stats.record(time.perf_counter() - start)
+
+
+# プールのロガー名は app.* 配下になり app ロガーの INFO を継承してしまうため抑える
+logging.getLogger(f"{__name__}.{TimedAsyncQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+def resolve_profile(settings: Settings) -> EngineProfile:
+    """設定で選んだプロファイルに個別の上書き値を反映する"""
+    try:
+        profile = ENGINE_PROFILES[settings.db_engine_profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown db_engine_profile: {settings.db_engine_profile} "
+            f"(expected one of {', '.join(ENGINE_PROFILES)})"
+        )
+    overrides = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "statement_cache_size": settings.db_statement_cache_size,
+    }
+    return profile.model_copy(update={k: v for k, v in overrides.items() if v is not None})
+
+
+def build_engine(database_url: str, settings: Settings) -> AsyncEngine:
+    """プロファイルに従って非同期エンジンを作成する"""
+    profile = resolve_profile(settings)
+    backend = make_url(database_url).get_backend_name()
+
+    kwargs: Dict[str, Any] = {"echo": settings.environment == "development"}
+    if profile.null_pool:
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            poolclass=TimedAsyncQueuePool,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+            pool_recycle=profile.pool_recycle,
+            pool_pre_ping=profile.pool_pre_ping,
+        )
+
+    if backend == "postgresql":
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": profile.statement_cache_size,
+            # 短いOLTPクエリではJITのコンパイル時間の方が高くつく
+            "server_settings": {"application_name": "fastapi-lambda-demo", "jit": "off"},
+        }
+
+    engine = create_async_engine(database_url, **kwargs)
+
+    if backend == "sqlite":
+        @event.listens_for(engine.sync_engine, "connect")
+        def _init_sqlite_connection(dbapi_connection: Any, connection_record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+
+    logger.info(f"DBエンジンを作成しました: profile={settings.db_engine_profile}, {profile}")
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> Dict[str, Any]:
+    """プールの現在の使用状況と取得待ち時間の累計"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": pool.__class__.__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    status.update(pool_wait_stats.snapshot())
+    return status
+
+
+def pool_metric_lines(engine: AsyncEngine) -> List[str]:
+    """/metrics 用のコネクションプールの状態"""
+    status = pool_status(engine)
+    lines: List[str] = []
+    for key in ("size", "checked_out", "overflow"):
+        if key in status:
+            lines.extend(metric_lines(
+                f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.", "gauge", "pool",
+                {status["pool"]: status[key]},
+            ))
+    for key in ("checkouts", "slow_checkouts"):
+        lines.extend(metric_lines(
+            f"db_pool_{key}_total", f"Connection pool {key.replace('_', ' ')}.", "counter", "pool",
+            {status["pool"]: status[key]},
+        ))
+    lines.extend(metric_lines(
+        "db_pool_wait_seconds_total", "Total time spent waiting for a connection.", "counter", "pool",
+        {status["pool"]: status["total_wait_seconds"]},
+    ))
+    lines.extend(metric_lines(
+        "db_pool_wait_seconds_max", "Longest wait for a connection.", "gauge", "pool",
+        {status["pool"]: status["max_wait_seconds"]},
+    ))
+    return lines
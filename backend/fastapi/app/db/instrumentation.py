@@ -0,0 +1,222 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.logging import logger
+from app.utils.metrics import Histogram, escape_label, histogram_lines, metric_lines, route_label
+
+# 1リクエストあたりのクエリ数のバケット
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 3, 4, 5, 10, 20, 50)
+# 1リクエストあたりのDB時間のバケット（秒）
+QUERY_TIME_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Server-Timing やログに載せる最も遅いSQLの最大長
+STATEMENT_PREVIEW_LENGTH = 200
+
+
+class QueryStats:
+    """1リクエスト中に実行したSQLの集計"""
+
+    __slots__ = ("count", "total_seconds", "slowest_seconds", "slowest_statement", "budget")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.budget: Optional[int] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        value = f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries"'
+        if self.count:
+            value += f", db-slowest;dur={self.slowest_seconds * 1000:.2f}"
+        return value
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """ブロック内で実行したSQLを集計する（リクエスト外やテストで使う）"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class QueryMetrics:
+    """/metrics 用のSQL集計（全体の累計とルートごとのヒストグラム）"""
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        self.budget_exceeded = 0
+        # route -> method -> (クエリ数, DB時間)
+        self._routes: Dict[str, Dict[str, Tuple[Histogram, Histogram]]] = {}
+
+    def observe_request(self, route: str, method: str, stats: QueryStats) -> None:
+        by_method = self._routes.get(route)
+        if by_method is None:
+            by_method = self._routes[route] = {}
+        histograms = by_method.get(method)
+        if histograms is None:
+            histograms = by_method[method] = (
+                Histogram(QUERY_COUNT_BUCKETS),
+                Histogram(QUERY_TIME_BUCKETS),
+            )
+        histograms[0].observe(stats.count)
+        histograms[1].observe(stats.total_seconds)
+
+    def clear(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        self.budget_exceeded = 0
+        self._routes.clear()
+
+    def lines(self) -> List[str]:
+        lines = metric_lines(
+            "db_queries_total", "SQL statements executed.", "counter", "engine", {"default": self.queries}
+        )
+        lines.extend(metric_lines(
+            "db_query_seconds_total", "Time spent executing SQL statements.", "counter", "engine",
+            {"default": self.seconds},
+        ))
+        lines.extend(metric_lines(
+            "db_query_budget_exceeded_total", "Requests that went over their query budget.", "counter",
+            "engine", {"default": self.budget_exceeded},
+        ))
+        series = [
+            (f'route="{escape_label(route)}",method="{method}"', histograms)
+            for route, by_method in sorted(self._routes.items())
+            for method, histograms in sorted(by_method.items())
+        ]
+        lines.append("# HELP db_queries_per_request SQL statements per request by route template.")
+        lines.append("# TYPE db_queries_per_request histogram")
+        for labels, (counts, _) in series:
+            lines.extend(histogram_lines("db_queries_per_request", labels, counts))
+        lines.append("# HELP db_time_per_request_seconds SQL time per request by route template.")
+        lines.append("# TYPE db_time_per_request_seconds histogram")
+        for labels, (_, seconds) in series:
+            lines.extend(histogram_lines("db_time_per_request_seconds", labels, seconds))
+        return lines
+
+
+query_metrics = QueryMetrics()
+
+
+def install_query_hooks(engine: AsyncEngine) -> None:
+    """カーソル実行イベントで、実行中のリクエストにSQLの回数と時間を記録する"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        # 開始時刻は実行ごとのコンテキストに持たせる（失敗しても残らない）
+        context._query_started_at = perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        elapsed = perf_counter() - context._query_started_at
+        query_metrics.queries += 1
+        query_metrics.seconds += elapsed
+        # AsyncSession の同期処理は greenlet 上で動くが、contextvars は引き継がれる
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+
+def query_budget(limit: int) -> Callable[[], Any]:
+    """ルートのクエリ数の上限を宣言する依存関係（Depends で使う）"""
+
+    async def _declare_query_budget() -> None:
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = limit
+
+    return _declare_query_budget
+
+
+class QueryTimingMiddleware:
+    """リクエストごとにSQLを集計し、Server-Timing ヘッダとメトリクスに出す
+
+    strict=True のときはクエリ数が宣言した上限を超えたレスポンスを送らずに 500 を返す
+    （テストで N+1 などの退行を検出するため。本番では警告ログのみ）。判定はレスポンスの
+    最後の本文を送る直前に行うので、strict ではレスポンス全体（ストリーミングも）を溜める。
+    """
+
+    def __init__(self, app: ASGIApp, strict: bool = False) -> None:
+        self.app = app
+        self.strict = strict
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        held: List[Message] = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            if not self.strict:
+                await send(message)
+                return
+            held.append(message)
+            if message["type"] != "http.response.body" or message.get("more_body", False):
+                return
+            # 最後の本文の直前。上限を超えていたら溜めたレスポンスの代わりに 500 を返す
+            exceeded = _budget_exceeded(scope, stats)
+            if exceeded is not None:
+                response = JSONResponse({"detail": f"Query budget exceeded: {exceeded}"}, status_code=500)
+                await response(scope, receive, send)
+            else:
+                for held_message in held:
+                    await send(held_message)
+            held.clear()
+
+        token = _current_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            query_metrics.observe_request(route_label(scope), scope["method"], stats)
+
+        exceeded = _budget_exceeded(scope, stats)
+        if exceeded is not None:
+            query_metrics.budget_exceeded += 1
+            logger.warning(f"クエリ数が上限を超えました: {exceeded}")
+
+
+def _budget_exceeded(scope: Scope, stats: QueryStats) -> Optional[str]:
+    """宣言した上限を超えていれば、その内容（超えていなければ None）"""
+    if stats.budget is None or stats.count <= stats.budget:
+        return None
+    return (
+        f"{scope['method']} {route_label(scope)} executed {stats.count} queries "
+        f"(budget {stats.budget}); slowest: "
+        f"{(stats.slowest_statement or '')[:STATEMENT_PREVIEW_LENGTH]}"
+    )
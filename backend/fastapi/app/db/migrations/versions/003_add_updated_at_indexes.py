@@ -0,0 +1,27 @@
+"""add updated_at indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 一覧のETag用の max(updated_at) をインデックスの端から引けるようにする
+    op.create_index('ix_cats_updated_at', 'cats', ['updated_at'])
+    op.create_index('ix_chat_bots_updated_at', 'chat_bots', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_bots_updated_at', table_name='chat_bots')
+    op.drop_index('ix_cats_updated_at', table_name='cats')
@@ -0,0 +1,46 @@
+"""add filter and sort indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 一覧のフィルタ・並べ替え（並べ替え列 + id のキーセットページング）用
+    op.create_index('ix_cats_breed_age', 'cats', ['breed', 'age'])
+    op.create_index('ix_cats_age_id', 'cats', ['age', 'id'])
+    op.create_index('ix_cats_weight_id', 'cats', ['weight', 'id'])
+    op.create_index('ix_cats_name_id', 'cats', ['name', 'id'])
+    op.create_index('ix_cats_created_at_id', 'cats', ['created_at', 'id'])
+    op.create_index('ix_chat_bots_name_id', 'chat_bots', ['name', 'id'])
+    op.create_index('ix_chat_bots_color_id', 'chat_bots', ['color', 'id'])
+    op.create_index('ix_chat_bots_created_at_id', 'chat_bots', ['created_at', 'id'])
+    # name_prefix (LIKE 'prefix%') 用。PostgreSQL だけ text_pattern_ops が必要
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index(
+            'ix_cats_name_pattern', 'cats', ['name'], postgresql_ops={'name': 'text_pattern_ops'}
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_cats_name_pattern', table_name='cats')
+    op.drop_index('ix_chat_bots_created_at_id', table_name='chat_bots')
+    op.drop_index('ix_chat_bots_color_id', table_name='chat_bots')
+    op.drop_index('ix_chat_bots_name_id', table_name='chat_bots')
+    op.drop_index('ix_cats_created_at_id', table_name='cats')
+    op.drop_index('ix_cats_name_id', table_name='cats')
+    op.drop_index('ix_cats_weight_id', table_name='cats')
+    op.drop_index('ix_cats_age_id', table_name='cats')
+    op.drop_index('ix_cats_breed_age', table_name='cats')
@@ -0,0 +1,39 @@
+"""create cat_stats table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 猫の統計用の集計表（品種 × 年齢）。品種・年齢が未設定の猫は '' と -1 で数える
+    op.create_table(
+        'cat_stats',
+        sa.Column('breed', sa.String(), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('cat_count', sa.Integer(), nullable=False),
+        sa.Column('weight_sum', sa.Float(), nullable=False),
+        sa.Column('weight_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('breed', 'age')
+    )
+    # 既存の猫から初期値を作る
+    op.execute(
+        "INSERT INTO cat_stats (breed, age, cat_count, weight_sum, weight_count) "
+        "SELECT COALESCE(breed, ''), COALESCE(age, -1), COUNT(*), COALESCE(SUM(weight), 0), COUNT(weight) "
+        "FROM cats GROUP BY COALESCE(breed, ''), COALESCE(age, -1)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cat_stats')
@@ -0,0 +1,100 @@
+"""binary ulid primary keys
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import ulid
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+TABLES = ('cats', 'chat_bots')
+
+# Crockford Base32 の26文字 <-> uuid（16バイト）。ALTER ... USING で使う一時関数
+_ULID_TO_UUID = """
+CREATE FUNCTION pg_temp.ulid_to_uuid(value text) RETURNS uuid
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    n numeric := 0;
+    hex text := '';
+BEGIN
+    FOR i IN 1..26 LOOP
+        n := n * 32 + strpos('0123456789ABCDEFGHJKMNPQRSTVWXYZ', substr(value, i, 1)) - 1;
+    END LOOP;
+    FOR i IN 1..32 LOOP
+        hex := substr('0123456789abcdef', mod(n, 16)::int + 1, 1) || hex;
+        n := div(n, 16);
+    END LOOP;
+    RETURN hex::uuid;
+END $$
+"""
+
+_UUID_TO_ULID = """
+CREATE FUNCTION pg_temp.uuid_to_ulid(value uuid) RETURNS text
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    hex text := replace(value::text, '-', '');
+    n numeric := 0;
+    result text := '';
+BEGIN
+    FOR i IN 1..32 LOOP
+        n := n * 16 + strpos('0123456789abcdef', substr(hex, i, 1)) - 1;
+    END LOOP;
+    FOR i IN 1..26 LOOP
+        result := substr('0123456789ABCDEFGHJKMNPQRSTVWXYZ', mod(n, 32)::int + 1, 1) || result;
+        n := div(n, 32);
+    END LOOP;
+    RETURN result;
+END $$
+"""
+
+
+def _convert_sqlite(table: str, to_binary: bool) -> None:
+    # SQLite は列の型を変えられないが、TEXT の列にも BLOB の値をそのまま保存できる
+    # （比較は BLOB 同士のバイト順で、ULID の順序と一致する）ので値だけを書き換える
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(f'SELECT id FROM {table}')).scalars().all()
+    params = []
+    for value in rows:
+        if to_binary and isinstance(value, str):
+            params.append({'old': value, 'new': ulid.from_str(value).bytes})
+        elif not to_binary and isinstance(value, bytes):
+            params.append({'old': value, 'new': str(ulid.from_bytes(value))})
+    if params:
+        bind.execute(sa.text(f'UPDATE {table} SET id = :new WHERE id = :old'), params)
+
+
+def upgrade() -> None:
+    # 主キーと重複していた unique インデックス（モデルの unique=True, index=True から作られたもの）
+    for table in TABLES:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_id')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(_ULID_TO_UUID)
+        for table in TABLES:
+            # 主キーと (列, id) の複合インデックスも新しい型で作り直される
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN id TYPE uuid USING pg_temp.ulid_to_uuid(id)')
+    else:
+        for table in TABLES:
+            _convert_sqlite(table, to_binary=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(_UUID_TO_ULID)
+        for table in TABLES:
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN id TYPE varchar(26) USING pg_temp.uuid_to_ulid(id)')
+    else:
+        for table in TABLES:
+            _convert_sqlite(table, to_binary=False)
+
+    for table in TABLES:
+        op.create_index(f'ix_{table}_id', table, ['id'], unique=True)
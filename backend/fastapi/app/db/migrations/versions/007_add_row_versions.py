@@ -0,0 +1,29 @@
+"""add row versions
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+TABLES = ('cats', 'chat_bots')
+
+
+def upgrade() -> None:
+    # UPDATE のたびに1増える行のバージョン（ETag 用）。既存の行は1から始める
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, 'version')
@@ -0,0 +1,63 @@
+import time
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.settings import settings
+
+# 書き込み後しばらく読み取りをプライマリに向けるためのクッキー（値は期限のUNIX時刻）
+STICKY_COOKIE = "db_primary_until"
+
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def replica_configured() -> bool:
+    return bool(settings.read_database_url)
+
+
+def reads_from_primary(connection: HTTPConnection, now: Optional[float] = None) -> bool:
+    """このリクエストの読み取りをプライマリで行うか
+
+    リードレプリカが無い場合と、同じクライアントが直前に書き込んだ場合
+    （自分の書き込みがレプリカにまだ届いていないかもしれない）はプライマリ。
+    """
+    if not replica_configured():
+        return True
+    value = connection.cookies.get(STICKY_COOKIE)
+    if not value:
+        return False
+    try:
+        until = float(value)
+    except ValueError:
+        return False
+    return until > (time.time() if now is None else now)
+
+
+class ReadYourWritesMiddleware:
+    """書き込みに成功したレスポンスにクッキーを付け、その後の読み取りをプライマリに固定する
+
+    固定する時間は read_your_writes_seconds（レプリカの遅延より長くする）。
+    クッキーを返さないクライアントは書き込み直後でもレプリカから読む。
+    """
+
+    def __init__(self, app: ASGIApp, seconds: Optional[float] = None) -> None:
+        self.app = app
+        self.seconds = settings.read_your_writes_seconds if seconds is None else seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in _READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.seconds
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.seconds) + 1}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
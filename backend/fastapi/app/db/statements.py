@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def version_columns(model: Type[Any]) -> List[Any]:
+    """一覧の変更検知用の集計: 件数・version の合計・最大ID・最終更新日時
+
+    UPDATE は version の合計を、INSERT は件数と最大ID（ULID は後に作るほど大きい）を、
+    DELETE は件数を必ず変える。どれもコミットされた行だけから決まるので、
+    同じ秒の更新や遅れてコミットされたトランザクションも見分けられる
+    （updated_at は SQLite では秒精度、PostgreSQL ではトランザクションの開始時刻）。
+    最終更新日時は Last-Modified ヘッダ用。
+    """
+    return [
+        func.count(model.id),
+        func.coalesce(func.sum(model.version), 0),
+        func.max(model.id),
+        func.max(model.updated_at),
+    ]
+
+
+async def update_returning(
+    session: AsyncSession, model: Type[Any], id_value: Any, values: Dict[str, Any]
+) -> Optional[Any]:
+    """主キー指定の UPDATE ... RETURNING を1文で実行し、更新後の行を返す
+
+    行が無ければ None。RETURNING 非対応の方言（古いSQLite等）では
+    UPDATE の件数で存在を判定し、更新後の行を SELECT で読み直す。
+    コミットは呼び出し側で行う。
+    """
+    stmt = (
+        update(model)
+        .where(model.id == id_value)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if session.get_bind().dialect.update_returning:
+        result = await session.scalars(
+            stmt.returning(model), execution_options={"populate_existing": True}
+        )
+        return result.one_or_none()
+
+    result = await session.execute(stmt)
+    if result.rowcount == 0:
+        return None
+    result = await session.scalars(
+        select(model).where(model.id == id_value).execution_options(populate_existing=True)
+    )
+    return result.one_or_none()
+
+
+async def delete_returning(
+    session: AsyncSession, model: Type[Any], id_value: Any
+) -> Optional[Any]:
+    """主キー指定の DELETE ... RETURNING を1文で実行し、削除した行を返す
+
+    行が無ければ None。RETURNING 非対応の方言では SELECT してから DELETE する。
+    コミットは呼び出し側で行う。
+    """
+    stmt = (
+        delete(model)
+        .where(model.id == id_value)
+        .execution_options(synchronize_session=False)
+    )
+    if session.get_bind().dialect.delete_returning:
+        result = await session.scalars(stmt.returning(model))
+        return result.one_or_none()
+
+    result = await session.scalars(select(model).where(model.id == id_value))
+    row = result.one_or_none()
+    if row is not None:
+        await session.execute(stmt)
+    return row
+
+
+async def upsert_increment(
+    session: AsyncSession, model: Type[Any], rows: List[Dict[str, Any]], key_columns: Sequence[str]
+) -> None:
+    """主キーで INSERT ... ON CONFLICT DO UPDATE し、既存の行にはキー以外の列を加算する
+
+    rows は1回の executemany で送る。同時に走るトランザクション同士がデッドロック
+    しないよう、行ロックを取る順番（キー順）にそろえる。コミットは呼び出し側で行う。
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported for dialect: {dialect}")
+
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={
+            name: getattr(model, name) + stmt.excluded[name]
+            for name in rows[0]
+            if name not in key_columns
+        },
+    )
+    rows = sorted(rows, key=lambda row: tuple(row[name] for name in key_columns))
+    await session.execute(stmt, rows)
@@ -0,0 +1,82 @@
+import uuid
+from typing import Any, Optional
+
+from sqlalchemy import DateTime, LargeBinary, MetaData, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Dialect
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+from app.utils.id_generator import ulid_from_bytes, ulid_to_bytes
+
+# SQLite では日時が文字列で保存され、比較も文字列で行われる。
+# server_default の CURRENT_TIMESTAMP は秒までの形式で書き込まれるため、
+# バインドする値も同じ形式にしないと created_at = ? や < ? の比較がずれる
+# （並べ替えたキーセットページングの境界で行が重複する）。
+_SQLITE_DATETIME_FORMAT = "%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format=_SQLITE_DATETIME_FORMAT), "sqlite"
+)
+
+
+class ULIDType(TypeDecorator):
+    """ULID を16バイトで保存する主キー用の型（PostgreSQL は uuid、SQLite は BLOB）
+
+    アプリケーションからは26文字の文字列として読み書きする。16バイトのまま
+    先頭から比較すると ULID の順序と一致するので、ID順のキーセットページングや
+    範囲検索もそのまま使える。小文字の ULID は大文字に直してバインドする。
+    正規の ULID でない文字列は NULL としてバインドし、どの行にも一致しない
+    （存在しないIDとして扱われる）。
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value: Optional[str], dialect: Dialect) -> Any:
+        if value is None:
+            return None
+        raw = ulid_to_bytes(value)
+        if raw is None or dialect.name != "postgresql":
+            return raw
+        return uuid.UUID(bytes=raw)
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # マイグレーション 006 の前に SQLite の TEXT 列へ書かれた行（ensure_binary_ids を参照）
+            return value
+        if isinstance(value, uuid.UUID):
+            value = value.bytes
+        return ulid_from_bytes(bytes(value))
+
+
+def ensure_binary_ids(connection: Connection, metadata: MetaData) -> None:
+    """SQLite で ULIDType の列に文字列のままのIDが残っていれば RuntimeError を送出する
+
+    SQLite は列の型を強制しないため、マイグレーション 006 を適用していないDBでは
+    IDが TEXT のまま残る。読み込みはできるが、IDでの検索はバイト列と比較するので
+    どの行にも一致せず、すべて 404 になる。その状態で起動しないように確かめる。
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    existing = set(inspect(connection).get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        for column in table.columns:
+            if not isinstance(column.type, ULIDType):
+                continue
+            count = connection.execute(
+                text(f'SELECT count(*) FROM "{table.name}" WHERE typeof("{column.name}") = \'text\'')
+            ).scalar()
+            if count:
+                raise RuntimeError(
+                    f"{table.name}.{column.name} に文字列のままのIDが {count} 件あります。"
+                    "マイグレーション 006（alembic upgrade 006）で16バイトに変換してから起動してください"
+                )
@@ -0,0 +1,41 @@
+"""AWS Lambda のエントリポイント（ハンドラ設定: app.lambda_handler.handler）
+
+コールドスタートを短くするため、このモジュール自体は何も重いものを import しない。
+FastAPI アプリ・ルーター・SQLAlchemy は最初の呼び出しで読み込み、DBエンジンは
+最初にDBを使うときに作る。どちらもプロセス内に残るので、ウォームな呼び出しでは再利用する。
+"""
+import os
+from typing import Any, Callable, Dict, Optional
+
+# Settings が読み込まれる前に Lambda 向けの既定値を入れる（環境変数で上書き可能）
+# - スキーマは実行時に作らない（マイグレーションで管理する）
+# - 呼び出し間でプロセスが凍結されるため、接続はプールしない
+os.environ.setdefault("CREATE_SCHEMA_ON_STARTUP", "false")
+os.environ.setdefault("DB_ENGINE_PROFILE", "lambda")
+# 先読みのバックグラウンドタスクは呼び出しの合間に凍結されるので使わない
+os.environ.setdefault("CAT_IMAGE_PREFETCH_ENABLED", "false")
+
+_handler: Optional[Callable[[Dict[str, Any], Any], Dict[str, Any]]] = None
+
+
+def _load_handler() -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    from mangum import Mangum
+
+    from app.main import app
+
+    # Mangum の lifespan は呼び出しごとに startup/shutdown を実行するため使わない。
+    # 起動処理が無くても各依存は初回利用時に自分で初期化される
+    return Mangum(app, lifespan="off")
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    global _handler
+    if _handler is None:
+        _handler = _load_handler()
+    try:
+        return _handler(event, context)
+    finally:
+        # ログはリスナーのスレッドが書き出す。返した後は凍結されるので、ここで出し切る
+        from app.utils.logging import flush_logs
+
+        flush_logs()
@@ -1,26 +1,96 @@
-from fastapi import FastAPI
+from typing import Any
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from mangum import Mangum
 
-from app.db.database import Base, engine
+from app.db.database import Base, get_engine
+from app.db.types import ensure_binary_ids
+from app.db.engine import pool_metric_lines
+from app.db.instrumentation import QueryTimingMiddleware, query_metrics
+from app.db.replica import ReadYourWritesMiddleware, replica_configured
 from app.api.v1 import v1_router
+from app.services.cat_image import CatImageService
+from app.settings import settings
+from app.utils.admission import AdmissionControlMiddleware, admission_metric_lines, make_rate_limiter
+from app.utils.broadcast import broadcaster
+from app.utils.cache import entity_cache_metric_lines
+from app.utils.compression import CompressionMiddleware
+from app.utils.logging import logging_metric_lines
+from app.utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, metrics_registry
+from app.utils.single_flight import single_flight_metric_lines
+from app.utils.static_assets import StaticAssets
+from app.utils.write_batcher import write_batcher_metric_lines
 
 app = FastAPI()
 
+# 静的ファイルはメモリに載せ、ハッシュ付きの名前と gzip / brotli 版で配信する
+static_assets = StaticAssets("static")
+
 
-# アプリケーション起動時にテーブルを作成
+# アプリケーション起動時にテーブルを作成（本番のスキーマはマイグレーションで管理し、無効化する）
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
+    if not settings.create_schema_on_startup:
+        return
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
+# マイグレーション 006 の前の SQLite のDB（IDが文字列のまま）では起動しない
+@app.on_event("startup")
+async def check_id_storage():
+    engine = get_engine()
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as conn:
+        await conn.run_sync(ensure_binary_ids, Base.metadata)
+
+
+# 外部API用の共有クライアントと猫画像の先読みはアプリのライフサイクルで管理する
+@app.on_event("startup")
+async def start_cat_image_service():
+    app.state.cat_image_service = CatImageService.create()
+    app.state.cat_image_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_cat_image_service():
+    await app.state.cat_image_service.aclose()
+
+
+# エンティティキャッシュは他のワーカーでの書き込みを変更フィードで受け取って無効化する
+@app.on_event("startup")
+async def start_change_feed():
+    if settings.entity_cache_enabled:
+        await broadcaster.start()
+
+
+# 変更フィードのストリームを終わらせて、終了時にワーカーが待たされないようにする
+@app.on_event("shutdown")
+async def close_change_feed():
+    await broadcaster.close()
+
+
 # ルートパスのエンドポイントを追加 - Kanbanボードを表示
 @app.get("/")
-async def root():
-    return FileResponse("static/index.html")
+async def root(request: Request):
+    return static_assets.response("index.html", request)
+
+
+# Prometheus 形式のメトリクス（ルートごとのレイテンシ、キャッシュ、コネクションプール）
+metrics_registry.add_collector(entity_cache_metric_lines)
+metrics_registry.add_collector(lambda: pool_metric_lines(get_engine()))
+metrics_registry.add_collector(query_metrics.lines)
+metrics_registry.add_collector(logging_metric_lines)
+metrics_registry.add_collector(broadcaster.metric_lines)
+metrics_registry.add_collector(single_flight_metric_lines)
+metrics_registry.add_collector(write_batcher_metric_lines)
+metrics_registry.add_collector(admission_metric_lines)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 allowed_origins: list[str] = [
@@ -30,7 +100,7 @@ allowed_origins: list[str] = [
 app.include_router(router=v1_router, prefix="/api/v1")
 
 # 静的ファイルのマウント
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", static_assets, name="static")
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,5 +110,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Lambda で呼び出すASGIアプリのエントリポイント
-handler = Mangum(app)
+# 一定サイズ以上のJSONレスポンスを Accept-Encoding に応じて圧縮する（ストリーミングは対象外）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+# リードレプリカを使う場合、書き込んだクライアントの読み取りを一定時間プライマリに固定する
+if replica_configured():
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# リクエストごとのSQL回数・時間を Server-Timing ヘッダに出す
+app.add_middleware(QueryTimingMiddleware, strict=settings.query_budget_strict)
+# 混雑時は DB のプール待ちに溜めず、入口で待たせるか 429 / 503 で早めに断る
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionControlMiddleware, rate_limiter=make_rate_limiter())
+# 最後に追加したミドルウェアが最も外側になる。CORS を含めた処理時間を計測する
+app.add_middleware(MetricsMiddleware)
+
+
+def handler(event: dict, context: Any) -> dict:
+    """従来の Lambda ハンドラ設定（app.main.handler）向け。app.lambda_handler.handler に委ねる
+
+    この経路では先に app.main と設定が読み込まれるため、Lambda 向けの既定値は入らない。
+    新しく設定する場合は app.lambda_handler.handler を指定すること。
+    """
+    from app import lambda_handler
+
+    return lambda_handler.handler(event, context)
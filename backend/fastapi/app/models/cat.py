@@ -1,25 +1,34 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime
+from sqlalchemy import Column, String, Integer, Float, Index, literal_column
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.db.database import Base
+from app.db.types import Timestamp, ULIDType
 from app.utils.id_generator import generate_ulid
-from sqlalchemy import VARCHAR
 
 
 class Cat(Base):
     __tablename__ = "cats"
-
-    id: Mapped[str] = mapped_column(
-        VARCHAR(26),
-        index=True,
-        nullable=False,
-        unique=True,
-        default=generate_ulid,
-        primary_key=True,
+    # 一覧のフィルタ・並べ替え用。並べ替え列 + id でキーセットページングもインデックスで引く
+    __table_args__ = (
+        Index("ix_cats_breed_age", "breed", "age"),
+        Index("ix_cats_age_id", "age", "id"),
+        Index("ix_cats_weight_id", "weight", "id"),
+        Index("ix_cats_name_id", "name", "id"),
+        Index("ix_cats_created_at_id", "created_at", "id"),
+        # PostgreSQL は照合順序によって LIKE 'prefix%' に通常のインデックスを使えないため
+        Index("ix_cats_name_pattern", "name", postgresql_ops={"name": "text_pattern_ops"}).ddl_if(
+            dialect="postgresql"
+        ),
     )
+
+    # 主キーのインデックスだけで足りるので unique / index は付けない
+    id: Mapped[str] = mapped_column(ULIDType, default=generate_ulid, primary_key=True)
     name = Column(String, nullable=False)
     breed = Column(String, nullable=True)
     age = Column(Integer, nullable=True)
     weight = Column(Float, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    created_at = Column(Timestamp, server_default=func.now())
+    # 一覧の変更検知で max(updated_at) を引くためインデックスを張る
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), index=True)
+    # UPDATE のたびに1増える。updated_at は同じ秒の更新を見分けられないので ETag はこちらから作る
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from app.db.database import Base
+
+# 主キーに NULL は使えないため、品種・年齢が未設定の猫はこの値で数える
+UNKNOWN_BREED = ""
+UNKNOWN_AGE = -1
+
+
+class CatStats(Base):
+    """猫の集計表（品種 × 年齢ごとの頭数と体重の合計）
+
+    cats への書き込みと同じトランザクションで差分を加算して保つ。
+    統計の読み出しは行数が品種 × 年齢の組み合わせ数で済み、猫の数に依存しない。
+    """
+
+    __tablename__ = "cat_stats"
+
+    breed = Column(String, primary_key=True)
+    age = Column(Integer, primary_key=True)
+    cat_count = Column(Integer, nullable=False, default=0)
+    # 平均体重用。体重が未設定の猫は weight_count に含めない
+    weight_sum = Column(Float, nullable=False, default=0.0)
+    weight_count = Column(Integer, nullable=False, default=0)
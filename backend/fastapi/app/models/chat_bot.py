@@ -1,23 +1,29 @@
 from app.db.database import Base
+from app.db.types import Timestamp, ULIDType
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
-from sqlalchemy import DateTime, VARCHAR
+from sqlalchemy import Index, Integer, VARCHAR, literal_column
 from sqlalchemy.sql import func
 from app.utils.id_generator import generate_ulid
 
 
 class ChatBot(Base):
     __tablename__ = "chat_bots"
-
-    id: Mapped[str] = mapped_column(
-        VARCHAR(26),
-        index=True,
-        nullable=False,
-        unique=True,
-        default=generate_ulid,
-        primary_key=True,
+    # 一覧のフィルタ・並べ替え用（並べ替え列 + id でキーセットページング）
+    __table_args__ = (
+        Index("ix_chat_bots_name_id", "name", "id"),
+        Index("ix_chat_bots_color_id", "color", "id"),
+        Index("ix_chat_bots_created_at_id", "created_at", "id"),
     )
+
+    # 主キーのインデックスだけで足りるので unique / index は付けない
+    id: Mapped[str] = mapped_column(ULIDType, default=generate_ulid, primary_key=True)
     name: Mapped[str] = mapped_column(VARCHAR(255), nullable=False)
     color: Mapped[str] = mapped_column(VARCHAR(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now())
+    # 一覧の変更検知で max(updated_at) を引くためインデックスを張る
+    updated_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), onupdate=func.now(), index=True)
+    # UPDATE のたびに1増える。updated_at は同じ秒の更新を見分けられないので ETag はこちらから作る
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1")
+    )
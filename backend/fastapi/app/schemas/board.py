@@ -0,0 +1,17 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.bot import BotResponse
+from app.schemas.cat import CatResponse
+
+
+class BoardResponse(BaseModel):
+    """カンバンボードの表示に使うボットと猫の最初のページ
+
+    続きは各 next_cursor を /bot/?cursor=... と /cat/?cursor=... に渡して取得する。
+    """
+    bots: List[BotResponse]
+    cats: List[CatResponse]
+    bots_next_cursor: Optional[str] = None
+    cats_next_cursor: Optional[str] = None
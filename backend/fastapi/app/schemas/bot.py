@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -21,6 +21,8 @@ class BotResponse(BotBase):
     id: str
     created_at: datetime
     updated_at: datetime
+    # ETag 用の行のバージョン（レスポンスには含めない）
+    version: int = Field(1, exclude=True)
 
     class Config:
         from_attributes = True
@@ -28,6 +30,17 @@ class BotResponse(BotBase):
 
 class BotAllResponse(BaseModel):
     bots: list[BotResponse]
+    next_cursor: Optional[str] = None
+
+
+class BotFilter(BaseModel):
+    """一覧の絞り込み条件（クエリパラメータ）"""
+    name: Optional[str] = None
+    color: Optional[str] = None
+
+
+# 一覧の並べ替えに使える列（"-name" で降順）
+BOT_SORT_FIELDS = ("name", "created_at")
 
 
 class UpdateBotResponse(BaseModel):
@@ -35,6 +48,7 @@ class UpdateBotResponse(BaseModel):
     name: str
     color: str
     updated_at: datetime
+    version: int = Field(1, exclude=True)
 
     class Config:
         from_attributes = True
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import Generic, List, Optional, TypeVar
+
+# 1リクエストで扱える最大件数
+MAX_BULK_SIZE = 1000
+
+ItemT = TypeVar("ItemT")
+
+
+class BulkItemResult(BaseModel, Generic[ItemT]):
+    index: int
+    id: Optional[str] = None
+    status: int
+    detail: Optional[str] = None
+    item: Optional[ItemT] = None
+
+
+class BulkResponse(BaseModel, Generic[ItemT]):
+    results: List[BulkItemResult[ItemT]]
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_SIZE)
+
+
+class BulkDeleteResult(BaseModel):
+    index: int
+    id: str
+    status: int
+    detail: Optional[str] = None
+
+
+class BulkDeleteResponse(BaseModel):
+    results: List[BulkDeleteResult]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -18,6 +18,8 @@ class CatResponse(BaseModel):
     weight: Optional[float]
     created_at: datetime
     updated_at: Optional[datetime]
+    # ETag 用の行のバージョン（レスポンスには含めない）
+    version: int = Field(1, exclude=True)
     
     class Config:
         from_attributes = True
@@ -25,6 +27,42 @@ class CatResponse(BaseModel):
 
 class CatAllResponse(BaseModel):
     cats: List[CatResponse]
+    next_cursor: Optional[str] = None
+
+
+class CatFilter(BaseModel):
+    """一覧の絞り込み条件（クエリパラメータ）"""
+    breed: Optional[str] = None
+    age_min: Optional[int] = Field(None, ge=0)
+    age_max: Optional[int] = Field(None, ge=0)
+    weight_min: Optional[float] = Field(None, ge=0)
+    weight_max: Optional[float] = Field(None, ge=0)
+    name_prefix: Optional[str] = Field(None, min_length=1)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+# 一覧の並べ替えに使える列（"-age" で降順）
+CAT_SORT_FIELDS = ("name", "age", "weight", "created_at")
+
+
+class BreedStats(BaseModel):
+    breed: Optional[str]
+    count: int
+    average_weight: Optional[float]
+
+
+class AgeCount(BaseModel):
+    age: Optional[int]
+    count: int
+
+
+class CatStatsResponse(BaseModel):
+    """猫全体の統計（品種別の頭数・平均体重と年齢のヒストグラム）"""
+    total: int
+    average_weight: Optional[float]
+    breeds: List[BreedStats]
+    age_histogram: List[AgeCount]
 
 
 class UpdateCatRequest(BaseModel):
@@ -42,6 +80,7 @@ class UpdateCatResponse(BaseModel):
     weight: Optional[float]
     created_at: datetime
     updated_at: Optional[datetime]
+    version: int = Field(1, exclude=True)
     
     class Config:
         from_attributes = True
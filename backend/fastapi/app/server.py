@@ -0,0 +1,253 @@
+"""本番用のマルチワーカーサーバー
+
+    python -m app.server --host 0.0.0.0 --port 8000 [--workers N]
+
+親プロセスがアプリを読み込んで（静的ファイルの準備とスキーマ作成もここで1回だけ行う）
+待ち受けソケットを作り、ワーカーを fork する。ワーカーはそのソケットを共有して
+それぞれのイベントループで uvicorn を動かす（uvloop / httptools があれば使う）。
+DBエンジンは fork 後に各ワーカーで作る（app/db/database.py）ので、ワーカー間で
+接続を共有しない。
+
+SIGTERM / SIGINT を受けると各ワーカーに SIGTERM を送り、新しい接続の受け付けを止めて
+処理中のリクエストが終わるのを待つ（--graceful-timeout 秒を過ぎたら強制終了する）。
+終了したワーカーは作り直す。起動直後に終了したワーカーは間隔を倍にしながら作り直し、
+それが MAX_STARTUP_FAILURES 回続いたらサーバーごと終了コード 1 で終了する。
+"""
+import argparse
+import asyncio
+import importlib.util
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# ワーカーごとにプロセスが分かれるので、変更フィードはワーカー間で配信する。
+# Settings が読み込まれる前に既定値を入れる（環境変数で上書き可能）
+os.environ.setdefault("EVENTS_BACKEND", "unix")
+# 変更フィードでワーカー間の書き込みを無効化できるので、ID指定GETのキャッシュも既定で有効にする
+os.environ.setdefault("ENTITY_CACHE_ENABLED", "true")
+
+# 起動直後に終了したワーカーを作り直すまでの待ち時間（続けて失敗するたびに倍にする）
+RESPAWN_DELAY_SECONDS = 1.0
+MAX_RESPAWN_DELAY_SECONDS = 30.0
+# これより短い時間で終了したワーカーは起動に失敗したとみなす
+MIN_WORKER_LIFETIME_SECONDS = 10.0
+# 起動の失敗がこの回数続いたら作り直しをやめてサーバーごと異常終了する
+MAX_STARTUP_FAILURES = 5
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """このプロセスが使えるCPU数（CPUアフィニティとコンテナのCPU上限を考慮する）"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity が無いOS
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2 の "上限 周期"（上限なしは "max"）
+        quota, period = Path(cgroup_root, "cpu.max").read_text().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def respawn_delay(failures: int) -> float:
+    """起動の失敗が failures 回続いたワーカーを作り直すまでの秒数（指数バックオフ）"""
+    if failures <= 0:
+        return 0.0
+    return min(RESPAWN_DELAY_SECONDS * 2 ** (failures - 1), MAX_RESPAWN_DELAY_SECONDS)
+
+
+def _event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def _http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def _create_schema() -> None:
+    from app.db.database import Base, get_engine
+
+    engine = get_engine()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    finally:
+        await engine.dispose()
+
+
+def preload() -> Any:
+    """fork 前にアプリを読み込む（ワーカーはコピーオンライトで共有する）"""
+    from app.main import app, static_assets
+    from app.settings import settings
+
+    # ハッシュ付きの名前と圧縮版を fork 前に作っておく
+    static_assets.assets
+    if settings.create_schema_on_startup:
+        # ワーカーごとに create_all を同時に走らせない。エンジンは fork 後に作り直される
+        asyncio.run(_create_schema())
+        settings.create_schema_on_startup = False
+    return app
+
+
+def _run_worker(app: Any, sock: socket.socket, args: argparse.Namespace) -> int:
+    import uvicorn
+
+    from app.utils.logging import stop_listener
+
+    config = uvicorn.Config(
+        app,
+        loop=_event_loop(),
+        http=_http_protocol(),
+        lifespan="on",
+        access_log=False,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        stop_listener()
+    return 0 if server.started else 1
+
+
+class Supervisor:
+    """ワーカーの fork・作り直し・終了を管理する"""
+
+    def __init__(self, app: Any, sock: socket.socket, args: argparse.Namespace) -> None:
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, int] = {}  # pid -> ワーカー番号
+        self.started: Dict[int, float] = {}  # ワーカー番号 -> 起動時刻
+        self.failures: Dict[int, int] = {}  # ワーカー番号 -> 続けて起動に失敗した回数
+        self.stopping = False
+        self.exit_code = 0
+        self.pid = os.getpid()
+
+    def spawn(self, number: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                # 親のシグナルハンドラを外す（uvicorn が SIGTERM / SIGINT で終了処理をする）
+                for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+                    signal.signal(signum, signal.SIG_DFL)
+                code = _run_worker(self.app, self.sock, self.args)
+            finally:
+                # 親の呼び出し元に戻らないよう、例外でもここで終了する
+                os._exit(code)
+        self.workers[pid] = number
+        self.started[number] = time.monotonic()
+
+    def stop(self, signum: int, frame: Optional[Any] = None) -> None:
+        # fork 直後、ハンドラを外す前の子プロセスに届いた場合は何もしない
+        if self.stopping or os.getpid() != self.pid:
+            return
+        self.stopping = True
+        self.signal_workers(signal.SIGTERM)
+        # 猶予を過ぎても終わらないワーカーは強制終了する
+        signal.alarm(int(self.args.graceful_timeout) + 5)
+
+    def kill(self, signum: int, frame: Optional[Any] = None) -> None:
+        if os.getpid() == self.pid:
+            self.signal_workers(signal.SIGKILL)
+
+    def signal_workers(self, signum: int) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        from app.utils.logging import logger
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGALRM, self.kill)
+        for number in range(self.args.workers):
+            self.spawn(number)
+        logger.info(
+            f"サーバーを起動しました: pid={os.getpid()} workers={self.args.workers} loop={_event_loop()} "
+            f"http={_http_protocol()} listening on {self.args.host}:{self.args.port}"
+        )
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            number = self.workers.pop(pid, None)
+            if number is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - self.started[number] < MIN_WORKER_LIFETIME_SECONDS:
+                self.failures[number] = self.failures.get(number, 0) + 1
+            else:
+                self.failures[number] = 0
+            failures = self.failures[number]
+            if failures >= MAX_STARTUP_FAILURES:
+                logger.error(
+                    f"ワーカー {number} (pid={pid}) が起動直後に{failures}回続けて終了したため、サーバーを停止します",
+                    exc_info=False,
+                )
+                self.exit_code = 1
+                self.stop(signal.SIGTERM)
+                continue
+            delay = respawn_delay(failures)
+            logger.warning(f"ワーカー {number} (pid={pid}) が終了コード {code} で終了しました。{delay:g}秒後に作り直します")
+            time.sleep(delay)
+            if not self.stopping:
+                self.spawn(number)
+        signal.alarm(0)
+        return self.exit_code
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "0")),
+        help="ワーカー数（既定: 使えるCPU数）",
+    )
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5, help="keep-alive の待ち時間（秒）")
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=30, help="終了時に処理中のリクエストを待つ秒数",
+    )
+    parser.add_argument("--forwarded-allow-ips", default=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    args = parser.parse_args(argv)
+    if args.workers <= 0:
+        args.workers = available_cpus()
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    app = preload()
+    sock = _bind(args.host, args.port, args.backlog)
+    return Supervisor(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
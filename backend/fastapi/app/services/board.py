@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.statements import version_columns
+from app.models.cat import Cat
+from app.models.chat_bot import ChatBot
+from app.schemas.board import BoardResponse
+from app.schemas.bot import BotAllResponse
+from app.schemas.cat import CatAllResponse
+from app.services.cat import CatService
+from app.services.chat_bot import ChatBotService
+from app.utils.logging import HOT_PATH, logger
+from app.utils.pagination import DEFAULT_PAGE_SIZE
+
+
+class BoardService:
+    @staticmethod
+    async def get_board_version(db: AsyncSession) -> Tuple[Tuple[Any, ...], Optional[datetime]]:
+        """ボットと猫それぞれの (件数, version の合計, 最大ID) と、両方の最終更新日時を
+        1回のSELECTで取得する（変更検知用）"""
+        result = await db.execute(
+            select(
+                *(select(column).scalar_subquery() for column in version_columns(ChatBot)),
+                *(select(column).scalar_subquery() for column in version_columns(Cat)),
+            )
+        )
+        row = result.one()
+        bots_version, bots_modified = tuple(row[:3]), row[3]
+        cats_version, cats_modified = tuple(row[4:7]), row[7]
+        last_modified = max(
+            (value for value in (bots_modified, cats_modified) if value is not None), default=None
+        )
+        return bots_version + cats_version, last_modified
+
+    @staticmethod
+    async def get_board(session_factory: Any, limit: int = DEFAULT_PAGE_SIZE) -> BoardResponse:
+        """ボットと猫それぞれの最初の limit 件（ID順）を別々のセッションで同時に読み込む
+
+        1つのセッション（コネクション）では文を並行に実行できないため、
+        それぞれがファクトリからセッションを開く。
+        """
+
+        async def load_bots() -> BotAllResponse:
+            async with session_factory() as session:
+                return await ChatBotService.get_all_bots(session, limit=limit)
+
+        async def load_cats() -> CatAllResponse:
+            async with session_factory() as session:
+                return await CatService.get_all_cats(session, limit=limit)
+
+        try:
+            bots, cats = await asyncio.gather(load_bots(), load_cats())
+            logger.info(f"ボードを取得しました: ボット{len(bots.bots)}件, 猫{len(cats.cats)}匹", extra=HOT_PATH)
+            return BoardResponse(
+                bots=bots.bots,
+                cats=cats.cats,
+                bots_next_cursor=bots.next_cursor,
+                cats_next_cursor=cats.next_cursor,
+            )
+        except Exception as e:
+            logger.error(f"ボードの取得中にエラーが発生しました: {str(e)}")
+            raise e
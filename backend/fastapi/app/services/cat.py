@@ -1,17 +1,44 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import delete, insert, inspect, select, update
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
+from app.db.statements import delete_returning, update_returning, version_columns
 from app.models.cat import Cat
 from app.schemas.cat import (
     CatCreate,
+    CatStatsResponse,
+    CatFilter,
     CatResponse,
     CatAllResponse,
     UpdateCatRequest,
     UpdateCatResponse,
     DeleteCatResponse,
 )
-from app.utils.logging import logger
+from app.services.cat_stats import STATS_FIELDS, CatStatsService, stats_values
+from app.utils.filtering import FilterSpec, apply_filters, parse_sort
+from app.utils.id_generator import generate_ulids
+from app.utils.logging import HOT_PATH, logger
+from app.utils.pagination import DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, keyset_page, split_page
+
+# CatFilter の項目と WHERE 句の対応
+CAT_FILTERS: FilterSpec = {
+    "breed": (Cat.breed, "eq"),
+    "age_min": (Cat.age, "ge"),
+    "age_max": (Cat.age, "le"),
+    "weight_min": (Cat.weight, "ge"),
+    "weight_max": (Cat.weight, "le"),
+    "name_prefix": (Cat.name, "prefix"),
+    "created_after": (Cat.created_at, "ge"),
+    "created_before": (Cat.created_at, "lt"),
+}
+# CAT_SORT_FIELDS の列
+CAT_SORT_COLUMNS = {
+    "name": Cat.name,
+    "age": Cat.age,
+    "weight": Cat.weight,
+    "created_at": Cat.created_at,
+}
 
 
 class CatService:
@@ -21,9 +48,16 @@ class CatService:
         try:
             new_cat = Cat(**cat_data.model_dump())
             db.add(new_cat)
+            # 集計表も同じトランザクションで更新する
+            await CatStatsService.record_changes(
+                db, added=[(cat_data.breed, cat_data.age, cat_data.weight)]
+            )
             await db.commit()
-            await db.refresh(new_cat)
-            
+            # サーバー側の既定値は INSERT ... RETURNING で取得済み。
+            # RETURNING 非対応の方言でだけ読み直す
+            if inspect(new_cat).expired_attributes:
+                await db.refresh(new_cat)
+
             logger.info(f"猫を作成しました: {new_cat.id}")
             return CatResponse.model_validate(new_cat)
         except Exception as e:
@@ -32,20 +66,51 @@ class CatService:
             raise e
 
     @staticmethod
-    async def get_all_cats(db: AsyncSession) -> CatAllResponse:
-        """すべての猫を取得する"""
+    async def get_all_cats(
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        filters: Optional[CatFilter] = None,
+        sort: Optional[str] = None,
+    ) -> CatAllResponse:
+        """猫を絞り込み・並べ替えて1ページ分取得する（既定はID順）"""
         try:
-            result = await db.execute(select(Cat))
-            cats = result.scalars().all()
+            sort_column, descending, sort_key = parse_sort(sort, CAT_SORT_COLUMNS)
+            stmt = apply_filters(select(Cat), filters, CAT_FILTERS)
+            result = await db.execute(
+                keyset_page(stmt, Cat.id, cursor, limit, sort_column, descending)
+            )
+            cats, next_cursor = split_page(result.scalars().all(), limit, sort_key)
             
             cat_responses = [CatResponse.model_validate(cat) for cat in cats]
-            logger.info(f"{len(cat_responses)}匹の猫を取得しました")
+            logger.info(f"{len(cat_responses)}匹の猫を取得しました", extra=HOT_PATH)
             
-            return CatAllResponse(cats=cat_responses)
+            return CatAllResponse(cats=cat_responses, next_cursor=next_cursor)
         except Exception as e:
             logger.error(f"猫の取得中にエラーが発生しました: {str(e)}")
             raise e
 
+    @staticmethod
+    async def get_cats_version(db: AsyncSession) -> Tuple[Tuple[Any, ...], Optional[datetime]]:
+        """一覧の変更検知用に (件数, version の合計, 最大ID) と最終更新日時だけを取得する"""
+        result = await db.execute(select(*version_columns(Cat)))
+        *version, last_modified = result.one()
+        return tuple(version), last_modified
+
+    @staticmethod
+    async def stream_cats(
+        db: AsyncSession,
+        batch_size: int = STREAM_BATCH_SIZE,
+        filters: Optional[CatFilter] = None,
+    ) -> AsyncIterator[CatResponse]:
+        """サーバーサイドカーソルで条件に合う全件を1件ずつ返す"""
+        stmt = apply_filters(select(Cat), filters, CAT_FILTERS)
+        result = await db.stream(
+            stmt.order_by(Cat.id).execution_options(yield_per=batch_size)
+        )
+        async for cat in result.scalars():
+            yield CatResponse.model_validate(cat)
+
     @staticmethod
     async def get_cat_by_id(db: AsyncSession, cat_id: str) -> CatResponse:
         """IDで猫を取得する"""
@@ -65,21 +130,31 @@ class CatService:
     async def update_cat(
         cat_id: str, update_data: UpdateCatRequest, db: AsyncSession
     ) -> UpdateCatResponse:
-        """猫の情報を更新する"""
+        """猫の情報を更新する（UPDATE ... RETURNING の1往復）"""
         try:
-            result = await db.execute(select(Cat).where(Cat.id == cat_id))
-            cat = result.scalar_one_or_none()
+            update_dict = update_data.model_dump(exclude_unset=True)
+            before = None
+            if STATS_FIELDS.intersection(update_dict):
+                # 集計表の差分に更新前の値が要る。同時更新で差分がずれないよう行をロックする
+                result = await db.execute(
+                    select(Cat.breed, Cat.age, Cat.weight).where(Cat.id == cat_id).with_for_update()
+                )
+                before = result.one_or_none()
+            if update_dict:
+                cat = await update_returning(db, Cat, cat_id, update_dict)
+            else:
+                # 更新項目が無ければ現在の値を返すだけ
+                result = await db.execute(select(Cat).where(Cat.id == cat_id))
+                cat = result.scalar_one_or_none()
             
             if not cat:
                 raise ValueError(f"ID {cat_id} の猫が見つかりません")
             
-            # 更新データを適用
-            update_dict = update_data.model_dump(exclude_unset=True)
-            for field, value in update_dict.items():
-                setattr(cat, field, value)
-            
+            if before is not None:
+                await CatStatsService.record_changes(
+                    db, removed=[stats_values(before)], added=[stats_values(cat)]
+                )
             await db.commit()
-            await db.refresh(cat)
             
             logger.info(f"猫を更新しました: {cat_id}")
             return UpdateCatResponse.model_validate(cat)
@@ -90,15 +165,14 @@ class CatService:
 
     @staticmethod
     async def delete_cat(cat_id: str, db: AsyncSession) -> DeleteCatResponse:
-        """猫を削除する"""
+        """猫を削除する（DELETE ... RETURNING の1往復）"""
         try:
-            result = await db.execute(select(Cat).where(Cat.id == cat_id))
-            cat = result.scalar_one_or_none()
+            cat = await delete_returning(db, Cat, cat_id)
             
             if not cat:
                 raise ValueError(f"ID {cat_id} の猫が見つかりません")
             
-            await db.delete(cat)
+            await CatStatsService.record_changes(db, removed=[stats_values(cat)])
             await db.commit()
             
             logger.info(f"猫を削除しました: {cat_id}")
@@ -109,4 +183,111 @@ class CatService:
         except Exception as e:
             await db.rollback()
             logger.error(f"猫の削除中にエラーが発生しました: {str(e)}")
-            raise e
\ No newline at end of file
+            raise e
+
+    @staticmethod
+    async def create_cats(db: AsyncSession, cats_data: List[CatCreate]) -> List[CatResponse]:
+        """複数の猫を1回の INSERT ... RETURNING で作成する"""
+        try:
+            result = await db.scalars(
+                insert(Cat).returning(Cat, sort_by_parameter_order=True),
+                # IDは連続したブロックで払い出す（主キーのインデックスの末尾に順に入る）
+                [
+                    {"id": cat_id, **cat_data.model_dump()}
+                    for cat_id, cat_data in zip(generate_ulids(len(cats_data)), cats_data)
+                ],
+            )
+            cats = result.all()
+            await CatStatsService.record_changes(db, added=[stats_values(cat) for cat in cats])
+            await db.commit()
+
+            logger.info(f"{len(cats)}匹の猫を一括作成しました")
+            return [CatResponse.model_validate(cat) for cat in cats]
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"猫の一括作成中にエラーが発生しました: {str(e)}")
+            raise e
+
+    @staticmethod
+    async def update_cats(
+        db: AsyncSession, updates: List[Tuple[str, UpdateCatRequest]]
+    ) -> Dict[str, UpdateCatResponse]:
+        """複数の猫を1トランザクションで更新する。存在しないIDは結果に含まれない"""
+        try:
+            ids = {cat_id for cat_id, _ in updates}
+            # 集計表の差分用に更新前の値も読み、行をロックしておく
+            result = await db.execute(
+                select(Cat.id, Cat.breed, Cat.age, Cat.weight)
+                .where(Cat.id.in_(ids))
+                .with_for_update()
+            )
+            before = {row.id: stats_values(row) for row in result}
+            existing = set(before)
+
+            # 主キー指定の一括UPDATE（executemany）
+            params = [
+                {"id": cat_id, **update_data.model_dump(exclude_unset=True)}
+                for cat_id, update_data in updates
+                if cat_id in existing
+            ]
+            params = [row for row in params if len(row) > 1]
+            if params:
+                await db.execute(update(Cat), params)
+
+            result = await db.scalars(
+                select(Cat)
+                .where(Cat.id.in_(existing))
+                .execution_options(populate_existing=True)
+            )
+            updated = {cat.id: UpdateCatResponse.model_validate(cat) for cat in result}
+            await CatStatsService.record_changes(
+                db,
+                removed=[before[cat_id] for cat_id in updated],
+                added=[stats_values(cat) for cat in updated.values()],
+            )
+            await db.commit()
+
+            logger.info(f"{len(updated)}匹の猫を一括更新しました")
+            return updated
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"猫の一括更新中にエラーが発生しました: {str(e)}")
+            raise e
+
+    @staticmethod
+    async def delete_cats(db: AsyncSession, cat_ids: List[str]) -> Set[str]:
+        """複数の猫を1回の DELETE で削除し、削除できたIDを返す"""
+        try:
+            stmt = delete(Cat).where(Cat.id.in_(set(cat_ids)))
+            # 集計表の差分用に削除した猫の値も返す
+            columns = (Cat.id, Cat.breed, Cat.age, Cat.weight)
+            if db.get_bind().dialect.delete_returning:
+                result = await db.execute(
+                    stmt.returning(*columns).execution_options(synchronize_session=False)
+                )
+                rows = result.all()
+            else:
+                result = await db.execute(
+                    select(*columns).where(Cat.id.in_(set(cat_ids))).with_for_update()
+                )
+                rows = result.all()
+                await db.execute(stmt.execution_options(synchronize_session=False))
+            deleted = {row.id for row in rows}
+            await CatStatsService.record_changes(db, removed=[stats_values(row) for row in rows])
+            await db.commit()
+
+            logger.info(f"{len(deleted)}匹の猫を一括削除しました")
+            return deleted
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"猫の一括削除中にエラーが発生しました: {str(e)}")
+            raise e
+
+    @staticmethod
+    async def get_cat_stats(db: AsyncSession) -> CatStatsResponse:
+        """品種別の頭数・平均体重と年齢のヒストグラムを集計表から取得する"""
+        try:
+            return await CatStatsService.get_stats(db)
+        except Exception as e:
+            logger.error(f"猫の統計の取得中にエラーが発生しました: {str(e)}")
+            raise e
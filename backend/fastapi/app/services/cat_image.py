@@ -1,44 +1,193 @@
-import httpx
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Deque, List, Optional
+
 from fastapi import HTTPException
 
+from app.settings import settings
+from app.utils.logging import logger
+
+if TYPE_CHECKING:
+    # httpx（と httpcore）は import が重いので、実際に外部APIを呼ぶまで読み込まない
+    import httpx
+
 THE_CAT_API_URL = "https://api.thecatapi.com/v1/images/search"
+REQUEST_TIMEOUT_SECONDS = 10.0
+
+
+def create_http_client(transport: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncClient":
+    """アプリ全体で使い回す外部API用クライアント（接続はプールされ keep-alive される）"""
+    import httpx
+
+    return httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        transport=transport,
+    )
+
+
+async def fetch_cat_image_urls(client: "httpx.AsyncClient", limit: int = 1) -> List[str]:
+    """検索APIから画像URLを最大 limit 件取得する"""
+    import httpx
+
+    try:
+        response = await client.get(THE_CAT_API_URL, params={"limit": limit})
+        response.raise_for_status()
+        data = response.json()
+
+        # APIレスポンスの基本チェック
+        if not data or not isinstance(data, list):
+            raise HTTPException(
+                status_code=503,
+                detail="External service returned unexpected response",
+            )
+
+        # URLが含まれている画像だけを使う
+        urls = [image["url"] for image in data if isinstance(image, dict) and image.get("url")]
+        if not urls:
+            raise HTTPException(
+                status_code=503,
+                detail="External service returned unexpected response",
+            )
+
+        return urls
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError:
+        raise HTTPException(
+            status_code=503,
+            detail="External cat image service is temporarily unavailable",
+        )
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=503, detail="Failed to connect to cat image service"
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred while fetching cat image",
+        )
+
+
+class CatImagePrefetcher:
+    """画像URLをまとめて先読みし、メモリ上のキューから払い出す
+
+    キューが low_water 件を下回るとバックグラウンドで batch_size 件ずつ
+    capacity 件まで補充する。キューが空のときに補充の取得が進行中なら、
+    リクエスト経路では取得し直さずにその結果を待つ。
+    """
+
+    def __init__(
+        self,
+        client: "httpx.AsyncClient",
+        batch_size: int = 10,
+        low_water: int = 5,
+        capacity: int = 50,
+    ) -> None:
+        self._client = client
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.capacity = capacity
+        self._queue: Deque[str] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        # 補充で進行中の1回分の取得（完了時にはキューへの追加まで済んでいる）
+        self._fetching: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        self._maybe_refill()
+
+    async def stop(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+    async def get(self) -> str:
+        fetching = self._fetching
+        if not self._queue and fetching is not None and not fetching.done():
+            # 例外は補充側で処理する。待つのをやめても補充は取り消さない
+            await asyncio.wait([fetching])
+        if not self._queue:
+            # 補充が無いか失敗したときだけリクエスト経路で取得し、余りは貯めておく
+            urls = await fetch_cat_image_urls(self._client, limit=self.batch_size)
+            self._push(urls[1:])
+            self._maybe_refill()
+            return urls[0]
+        url = self._queue.popleft()
+        self._maybe_refill()
+        return url
+
+    def _maybe_refill(self) -> None:
+        if len(self._queue) >= self.low_water:
+            return
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        self._refill_task = asyncio.create_task(self._refill())
+
+    def _push(self, urls: List[str]) -> None:
+        # API が limit より多く返しても capacity を超えて貯めない
+        self._queue.extend(urls[: max(0, self.capacity - len(self._queue))])
+
+    async def _fetch_batch(self) -> None:
+        limit = min(self.batch_size, self.capacity - len(self._queue))
+        if limit > 0:
+            self._push(await fetch_cat_image_urls(self._client, limit=limit))
+
+    async def _refill(self) -> None:
+        while len(self._queue) < self.capacity:
+            self._fetching = asyncio.ensure_future(self._fetch_batch())
+            try:
+                await self._fetching
+            except HTTPException as e:
+                # 次回の払い出し時に再試行する
+                logger.warning(f"猫画像の先読みに失敗しました: {e.detail}")
+                return
 
 
 class CatImageService:
+    def __init__(
+        self,
+        client: Optional["httpx.AsyncClient"] = None,
+        prefetcher: Optional[CatImagePrefetcher] = None,
+    ) -> None:
+        self._client = client
+        self._prefetcher = prefetcher
+
+    @classmethod
+    def create(cls, transport: Optional["httpx.AsyncBaseTransport"] = None) -> "CatImageService":
+        """共有クライアントと（設定で有効なら）先読みキューを持つサービスを作る"""
+        client = create_http_client(transport)
+        prefetcher = None
+        if settings.cat_image_prefetch_enabled:
+            prefetcher = CatImagePrefetcher(
+                client,
+                batch_size=settings.cat_image_prefetch_batch_size,
+                low_water=settings.cat_image_prefetch_low_water,
+                capacity=settings.cat_image_prefetch_capacity,
+            )
+        return cls(client=client, prefetcher=prefetcher)
+
+    def start(self) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.start()
+
+    async def aclose(self) -> None:
+        if self._prefetcher is not None:
+            await self._prefetcher.stop()
+        if self._client is not None:
+            await self._client.aclose()
+
     async def get_cat_image_url(self) -> str:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(THE_CAT_API_URL)
-                response.raise_for_status()
-                data = response.json()
-
-                # APIレスポンスの基本チェック
-                if not data or not isinstance(data, list):
-                    raise HTTPException(
-                        status_code=503,
-                        detail="External service returned unexpected response",
-                    )
-
-                # 最初の画像データにURLが含まれているかチェック
-                first_image = data[0]
-                if not first_image.get("url"):
-                    raise HTTPException(
-                        status_code=503,
-                        detail="External service returned unexpected response",
-                    )
-
-                return first_image["url"]
-            except httpx.HTTPStatusError:
-                raise HTTPException(
-                    status_code=503,
-                    detail="External cat image service is temporarily unavailable",
-                )
-            except httpx.RequestError:
-                raise HTTPException(
-                    status_code=503, detail="Failed to connect to cat image service"
-                )
-            except Exception:
-                raise HTTPException(
-                    status_code=500,
-                    detail="An unexpected error occurred while fetching cat image",
-                )
+        if self._prefetcher is not None:
+            return await self._prefetcher.get()
+        if self._client is not None:
+            return (await fetch_cat_image_urls(self._client))[0]
+        # アプリの起動処理を通っていない場合（単体利用など）は都度クライアントを作る
+        async with create_http_client() as client:
+            return (await fetch_cat_image_urls(client))[0]
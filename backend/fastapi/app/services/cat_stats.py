@@ -0,0 +1,127 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.statements import upsert_increment
+from app.models.cat import Cat
+from app.models.cat_stats import UNKNOWN_AGE, UNKNOWN_BREED, CatStats
+from app.schemas.cat import AgeCount, BreedStats, CatStatsResponse
+from app.utils.logging import logger
+
+# 集計に使う猫の値 (breed, age, weight)
+CatValues = Tuple[Optional[str], Optional[int], Optional[float]]
+
+# これらの項目が変わる更新だけが集計表に影響する
+STATS_FIELDS = frozenset({"breed", "age", "weight"})
+
+
+def stats_values(cat: Any) -> CatValues:
+    """猫（ORMの行・Rowどちらでも）から集計に使う値を取り出す"""
+    return cat.breed, cat.age, cat.weight
+
+
+def _average(total: float, count: int) -> Optional[float]:
+    return total / count if count else None
+
+
+class CatStatsService:
+    @staticmethod
+    async def record_changes(
+        db: AsyncSession,
+        removed: Iterable[CatValues] = (),
+        added: Iterable[CatValues] = (),
+    ) -> None:
+        """猫の削除分・追加分を集計表に加算する（コミットは呼び出し側）
+
+        更新は「古い値を削除して新しい値を追加」として渡す。キーごとに差分をまとめ、
+        差分が無ければSQLは発行しない。
+        """
+        # (breed, age) -> [頭数, 体重の合計, 体重のある頭数]
+        deltas: Dict[Tuple[str, int], List[float]] = defaultdict(lambda: [0, 0.0, 0])
+        for sign, cats in ((-1, removed), (1, added)):
+            for breed, age, weight in cats:
+                key = (
+                    breed if breed is not None else UNKNOWN_BREED,
+                    age if age is not None else UNKNOWN_AGE,
+                )
+                delta = deltas[key]
+                delta[0] += sign
+                if weight is not None:
+                    delta[1] += sign * weight
+                    delta[2] += sign
+
+        rows = [
+            {"breed": breed, "age": age, "cat_count": count, "weight_sum": weight_sum, "weight_count": weight_count}
+            for (breed, age), (count, weight_sum, weight_count) in deltas.items()
+            if count or weight_sum or weight_count
+        ]
+        await upsert_increment(db, CatStats, rows, ("breed", "age"))
+
+    @staticmethod
+    async def get_stats(db: AsyncSession) -> CatStatsResponse:
+        """集計表から統計を組み立てる（品種 × 年齢の行数分だけ読む）"""
+        result = await db.scalars(select(CatStats).where(CatStats.cat_count > 0))
+
+        total = weight_count = 0
+        weight_sum = 0.0
+        breeds: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0])
+        ages: Dict[int, int] = defaultdict(int)
+        for row in result:
+            total += row.cat_count
+            weight_sum += row.weight_sum
+            weight_count += row.weight_count
+            breed = breeds[row.breed]
+            breed[0] += row.cat_count
+            breed[1] += row.weight_sum
+            breed[2] += row.weight_count
+            ages[row.age] += row.cat_count
+
+        return CatStatsResponse(
+            total=total,
+            average_weight=_average(weight_sum, weight_count),
+            breeds=[
+                BreedStats(
+                    breed=None if breed == UNKNOWN_BREED else breed,
+                    count=count,
+                    average_weight=_average(breed_weight_sum, breed_weight_count),
+                )
+                for breed, (count, breed_weight_sum, breed_weight_count) in sorted(breeds.items())
+            ],
+            age_histogram=[
+                AgeCount(age=None if age == UNKNOWN_AGE else age, count=count)
+                for age, count in sorted(ages.items(), key=lambda item: (item[0] == UNKNOWN_AGE, item[0]))
+            ],
+        )
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """cats テーブルを集計し直して集計表を作り直す（ずれの修正用）。作成した行数を返す"""
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                # 作り直している間に cats への書き込みが混ざらないようにする（読み取りは止めない）
+                await db.execute(text("LOCK TABLE cats IN SHARE MODE"))
+            breed = func.coalesce(Cat.breed, UNKNOWN_BREED)
+            age = func.coalesce(Cat.age, UNKNOWN_AGE)
+            await db.execute(delete(CatStats))
+            result = await db.execute(
+                insert(CatStats).from_select(
+                    ["breed", "age", "cat_count", "weight_sum", "weight_count"],
+                    select(
+                        breed,
+                        age,
+                        func.count(),
+                        func.coalesce(func.sum(Cat.weight), 0.0),
+                        func.count(Cat.weight),
+                    ).group_by(breed, age),
+                )
+            )
+            await db.commit()
+
+            logger.info(f"猫の集計表を作り直しました: {result.rowcount}行")
+            return result.rowcount
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"猫の集計表の作り直し中にエラーが発生しました: {str(e)}")
+            raise e
@@ -1,6 +1,10 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.bot import (
     BotCreate,
+    BotFilter,
     BotResponse,
     BotAllResponse,
     UpdateBotResponse,
@@ -9,6 +13,7 @@ from app.schemas.bot import (
 )
 from app.cruds.chat_bot import ChatBotCRUD
 from app.utils.logging import logger
+from app.utils.pagination import DEFAULT_PAGE_SIZE
 
 
 class ChatBotService:
@@ -19,20 +24,37 @@ class ChatBotService:
     ) -> BotResponse:
         try:
             bot_data = await ChatBotCRUD.create_chat_bot(session, bot)
-            return bot_data
+            return BotResponse.model_validate(bot_data)
         except Exception as e:
             logger.error(f"ボット作成中にエラーが発生しました: {str(e)}")
             raise e
 
     @staticmethod
-    async def get_all_bots(session: AsyncSession) -> BotAllResponse:
+    async def get_all_bots(
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        filters: Optional[BotFilter] = None,
+        sort: Optional[str] = None,
+    ) -> BotAllResponse:
         try:
-            bots = await ChatBotCRUD.get_all_bots(session)
-            return BotAllResponse(bots=bots)
+            bots, next_cursor = await ChatBotCRUD.get_all_bots(session, cursor, limit, filters, sort)
+            return BotAllResponse(bots=bots, next_cursor=next_cursor)
         except Exception as e:
             logger.error(f"ボット取得中にエラーが発生しました: {str(e)}")
             raise e
             
+    @staticmethod
+    async def get_bots_version(session: AsyncSession) -> tuple[tuple[Any, ...], Optional[datetime]]:
+        return await ChatBotCRUD.get_version(session)
+
+    @staticmethod
+    async def stream_bots(
+        session: AsyncSession, filters: Optional[BotFilter] = None
+    ) -> AsyncIterator[BotResponse]:
+        async for bot in ChatBotCRUD.stream_bots(session, filters=filters):
+            yield BotResponse.model_validate(bot)
+
     @staticmethod
     async def get_bot_by_id(session: AsyncSession, bot_id: str) -> BotResponse:
         try:
@@ -49,11 +71,6 @@ class ChatBotService:
         bot_id: str, request: UpdateBotRequest, session: AsyncSession
     ) -> UpdateBotResponse:
         try:
-            # ボットの存在確認
-            bot = await ChatBotCRUD.get_bot_by_id(bot_id, session)
-            if not bot:
-                raise ValueError(f"ID {bot_id} のボットが見つかりません")
-                
             # Only update fields that are provided
             update_data = {}
             if request.name is not None:
@@ -63,14 +80,17 @@ class ChatBotService:
                 
             if not update_data:
                 # No updates requested, return current bot
-                return UpdateBotResponse.model_validate(bot)
-                
-            update_bot = await ChatBotCRUD.update_bot(
-                bot_id=bot_id,
-                session=session,
-                **update_data
-            )
-            return update_bot
+                bot = await ChatBotCRUD.get_bot_by_id(bot_id, session)
+            else:
+                # 存在確認を兼ねた UPDATE ... RETURNING
+                bot = await ChatBotCRUD.update_bot(
+                    bot_id=bot_id,
+                    session=session,
+                    **update_data
+                )
+            if not bot:
+                raise ValueError(f"ID {bot_id} のボットが見つかりません")
+            return UpdateBotResponse.model_validate(bot)
         except ValueError as e:
             raise e
         except Exception as e:
@@ -80,17 +100,52 @@ class ChatBotService:
     @staticmethod
     async def delete_bot(bot_id: str, session: AsyncSession) -> DeleteBotResponse:
         try:
-            # ボットの存在確認
-            bot = await ChatBotCRUD.get_bot_by_id(bot_id, session)
-            if not bot:
-                raise ValueError(f"ID {bot_id} のボットが見つかりません")
-                
+            # 存在確認を兼ねた DELETE ... RETURNING
             delete_bot = await ChatBotCRUD.delete_bot(
                 bot_id=bot_id, session=session
             )
+            if not delete_bot:
+                raise ValueError(f"ID {bot_id} のボットが見つかりません")
             return DeleteBotResponse(id=bot_id)
         except ValueError as e:
             raise e
         except Exception as e:
             logger.error(f"ボット削除中にエラーが発生しました: {str(e)}")
             raise e
+
+    @staticmethod
+    async def create_chat_bots(
+        session: AsyncSession, bots: list[BotCreate]
+    ) -> list[BotResponse]:
+        try:
+            new_bots = await ChatBotCRUD.create_chat_bots(session, bots)
+            return [BotResponse.model_validate(bot) for bot in new_bots]
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"ボット一括作成中にエラーが発生しました: {str(e)}")
+            raise e
+
+    @staticmethod
+    async def update_bots(
+        session: AsyncSession, requests: list[tuple[str, UpdateBotRequest]]
+    ) -> dict[str, UpdateBotResponse]:
+        try:
+            updates = [
+                {"id": bot_id, **request.model_dump(exclude_none=True)}
+                for bot_id, request in requests
+            ]
+            bots = await ChatBotCRUD.update_bots(session, updates)
+            return {bot.id: UpdateBotResponse.model_validate(bot) for bot in bots}
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"ボット一括更新中にエラーが発生しました: {str(e)}")
+            raise e
+
+    @staticmethod
+    async def delete_bots(session: AsyncSession, bot_ids: list[str]) -> set[str]:
+        try:
+            return await ChatBotCRUD.delete_bots(session, bot_ids)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"ボット一括削除中にエラーが発生しました: {str(e)}")
+            raise e
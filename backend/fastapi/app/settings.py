@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -8,6 +10,77 @@ class Settings(BaseSettings):
     ai_bot_db_host: str
     ai_bot_cloud_sql_connection_name: str
     environment: str = "development"
+    # 接続先URLを直接指定する場合（テスト・ベンチマーク用）
+    database_url: Optional[str] = None
+    # 読み取り専用のレプリカ（app/db/replica.py）。未設定なら読み取りもプライマリで行う
+    read_database_url: Optional[str] = None
+    # 書き込んだクライアントの読み取りをこの秒数だけプライマリに固定する（レプリカの遅延より長く）
+    read_your_writes_seconds: float = 5.0
+    # 起動時に Base.metadata.create_all を実行する（Lambda では無効。app/lambda_handler.py）
+    create_schema_on_startup: bool = True
+    # DBエンジンのプロファイル: server / lambda / test（app/db/engine.py）
+    db_engine_profile: str = "server"
+    # プロファイルの値を個別に上書きする場合のみ指定
+    db_pool_size: Optional[int] = None
+    db_max_overflow: Optional[int] = None
+    db_pool_timeout: Optional[float] = None
+    db_pool_recycle: Optional[int] = None
+    db_statement_cache_size: Optional[int] = None
+    # ログ出力（app/utils/logging.py）: json / text
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    # 同じ箇所からのエラーはこの秒数に1回だけトレースバック付きで出し、残りは件数のみ
+    log_error_dedup_seconds: float = 60.0
+    # hot_path を付けたINFOログを出す割合
+    log_hot_path_sample_rate: float = 0.01
+    # ルートで宣言したクエリ数の上限を超えたらエラーにする（テスト用。通常は警告ログのみ）
+    query_budget_strict: bool = False
+    # JSONレスポンスの圧縮（app/utils/compression.py）。このバイト数未満は圧縮しない
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    # 変更フィード（app/utils/broadcast.py）: memory（プロセス内）/ unix（同じホストのワーカー間）
+    events_backend: str = "memory"
+    events_socket_dir: str = "/tmp/app-events"
+    # 購読者ごとのキューの上限。溢れた購読者には resync を送る
+    events_queue_size: int = 256
+    # 再接続時（Last-Event-ID）に再送できるイベント数
+    events_history_size: int = 1000
+    events_heartbeat_seconds: float = 15.0
+    # ID指定GETのインプロセスキャッシュ（LRU + TTL）。他のワーカーでの書き込みは変更フィード
+    # （複数ワーカーでは EVENTS_BACKEND=unix）で無効化する。変更フィードがワーカー間で届かない
+    # 構成（uvicorn --workers など）では他のワーカーの書き込み後も TTL の間は古い値を返しうるため
+    # 既定では無効。本番ランチャー（app.server）は EVENTS_BACKEND=unix と合わせて有効にする
+    entity_cache_enabled: bool = False
+    entity_cache_maxsize: int = 10000
+    entity_cache_ttl_seconds: float = 30.0
+    # 同時に来た同じ一覧・ID指定GETを1回の実行にまとめる（app/utils/single_flight.py）
+    single_flight_enabled: bool = True
+    # POST の作成を短い時間枠でまとめて1回の複数行 INSERT にする（app/utils/write_batcher.py）。
+    # スループットは上がるが、各リクエストの応答は最大で時間枠の分だけ遅れる
+    write_batching_enabled: bool = False
+    write_batch_window_ms: float = 2.0
+    write_batch_max_size: int = 100
+    # 入口での同時実行数の制限（app/utils/admission.py）。上限はワーカーごと。
+    # 読み取り・書き込みの合計を DB のプール（pool_size + max_overflow）に合わせる
+    admission_control_enabled: bool = True
+    admission_read_limit: int = 20
+    admission_write_limit: int = 10
+    # 猫画像は外部APIを呼ぶだけなので DB の枠とは別に数える
+    admission_cat_images_limit: int = 20
+    # 上限を超えた分を待たせる件数と秒数（プール待ちのタイムアウトより短く）。超えたら 503
+    admission_queue_size: int = 100
+    admission_queue_timeout_seconds: float = 1.0
+    admission_retry_after_seconds: int = 1
+    # クライアント（IP）ごとのレート制限。未設定なら制限しない。超えたら 429
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: float = 20.0
+    # 猫画像URLの先読み（app/services/cat_image.py）
+    cat_image_prefetch_enabled: bool = True
+    cat_image_prefetch_batch_size: int = 10
+    cat_image_prefetch_low_water: int = 5
+    cat_image_prefetch_capacity: int = 50
 
     class Config:
         env_file = ".env"
@@ -1,13 +1,24 @@
 import pytest
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.testclient import TestClient
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any, Dict
 import uuid
+from datetime import datetime, timedelta, timezone
+import contextlib
+import json
+
+import httpx
 
 # Import the generic_router_factory
 # Assuming base_router.py is in backend/fastapi/app/api/v1/
 from app.api.v1.base_router import generic_router_factory
+from app.db.database import get_session_factory
+from app.schemas.bulk import MAX_BULK_SIZE
+from app.utils.broadcast import Broadcaster
+from app.utils.cache import TTLCache
+from app.utils.id_generator import generate_ulid
+from app.utils.pagination import decode_cursor, split_page
 
 # --- Mock Schemas ---
 class MockCreateSchema(BaseModel):
@@ -28,6 +39,7 @@ class MockResponseSchema(BaseModel):
 
 class MockAllResponseSchema(BaseModel):
     items: List[MockResponseSchema]
+    next_cursor: Optional[str] = None
 
 class MockDeleteResponseSchema(BaseModel):
     id: str
@@ -44,19 +56,27 @@ class MockService:
         if self.force_error_on_next_call:
             self.force_error_on_next_call = False
             raise Exception(self.error_message)
-        item_id = str(uuid.uuid4())
+        item_id = generate_ulid()
         new_item = MockResponseSchema(id=item_id, name=obj_in.name, value=obj_in.value)
         self.items[item_id] = new_item
         return new_item
 
-    async def get_multi(self, db: Any, *, skip: int = 0, limit: int = 100) -> MockAllResponseSchema:
+    async def get_multi(self, db: Any, *, cursor: Optional[str] = None, limit: int = 100) -> MockAllResponseSchema:
         if self.force_error_on_next_call:
             self.force_error_on_next_call = False
             raise Exception(self.error_message)
 
-        all_items = list(self.items.values())
-        paginated_items = all_items[skip : skip + limit]
-        return MockAllResponseSchema(items=paginated_items)
+        # Same keyset semantics as the real services: ordered by id, strictly after the cursor
+        all_items = sorted(self.items.values(), key=lambda item: item.id)
+        if cursor:
+            after = decode_cursor(cursor)
+            all_items = [item for item in all_items if item.id > after]
+        paginated_items, next_cursor = split_page(all_items, limit)
+        return MockAllResponseSchema(items=paginated_items, next_cursor=next_cursor)
+
+    async def stream(self, db: Any):
+        for item in sorted(self.items.values(), key=lambda item: item.id):
+            yield item
 
     async def get(self, db: Any, *, id: str) -> Optional[MockResponseSchema]:
         if self.force_error_on_next_call:
@@ -106,11 +126,29 @@ class MockService:
         return item
 
 
+    async def create_multi(self, db: Any, *, objs_in: List[MockCreateSchema]) -> List[MockResponseSchema]:
+        return [await self.create(db, obj_in=obj_in) for obj_in in objs_in]
+
+    async def update_multi(self, db: Any, *, objs_in: List[Any]) -> Dict[str, MockResponseSchema]:
+        updated = {}
+        for item_id, obj_in in objs_in:
+            if item_id in self.items:
+                updated[item_id] = await self.update(db, db_obj=self.items[item_id], obj_in=obj_in)
+        return updated
+
+    async def remove_multi(self, db: Any, *, ids: List[str]) -> set:
+        return {item_id for item_id in ids if self.items.pop(item_id, None) is not None}
+
+
 # --- Test Setup (Fixture) ---
 # Mock DB session dependency
 async def mock_get_db():
     yield None # Or a mock session object if service methods require it
 
+# Streaming responses open their own session from this factory
+def mock_get_session_factory():
+    return contextlib.nullcontext
+
 @pytest.fixture
 def mock_service_instance():
     return MockService()
@@ -121,6 +159,7 @@ def test_app_with_generic_router(mock_service_instance: MockService):
 
     # Override the get_db dependency for the app
     app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.dependency_overrides[get_session_factory] = mock_get_session_factory
 
     test_router_instance = generic_router_factory(
         service=mock_service_instance,
@@ -140,6 +179,7 @@ def test_app_with_generic_router(mock_service_instance: MockService):
 def test_app_with_specific_delete_model(mock_service_instance: MockService):
     app = FastAPI()
     app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.dependency_overrides[get_session_factory] = mock_get_session_factory
 
     # Special mock service method for custom delete response
     async def remove_custom_delete(db: Any, *, id: str) -> MockDeleteResponseSchema:
@@ -172,6 +212,26 @@ def test_app_with_specific_delete_model(mock_service_instance: MockService):
     mock_service_instance.remove = original_remove
 
 
+@pytest.fixture
+def test_app_with_cache(mock_service_instance: MockService):
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    cache = TTLCache(maxsize=100, ttl=60)
+    test_router_instance = generic_router_factory(
+        service=mock_service_instance,
+        tags=["test_entity_cached"],
+        prefix="/test_entity_cached",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        cache=cache,
+    )
+    app.include_router(test_router_instance)
+    app.state.cache = cache
+    return app
+
+
 # --- Test Cases ---
 def test_create_item(test_app_with_generic_router: FastAPI, mock_service_instance: MockService):
     client = TestClient(test_app_with_generic_router)
@@ -202,6 +262,108 @@ def test_get_all_items(test_app_with_generic_router: FastAPI, mock_service_insta
     assert len(data["items"]) >= 1 # Can be more if other tests populated
     assert any(item["id"] == item1.id for item in data["items"])
 
+def test_get_all_items_keyset_pagination(test_app_with_generic_router: FastAPI, mock_service_instance: MockService):
+    client = TestClient(test_app_with_generic_router)
+    for i in range(5):
+        asyncio.run(mock_service_instance.create(db=None, obj_in=MockCreateSchema(name=f"Page Item {i}")))
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/test_entity/", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) <= 2
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(mock_service_instance.items)
+
+def test_get_all_items_invalid_cursor(test_app_with_generic_router: FastAPI):
+    client = TestClient(test_app_with_generic_router)
+    response = client.get("/test_entity/", params={"cursor": "%%%"})
+    assert response.status_code == 400
+
+def test_get_all_items_limit_out_of_range(test_app_with_generic_router: FastAPI):
+    client = TestClient(test_app_with_generic_router)
+    response = client.get("/test_entity/", params={"limit": 0})
+    assert response.status_code == 422
+
+@pytest.mark.parametrize(
+    "params, headers",
+    [({"stream": 1}, {}), ({}, {"Accept": "application/x-ndjson"})],
+)
+def test_get_all_items_ndjson_stream(test_app_with_generic_router: FastAPI, mock_service_instance: MockService, params, headers):
+    client = TestClient(test_app_with_generic_router)
+    for i in range(3):
+        asyncio.run(mock_service_instance.create(db=None, obj_in=MockCreateSchema(name=f"Stream Item {i}", value=i)))
+
+    response = client.get("/test_entity/", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == sorted(mock_service_instance.items)
+
+def test_get_all_items_conditional_get(mock_service_instance: MockService):
+    class VersionedService(MockService):
+        def __init__(self):
+            super().__init__()
+            self.get_multi_calls = 0
+
+        async def get_version(self, db: Any):
+            return len(self.items), max((item.updated_at for item in self.items.values()), default=None)
+
+        async def get_multi(self, db: Any, **kwargs):
+            self.get_multi_calls += 1
+            return await super().get_multi(db, **kwargs)
+
+    class VersionedResponseSchema(MockResponseSchema):
+        updated_at: datetime
+
+    service = VersionedService()
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=service,
+        tags=["versioned"],
+        prefix="/versioned",
+        response_model=VersionedResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+    ))
+    client = TestClient(app)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    service.items["a"] = VersionedResponseSchema(id="a", name="A", updated_at=now)
+
+    first = client.get("/versioned/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"] == "Thu, 01 Jan 2026 00:00:00 GMT"
+
+    second = client.get("/versioned/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert service.get_multi_calls == 1  # rows were not loaded for the 304
+
+    # A different page is a different representation
+    assert client.get("/versioned/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+
+    service.items["b"] = VersionedResponseSchema(id="b", name="B", updated_at=now)
+    assert client.get("/versioned/", headers={"If-None-Match": etag}).status_code == 200
+
+    item = client.get("/versioned/a")
+    assert item.status_code == 200
+    assert client.get("/versioned/a", headers={"If-None-Match": item.headers["etag"]}).status_code == 304
+    assert client.get("/versioned/a", headers={"If-Modified-Since": item.headers["last-modified"]}).status_code == 304
+    service.items["a"] = VersionedResponseSchema(id="a", name="A2", updated_at=now + timedelta(seconds=1))
+    assert client.get("/versioned/a", headers={"If-None-Match": item.headers["etag"]}).status_code == 200
+
 def test_get_all_items_server_error(test_app_with_generic_router: FastAPI, mock_service_instance: MockService):
     client = TestClient(test_app_with_generic_router)
     mock_service_instance.force_error_on_next_call = True
@@ -311,6 +473,410 @@ def test_delete_item(test_app_with_generic_router: FastAPI, mock_service_instanc
     assert data["name"] == "Delete Me"
     assert created_item.id not in mock_service_instance.items
 
+def test_get_item_is_served_from_cache(test_app_with_cache: FastAPI, mock_service_instance: MockService):
+    client = TestClient(test_app_with_cache)
+    created = client.post("/test_entity_cached/", json={"name": "Cached"}).json()
+
+    get_calls = []
+    original_get = mock_service_instance.get
+    async def counting_get(*args, **kwargs):
+        get_calls.append(kwargs.get("id"))
+        return await original_get(*args, **kwargs)
+    mock_service_instance.get = counting_get
+
+    for _ in range(3):
+        response = client.get(f"/test_entity_cached/{created['id']}")
+        assert response.status_code == 200
+        assert response.json()["name"] == "Cached"
+    assert get_calls == []  # primed by create
+    assert test_app_with_cache.state.cache.stats()["hits"] == 3
+    mock_service_instance.get = original_get
+
+def test_cache_is_invalidated_by_update_and_delete(test_app_with_cache: FastAPI, mock_service_instance: MockService):
+    client = TestClient(test_app_with_cache)
+    item_id = client.post("/test_entity_cached/", json={"name": "Before", "value": 1}).json()["id"]
+    cache = test_app_with_cache.state.cache
+
+    client.put(f"/test_entity_cached/{item_id}", json={"value": 2})
+    assert cache.get(item_id) is None
+    assert client.get(f"/test_entity_cached/{item_id}").json()["value"] == 2
+
+    assert client.delete(f"/test_entity_cached/{item_id}").status_code == 200
+    assert cache.get(item_id) is None
+    assert client.get(f"/test_entity_cached/{item_id}").status_code == 404
+
+def test_bulk_create_update_delete(test_app_with_generic_router: FastAPI, mock_service_instance: MockService):
+    client = TestClient(test_app_with_generic_router)
+    response = client.post("/test_entity/bulk", json=[{"name": "Bulk 1"}, {"name": "Bulk 2", "value": 2}])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == [201, 201]
+    assert [r["item"]["name"] for r in results] == ["Bulk 1", "Bulk 2"]
+    ids = [r["id"] for r in results]
+
+    missing_id = str(uuid.uuid4())
+    response = client.patch(
+        "/test_entity/bulk",
+        json=[{"id": ids[0], "value": 10}, {"id": missing_id, "name": "Ghost"}],
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == 200
+    assert results[0]["item"]["value"] == 10
+    assert results[0]["item"]["name"] == "Bulk 1"
+    assert results[1] == {"index": 1, "id": missing_id, "status": 404, "detail": "Item not found for update", "item": None}
+
+    response = client.request("DELETE", "/test_entity/bulk", json={"ids": [ids[1], missing_id]})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == [200, 404]
+    assert ids[1] not in mock_service_instance.items
+
+def test_bulk_rejects_empty_and_oversized_batches(test_app_with_generic_router: FastAPI):
+    client = TestClient(test_app_with_generic_router)
+    assert client.post("/test_entity/bulk", json=[]).status_code == 422
+    too_many = [{"name": f"Item {i}"} for i in range(MAX_BULK_SIZE + 1)]
+    assert client.post("/test_entity/bulk", json=too_many).status_code == 422
+
+def test_update_and_delete_use_fused_service_methods(mock_service_instance: MockService):
+    class FusedService(MockService):
+        async def update_by_id(self, db: Any, *, id: str, obj_in: MockUpdateSchema):
+            item = self.items.get(id)
+            return None if item is None else await self.update(db, db_obj=item, obj_in=obj_in)
+
+        async def remove_by_id(self, db: Any, *, id: str):
+            return self.items.pop(id, None)
+
+        async def get(self, db: Any, *, id: str):
+            raise AssertionError("fused paths must not pre-fetch the item")
+
+    service = FusedService()
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=service,
+        tags=["fused"],
+        prefix="/fused",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+    ))
+    client = TestClient(app)
+    item_id = client.post("/fused/", json={"name": "Fused"}).json()["id"]
+
+    response = client.put(f"/fused/{item_id}", json={"value": 7})
+    assert response.status_code == 200
+    assert response.json()["value"] == 7
+    assert client.put(f"/fused/{uuid.uuid4()}", json={"value": 1}).status_code == 404
+
+    assert client.delete(f"/fused/{item_id}").status_code == 200
+    assert client.delete(f"/fused/{item_id}").status_code == 404
+
+def test_fast_response_matches_validated_response(mock_service_instance: MockService):
+    def make_client(prefix: str, fast_response: bool) -> TestClient:
+        app = FastAPI()
+        app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+        app.include_router(generic_router_factory(
+            service=mock_service_instance,
+            tags=[prefix],
+            prefix=f"/{prefix}",
+            response_model=MockResponseSchema,
+            create_schema=MockCreateSchema,
+            update_schema=MockUpdateSchema,
+            get_all_response_model=MockAllResponseSchema,
+            fast_response=fast_response,
+        ))
+        return TestClient(app)
+
+    fast, slow = make_client("fast", True), make_client("slow", False)
+    created = fast.post("/fast/", json={"name": "Fast", "value": 1})
+    assert created.status_code == 201
+    assert created.headers["content-type"] == "application/json"
+    slow.post("/slow/", json={"name": "Slow"})
+
+    for path in ["/", f"/{created.json()['id']}"]:
+        fast_response, slow_response = fast.get(f"/fast{path}"), slow.get(f"/slow{path}")
+        assert fast_response.status_code == slow_response.status_code == 200
+        assert fast_response.json() == slow_response.json()
+
+    # Values that are not the declared model still go through response_model validation
+    async def get_as_dict(db: Any, *, id: str):
+        return {"id": id, "name": "Dict", "value": None, "extra": "dropped"}
+
+    mock_service_instance.get = get_as_dict
+    response = fast.get("/fast/some-id")
+    assert response.status_code == 200
+    assert response.json() == {"id": "some-id", "name": "Dict", "value": None}
+
+def test_get_all_items_filter_and_sort_are_passed_to_service(mock_service_instance: MockService):
+    class MockFilter(BaseModel):
+        name: Optional[str] = None
+        value_min: Optional[int] = Field(None, ge=0)
+
+    calls = []
+
+    class FilteringService(MockService):
+        async def get_multi(self, db: Any, *, cursor: Optional[str] = None, limit: int = 100, filters=None, sort=None):
+            calls.append((filters, sort))
+            return MockAllResponseSchema(items=[])
+
+        async def stream(self, db: Any, filters=None):
+            calls.append((filters, "stream"))
+            yield MockResponseSchema(id="a", name="A")
+
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.dependency_overrides[get_session_factory] = mock_get_session_factory
+    app.include_router(generic_router_factory(
+        service=FilteringService(),
+        tags=["filtered"],
+        prefix="/filtered",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        filter_schema=MockFilter,
+        sort_fields=("name", "value"),
+    ))
+    client = TestClient(app)
+
+    assert client.get("/filtered/", params={"name": "A", "value_min": 2, "sort": "-value"}).status_code == 200
+    assert calls[-1] == (MockFilter(name="A", value_min=2), "-value")
+    assert client.get("/filtered/").status_code == 200
+    assert calls[-1] == (MockFilter(), None)
+    assert client.get("/filtered/", params={"name": "A", "stream": 1}).status_code == 200
+    assert calls[-1] == (MockFilter(name="A"), "stream")
+
+    # Unknown sort fields and invalid filter values are rejected before the service is called
+    count = len(calls)
+    assert client.get("/filtered/", params={"sort": "id"}).status_code == 422
+    assert client.get("/filtered/", params={"value_min": -1}).status_code == 422
+    assert len(calls) == count
+
+class SlowService(MockService):
+    """Counts service reads and holds them open long enough to overlap"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_multi(self, db: Any, **kwargs: Any) -> MockAllResponseSchema:
+        self.reads += 1
+        await asyncio.sleep(0.05)
+        return await super().get_multi(db, **kwargs)
+
+    async def get(self, db: Any, *, id: str) -> Optional[MockResponseSchema]:
+        self.reads += 1
+        await asyncio.sleep(0.05)
+        return await super().get(db, id=id)
+
+
+def _concurrent_gets(app: FastAPI, paths: List[str], headers: Optional[dict] = None) -> List[Any]:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(path, headers=headers) for path in paths))
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("coalesce_reads", [True, False])
+def test_identical_concurrent_reads_are_coalesced(coalesce_reads: bool):
+    service = SlowService()
+    item = asyncio.run(service.create(None, obj_in=MockCreateSchema(name="A")))
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=service,
+        tags=["flight"],
+        prefix="/flight",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        coalesce_reads=coalesce_reads,
+    ))
+
+    responses = _concurrent_gets(app, ["/flight/"] * 5 + ["/flight/?limit=1"])
+    assert [response.status_code for response in responses] == [200] * 6
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert service.reads == (2 if coalesce_reads else 6)
+
+    service.reads = 0
+    responses = _concurrent_gets(app, [f"/flight/{item.id}"] * 4 + ["/flight/missing"] * 2)
+    assert [response.status_code for response in responses] == [200] * 4 + [404] * 2
+    assert responses[0].json() == {"id": item.id, "name": "A", "value": None}
+    assert service.reads == (2 if coalesce_reads else 6)
+
+class SnapshotService(MockService):
+    """Reads return the row as of the start of the read; updates replace it"""
+
+    async def get(self, db: Any, *, id: str) -> Optional[MockResponseSchema]:
+        item = self.items[id].model_copy()
+        await asyncio.sleep(0.05)
+        return item
+
+    async def get_multi(self, db: Any, **kwargs: Any) -> MockAllResponseSchema:
+        page = await super().get_multi(db, **kwargs)
+        await asyncio.sleep(0.05)
+        return page
+
+    async def update_by_id(self, db: Any, *, id: str, obj_in: MockUpdateSchema) -> MockResponseSchema:
+        item = self.items[id].model_copy(update=obj_in.model_dump(exclude_unset=True))
+        self.items[id] = item
+        return item
+
+
+def test_read_racing_a_write_does_not_cache_the_old_row():
+    service = SnapshotService()
+    item = asyncio.run(service.create(None, obj_in=MockCreateSchema(name="Before")))
+    cache = TTLCache(maxsize=100, ttl=60)
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=service,
+        tags=["racing"],
+        prefix="/racing",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        cache=cache,
+    ))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            read = asyncio.ensure_future(client.get(f"/racing/{item.id}"))
+            await asyncio.sleep(0.01)  # the read has loaded the row and is still in flight
+            await client.put(f"/racing/{item.id}", json={"name": "After"})
+            await read
+            return await client.get(f"/racing/{item.id}")
+
+    assert asyncio.run(run()).json()["name"] == "After"
+    assert cache.stats()["stale_sets"] == 1
+
+def test_reads_after_a_write_do_not_join_reads_started_before_it():
+    service = SnapshotService()
+    item = asyncio.run(service.create(None, obj_in=MockCreateSchema(name="Before")))
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=service,
+        tags=["coalesced"],
+        prefix="/coalesced",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+    ))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            earlier = asyncio.gather(client.get(f"/coalesced/{item.id}"), client.get("/coalesced/"))
+            await asyncio.sleep(0.01)  # both reads have loaded the old row and are still in flight
+            await client.put(f"/coalesced/{item.id}", json={"name": "After"})
+            later = await asyncio.gather(client.get(f"/coalesced/{item.id}"), client.get("/coalesced/"))
+            return await earlier, later
+
+    (earlier_item, earlier_list), (later_item, later_list) = asyncio.run(run())
+    assert earlier_item.json()["name"] == "Before"
+    assert earlier_list.json()["items"][0]["name"] == "Before"
+    assert later_item.json()["name"] == "After"
+    assert later_list.json()["items"][0]["name"] == "After"
+
+def test_change_events_from_other_workers_invalidate_the_cache(mock_service_instance: MockService):
+    feed = Broadcaster()
+    cache = TTLCache(maxsize=100, ttl=60)
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=mock_service_instance,
+        tags=["shared"],
+        prefix="/shared",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        cache=cache,
+        broadcaster=feed,
+    ))
+    asyncio.run(feed.start())
+    client = TestClient(app)
+    item_id = client.post("/shared/", json={"name": "A"}).json()["id"]
+    assert cache.get(item_id) is not None
+
+    # Another worker updated the row: only its change event reaches this process
+    mock_service_instance.items[item_id] = MockResponseSchema(id=item_id, name="B")
+    feed.publish({"entity": "shared", "op": "updated", "id": item_id, "item": None})
+    assert cache.get(item_id) is None
+    assert client.get(f"/shared/{item_id}").json()["name"] == "B"
+
+def test_writes_publish_change_events(mock_service_instance: MockService):
+    feed = Broadcaster()
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=mock_service_instance,
+        tags=["feed"],
+        prefix="/feed",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        broadcaster=feed,
+    ))
+    client = TestClient(app)
+    subscription = asyncio.run(feed.subscribe())
+
+    item_id = client.post("/feed/", json={"name": "A"}).json()["id"]
+    client.put(f"/feed/{item_id}", json={"value": 2})
+    client.put(f"/feed/{uuid.uuid4()}", json={"value": 2})  # 404: nothing published
+    bulk_ids = [result["id"] for result in client.post("/feed/bulk", json=[{"name": "B"}]).json()["results"]]
+    client.request("DELETE", "/feed/bulk", json={"ids": bulk_ids})
+    client.delete(f"/feed/{item_id}")
+
+    events = []
+    while not subscription.queue.empty():
+        events.append(json.loads(subscription.queue.get_nowait()[1]))
+    assert [(event["op"], event["id"]) for event in events] == [
+        ("created", item_id),
+        ("updated", item_id),
+        ("created", bulk_ids[0]),
+        ("deleted", bulk_ids[0]),
+        ("deleted", item_id),
+    ]
+    assert events[0]["entity"] == "feed"
+    assert events[1]["item"] == {"id": item_id, "name": "A", "value": 2}
+    assert events[-1]["item"] is None
+
+def test_failed_broadcast_does_not_fail_a_committed_write(mock_service_instance: MockService):
+    class FailingBroadcaster(Broadcaster):
+        def publish(self, event):
+            raise OSError(90, "Message too long")
+
+    app = FastAPI()
+    app.dependency_overrides[generic_router_factory.__globals__['get_db']] = mock_get_db
+    app.include_router(generic_router_factory(
+        service=mock_service_instance,
+        tags=["failing_feed"],
+        prefix="/failing_feed",
+        response_model=MockResponseSchema,
+        create_schema=MockCreateSchema,
+        update_schema=MockUpdateSchema,
+        get_all_response_model=MockAllResponseSchema,
+        broadcaster=FailingBroadcaster(),
+    ))
+    client = TestClient(app)
+
+    created = client.post("/failing_feed/", json={"name": "A"})
+    assert created.status_code == 201
+    item_id = created.json()["id"]
+    assert client.put(f"/failing_feed/{item_id}", json={"value": 2}).status_code == 200
+    assert client.delete(f"/failing_feed/{item_id}").status_code == 200
+    assert item_id not in mock_service_instance.items
+
 def test_delete_item_with_custom_response_model(test_app_with_specific_delete_model: FastAPI, mock_service_instance: MockService):
     client = TestClient(test_app_with_specific_delete_model)
     item_data = {"name": "Delete Me Custom"}
@@ -370,7 +936,6 @@ import asyncio
 
 # Further tests could include:
 # - Testing with specific update_response_model.
-# - Testing pagination parameters (skip, limit) for get_all_items if the mock service supported it more granularly.
 # - Testing behavior when `obj_in` for update is partial. (Covered by Pydantic schema exclude_unset=True)
 
 # A small correction: `from_attributes = True` for Pydantic v2, not `orm_mode = True`
@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.utils.admission import (
+    READ,
+    WRITE,
+    AdmissionControlMiddleware,
+    AdmissionLimiter,
+    RateLimiter,
+    route_class,
+)
+
+
+def test_limiter_queues_up_to_the_limit_and_hands_slots_over_in_order():
+    async def scenario():
+        limiter = AdmissionLimiter(limit=1, queue_size=2, queue_timeout=1.0)
+        assert await limiter.acquire()
+        waiters = [asyncio.ensure_future(limiter.acquire()) for _ in range(3)]
+        await asyncio.sleep(0)
+        # 3件目はキューが一杯なので待たずに断られる
+        assert waiters[2].done() and waiters[2].result() is False
+        assert limiter.queued == 2
+        limiter.release()
+        assert await waiters[0] is True
+        assert not waiters[1].done()
+        limiter.release()
+        assert await waiters[1] is True
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.in_use == 0
+    assert limiter.admitted == 3
+    assert limiter.rejected == {"queue_full": 1, "timeout": 0}
+
+
+def test_queued_request_is_rejected_after_the_deadline():
+    async def scenario():
+        limiter = AdmissionLimiter(limit=1, queue_size=10, queue_timeout=0.01)
+        await limiter.acquire()
+        admitted = await limiter.acquire()
+        limiter.release()
+        return limiter, admitted
+
+    limiter, admitted = asyncio.run(scenario())
+    assert admitted is False
+    assert limiter.queued == 0 and limiter.in_use == 0
+    assert limiter.rejected["timeout"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = AdmissionLimiter(limit=1, queue_size=10, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.queued == 0
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.in_use == 0
+
+
+def test_rate_limiter_allows_a_burst_then_refills():
+    limiter = RateLimiter(rate=2.0, burst=2)
+    assert limiter.check("a", now=0.0) == 0
+    assert limiter.check("a", now=0.0) == 0
+    assert limiter.check("a", now=0.0) == 0.5
+    # 他のクライアントは影響を受けない
+    assert limiter.check("b", now=0.0) == 0
+    assert limiter.check("a", now=0.5) == 0
+    assert limiter.limited == 1
+
+
+def test_route_classes():
+    def scope(method, path):
+        return {"type": "http", "method": method, "path": path}
+
+    assert route_class(scope("GET", "/api/v1/cat/")) == READ
+    assert route_class(scope("POST", "/api/v1/cat/")) == WRITE
+    assert route_class(scope("GET", "/api/v1/cat-images/")) == "cat_images"
+    assert route_class(scope("GET", "/api/v1/events")) is None
+    assert route_class(scope("OPTIONS", "/api/v1/cat/")) is None
+    assert route_class(scope("GET", "/metrics")) is None
+
+
+def _app(**kwargs):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/api/v1/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/api/v1/fast")
+    async def fast():
+        return {"ok": True}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionControlMiddleware, retry_after=3, **kwargs)
+    return app, release
+
+
+def test_overloaded_class_is_shed_with_503_and_retry_after():
+    limiters = {READ: AdmissionLimiter(limit=1, queue_size=0)}
+    app, release = _app(limiters=limiters)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/api/v1/slow"))
+            while limiters[READ].in_use == 0:
+                await asyncio.sleep(0)
+            shed = await client.get("/api/v1/fast")
+            # 制限の対象外のパスは混雑中でも通る
+            exempt = await client.get("/metrics")
+            release.set()
+            return await first, shed, exempt
+
+    first, shed, exempt = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "3"
+    assert exempt.status_code == 200
+    assert limiters[READ].in_use == 0
+
+
+def test_client_over_its_rate_gets_429():
+    app, release = _app(limiters={READ: AdmissionLimiter(limit=10)}, rate_limiter=RateLimiter(rate=1.0, burst=2))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get("/api/v1/fast") for _ in range(3)]
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].headers["retry-after"] == "1"
@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1.board import router
+from app.db.database import Base, get_session_factory
+from app.schemas.bot import BotCreate
+from app.schemas.cat import CatCreate, UpdateCatRequest
+from app.services.cat import CatService
+from app.services.chat_bot import ChatBotService
+
+# 集計クエリが直積の警告（SAWarning）を出さないこと
+pytestmark = pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # 2つのセッションから同じデータが見えるようにファイルのSQLiteを使う
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'board.db'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+class CountingSessions:
+    """同時に開いているセッションの最大数を数える"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.open = 0
+        self.peak = 0
+
+    @contextlib.asynccontextmanager
+    async def __call__(self):
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        try:
+            async with self.session_factory() as session:
+                yield session
+        finally:
+            self.open -= 1
+
+
+@pytest.fixture
+def sessions(session_factory):
+    return CountingSessions(session_factory)
+
+
+@pytest.fixture
+def client(sessions):
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.dependency_overrides[get_session_factory] = lambda: sessions
+    return TestClient(app)
+
+
+def run(session_factory, fn):
+    async def runner():
+        async with session_factory() as session:
+            return await fn(session)
+
+    return asyncio.run(runner())
+
+
+def test_board_returns_bots_and_cats_with_validator(client, session_factory, sessions):
+    bot = run(session_factory, lambda db: ChatBotService.create_chat_bot(db, BotCreate(name="Bot", color="red")))
+    cat = run(session_factory, lambda db: CatService.create_cat(db=db, cat_data=CatCreate(name="Tama")))
+
+    response = client.get("/api/v1/board")
+    assert response.status_code == 200
+    board = response.json()
+    assert [item["id"] for item in board["bots"]] == [bot.id]
+    assert [item["id"] for item in board["cats"]] == [cat.id]
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    # 集計用のセッションは読み込み用の2つを開く前に閉じる
+    assert sessions.peak == 2
+
+    assert client.get("/api/v1/board", headers={"If-None-Match": etag}).status_code == 304
+
+    run(session_factory, lambda db: CatService.create_cat(db=db, cat_data=CatCreate(name="Mike")))
+    changed = client.get("/api/v1/board", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert sorted(item["name"] for item in changed.json()["cats"]) == ["Mike", "Tama"]
+
+
+def test_same_second_updates_change_the_board_etag(client, session_factory):
+    cat = run(session_factory, lambda db: CatService.create_cat(db=db, cat_data=CatCreate(name="Tama")))
+    run(session_factory, lambda db: CatService.update_cat(cat.id, UpdateCatRequest(age=1), db))
+    etag = client.get("/api/v1/board").headers["etag"]
+    # 件数も updated_at（秒精度）も変わらない、同じ秒のうちの2回目の更新
+    run(session_factory, lambda db: CatService.update_cat(cat.id, UpdateCatRequest(age=2), db))
+
+    changed = client.get("/api/v1/board", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [item["age"] for item in changed.json()["cats"]] == [2]
+
+
+def test_board_returns_the_first_page_of_each_list(client, session_factory):
+    cats = [
+        run(session_factory, lambda db, name=name: CatService.create_cat(db=db, cat_data=CatCreate(name=name)))
+        for name in ("A", "B", "C")
+    ]
+    run(session_factory, lambda db: ChatBotService.create_chat_bot(db, BotCreate(name="Bot", color="red")))
+
+    board = client.get("/api/v1/board", params={"limit": 2}).json()
+    assert [item["id"] for item in board["cats"]] == [cat.id for cat in cats[:2]]
+    assert board["bots_next_cursor"] is None
+    # 続きは猫の一覧のカーソルとして使える
+    rest = run(session_factory, lambda db: CatService.get_all_cats(db, cursor=board["cats_next_cursor"]))
+    assert [item.id for item in rest.cats] == [cats[2].id]
+
+    assert client.get("/api/v1/board", params={"limit": 0}).status_code == 422
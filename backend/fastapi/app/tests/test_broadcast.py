@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.events import _sse_stream, router
+from app.utils.broadcast import CLOSED, RESYNC, Broadcaster, UnixSocketBackend, broadcaster
+
+
+def drain(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+def test_slow_subscriber_gets_resync_instead_of_blocking_publisher():
+    async def scenario():
+        feed = Broadcaster(queue_size=2)
+        slow = await feed.subscribe()
+        for i in range(3):
+            feed.publish({"op": "created", "id": str(i)})
+        first = drain(slow)
+        feed.publish({"op": "created", "id": "3"})
+        return first, drain(slow), feed
+
+    first, after, feed = asyncio.run(scenario())
+    assert first == [RESYNC]
+    assert [json.loads(message)["id"] for _, message in after] == ["3"]
+    assert "change_feed_events_total{kind=\"resync\"} 1" in feed.metric_lines()
+
+
+def test_reconnect_replays_from_last_event_id():
+    async def scenario():
+        feed = Broadcaster(history_size=3)
+        first = await feed.subscribe()
+        for i in range(5):
+            feed.publish({"id": str(i)})
+        events = drain(first)
+        resumed = await feed.subscribe(last_event_id=events[2][0])
+        too_old = await feed.subscribe(last_event_id=events[0][0])
+        other_process = await feed.subscribe(last_event_id="deadbeef-1")
+        await feed.close()
+        return events, drain(resumed), drain(too_old), drain(other_process)
+
+    events, resumed, too_old, other_process = asyncio.run(scenario())
+    assert resumed == events[3:] + [CLOSED]
+    assert too_old == [RESYNC, CLOSED]
+    assert other_process == [RESYNC, CLOSED]
+
+
+def test_unix_socket_backend_fans_out_across_workers(tmp_path):
+    async def scenario():
+        received = {"a": [], "b": []}
+        workers = []
+        for name in ("a", "b"):
+            backend = UnixSocketBackend(str(tmp_path))
+            # 同じプロセスで2つのワーカーを模すため、ソケット名を分ける
+            backend.directory = tmp_path
+            await backend.start(received[name].append)
+            backend.path.rename(tmp_path / f"{name}.sock")
+            backend.path = tmp_path / f"{name}.sock"
+            workers.append(backend)
+        (tmp_path / "dead.sock").touch()  # 終了したワーカーのソケット
+
+        workers[0].publish('{"id": "1"}')
+        await asyncio.sleep(0.05)
+        for backend in workers:
+            await backend.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == {"a": ['{"id": "1"}'], "b": ['{"id": "1"}']}
+    assert not (tmp_path / "dead.sock").exists()
+
+
+def test_unix_socket_send_errors_are_counted_as_dropped(tmp_path):
+    async def scenario():
+        backend = UnixSocketBackend(str(tmp_path))
+        await backend.start(lambda message: None)
+        try:
+            # 1つのデータグラムに収まらない大きさ（EMSGSIZE）
+            backend.publish("x" * (4 * 1024 * 1024))
+        finally:
+            await backend.stop()
+        return backend
+
+    assert asyncio.run(scenario()).dropped_total == 1
+
+
+def test_sse_stream_format():
+    async def scenario():
+        feed = Broadcaster(queue_size=1)
+        subscription = await feed.subscribe()
+        feed.publish({"entity": "cat", "op": "deleted", "id": "x", "item": None})
+        stream = _sse_stream(subscription)
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        subscription.put(RESYNC)
+        chunks.append(await stream.__anext__())
+        subscription.put(CLOSED)
+        chunks.extend([chunk async for chunk in stream])
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[0] == b"retry: 3000\n\n"
+    assert chunks[1].startswith(b"id: ") and chunks[1].endswith(
+        b'\ndata: {"entity":"cat","op":"deleted","id":"x","item":null}\n\n'
+    )
+    assert chunks[2] == b"event: resync\ndata: {}\n\n"
+    assert len(chunks) == 3
+
+
+def test_websocket_receives_changes():
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    with TestClient(app).websocket_connect("/api/v1/events/ws") as websocket:
+        broadcaster.publish({"entity": "bot", "op": "created", "id": "b1", "item": {"id": "b1"}})
+        message = websocket.receive_json()
+    assert message["type"] == "change"
+    assert message["data"] == {"entity": "bot", "op": "created", "id": "b1", "item": {"id": "b1"}}
@@ -0,0 +1,76 @@
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_invalidate_removes_entry():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+
+
+def test_read_started_before_invalidate_is_not_stored():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation()
+    # 読み込み中に書き込みがあった
+    cache.invalidate("a")
+    cache.set("a", "old", generation=generation)
+    assert cache.get("a") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    # 無効化の後に始めた読み込みは保存する
+    cache.set("a", "new", generation=cache.generation())
+    assert cache.get("a") == "new"
+    # 別のキーの無効化は影響しない
+    generation = cache.generation()
+    cache.invalidate("b")
+    cache.set("c", 3, generation=generation)
+    assert cache.get("c") == 3
+
+
+def test_generation_check_stays_safe_after_records_are_dropped():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation()
+    for key in ("a", "b", "c"):
+        cache.invalidate(key)
+    # "a" の記録は追い出されたが、古い世代の読み込みは保存しない
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
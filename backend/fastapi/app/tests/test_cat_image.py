@@ -1,9 +1,13 @@
+import asyncio
+
+import httpx
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
 from app.main import app
 from app.api.v1.cat_image import get_cat_image_service
-from app.services.cat_image import CatImageService
+from app.services.cat_image import CatImagePrefetcher, CatImageService, create_http_client
 
 client = TestClient(app)
 
@@ -42,3 +46,108 @@ def test_get_cat_image_service_error():
 
     # Clean up
     app.dependency_overrides = {}
+
+
+def make_mock_transport(calls, delay=0.0):
+    """検索APIの代わりに連番のURLを返すローカルのモックトランスポート"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        limit = int(request.url.params.get("limit", 1))
+        start = len(calls) * 100
+        calls.append(limit)
+        await asyncio.sleep(delay)
+        return httpx.Response(
+            200, json=[{"url": f"http://example.com/{start + i}.jpg"} for i in range(limit)]
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def test_prefetcher_serves_from_queue_and_refills_at_low_water():
+    calls = []
+
+    async def scenario():
+        client = create_http_client(make_mock_transport(calls))
+        prefetcher = CatImagePrefetcher(client, batch_size=4, low_water=2, capacity=8)
+        prefetcher.start()
+        await asyncio.sleep(0)  # let the background refill run
+        await asyncio.sleep(0.01)
+        assert len(prefetcher) == 8
+        assert calls == [4, 4]
+
+        urls = [await prefetcher.get() for _ in range(7)]
+        await asyncio.sleep(0.01)
+        await prefetcher.stop()
+        await client.aclose()
+        return urls, len(prefetcher)
+
+    urls, remaining = asyncio.run(scenario())
+    assert len(set(urls)) == 7  # every URL is handed out once
+    # refilled once the queue dropped below low_water, asking only for what fits
+    assert calls == [4, 4, 4, 3]
+    assert remaining == 8  # never above capacity
+
+
+def test_prefetcher_never_holds_more_than_capacity():
+    async def scenario():
+        # The upstream ignores limit and always returns 10 images
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, json=[{"url": f"http://example.com/{i}.jpg"} for i in range(10)])
+        )
+        client = create_http_client(transport)
+        prefetcher = CatImagePrefetcher(client, batch_size=4, low_water=2, capacity=6)
+        prefetcher.start()
+        await asyncio.sleep(0.01)
+        filled = len(prefetcher)
+        await prefetcher.stop()
+        await client.aclose()
+        return filled
+
+    assert asyncio.run(scenario()) == 6
+
+
+def test_request_waits_for_running_refill_instead_of_fetching_again():
+    calls = []
+
+    async def scenario():
+        client = create_http_client(make_mock_transport(calls, delay=0.02))
+        prefetcher = CatImagePrefetcher(client, batch_size=3, low_water=1, capacity=3)
+        prefetcher.start()
+        await asyncio.sleep(0)  # the refill's fetch is now in flight
+        urls = await asyncio.gather(*(prefetcher.get() for _ in range(3)))
+        await prefetcher.stop()
+        await client.aclose()
+        return urls
+
+    urls = asyncio.run(scenario())
+    assert sorted(urls) == [f"http://example.com/{i}.jpg" for i in range(3)]
+    assert calls[0] == 3 and len(calls) <= 2  # no request-path fetch; at most the next refill
+
+
+def test_prefetcher_fetches_on_request_path_when_empty():
+    calls = []
+
+    async def scenario():
+        client = create_http_client(make_mock_transport(calls))
+        prefetcher = CatImagePrefetcher(client, batch_size=3, low_water=0, capacity=3)
+        url = await prefetcher.get()
+        await client.aclose()
+        return url, len(prefetcher)
+
+    url, remaining = asyncio.run(scenario())
+    assert url == "http://example.com/0.jpg"
+    assert remaining == 2
+
+
+def test_prefetcher_maps_upstream_errors_to_503():
+    async def scenario():
+        transport = httpx.MockTransport(lambda request: httpx.Response(500))
+        client = create_http_client(transport)
+        try:
+            await CatImagePrefetcher(client, low_water=0).get()
+        finally:
+            await client.aclose()
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(scenario())
+    assert exc_info.value.status_code == 503
@@ -0,0 +1,364 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1.bot import router as bot_router
+from app.api.v1.cat import router
+from app.db.database import Base, get_db, get_session_factory
+from app.schemas.cat import CatCreate, CatFilter, UpdateCatRequest
+from app.models.cat import Cat
+from app.services.cat import CAT_FILTERS, CatService
+from app.services.cat_stats import CatStatsService
+from app.utils.broadcast import broadcaster
+from app.utils.filtering import apply_filters
+from app.utils.pagination import encode_cursor
+
+
+def run_with_session(fn):
+    """インメモリSQLiteにテーブルを作成し、セッションを渡して fn を実行する"""
+
+    async def runner():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with session_factory() as session:
+                return await fn(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(runner())
+
+
+def test_get_all_cats_keyset_pagination():
+    async def scenario(db):
+        created = [
+            await CatService.create_cat(db=db, cat_data=CatCreate(name=f"Cat {i}"))
+            for i in range(5)
+        ]
+        pages = []
+        cursor = None
+        while True:
+            page = await CatService.get_all_cats(db=db, cursor=cursor, limit=2)
+            pages.append([cat.id for cat in page.cats])
+            cursor = page.next_cursor
+            if cursor is None:
+                return created, pages
+
+    created, pages = run_with_session(scenario)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [cat_id for page in pages for cat_id in page] == sorted(cat.id for cat in created)
+
+
+# 不正な base64、ULID でないID（"ABC"）、並べ替えキー付きのカーソル
+@pytest.mark.parametrize("cursor", ["!!", "QUJD", encode_cursor("01ARZ3NDEKTSV4RRFFQ69G5FAV", 3)])
+def test_get_all_cats_invalid_cursor(cursor):
+    async def scenario(db):
+        await CatService.get_all_cats(db=db, cursor=cursor, limit=2)
+
+    with pytest.raises(ValueError):
+        run_with_session(scenario)
+
+
+def test_get_all_cats_filters():
+    async def scenario(db):
+        for name, breed, age in [("Tama", "mix", 3), ("Tora", "mix", 8), ("Mike", "mix", 5), ("Taro", "persian", 4), ("T%", None, None)]:
+            await CatService.create_cat(db=db, cat_data=CatCreate(name=name, breed=breed, age=age))
+
+        async def names(**filters):
+            page = await CatService.get_all_cats(db=db, limit=10, filters=CatFilter(**filters))
+            return sorted(cat.name for cat in page.cats)
+
+        return (
+            await names(breed="mix", age_min=4),
+            await names(name_prefix="T"),
+            await names(name_prefix="T%"),
+            await names(),
+        )
+
+    mix_over_4, prefixed, escaped, everything = run_with_session(scenario)
+    assert mix_over_4 == ["Mike", "Tora"]
+    assert prefixed == ["T%", "Tama", "Taro", "Tora"]
+    assert escaped == ["T%"]
+    assert len(everything) == 5
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("age", [1, 2, 2, 3, None, None]),
+    ("-age", [3, 2, 2, 1, None, None]),
+])
+def test_get_all_cats_sorted_keyset_pagination(sort, expected):
+    async def scenario(db):
+        for i, age in enumerate([2, None, 3, 1, None, 2]):
+            await CatService.create_cat(db=db, cat_data=CatCreate(name=f"Cat {i}", age=age))
+        pages = []
+        cursor = None
+        while True:
+            page = await CatService.get_all_cats(db=db, cursor=cursor, limit=2, sort=sort)
+            pages.append(page.cats)
+            cursor = page.next_cursor
+            if cursor is None:
+                return pages
+
+    pages = run_with_session(scenario)
+    cats = [cat for page in pages for cat in page]
+    # 値が同じならID順、NULLは昇順・降順とも最後。ページをまたいでも重複・欠落しない
+    assert [cat.age for cat in cats] == expected
+    assert len({cat.id for cat in cats}) == 6
+    for value in (2, None):
+        ids = [cat.id for cat in cats if cat.age == value]
+        assert ids == sorted(ids)
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at"])
+def test_get_all_cats_sorted_by_timestamp_pages_through_ties(sort):
+    async def scenario(db):
+        # 同じ秒に作られた行（server_default の値が等しい）もID順に1回ずつ返る
+        created = [
+            await CatService.create_cat(db=db, cat_data=CatCreate(name=f"Cat {i}"))
+            for i in range(5)
+        ]
+        ids = []
+        cursor = None
+        for _ in range(len(created) + 1):
+            page = await CatService.get_all_cats(db=db, cursor=cursor, limit=2, sort=sort)
+            ids += [cat.id for cat in page.cats]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        return created, ids
+
+    created, ids = run_with_session(scenario)
+    assert sorted(ids) == sorted(cat.id for cat in created)
+
+
+def test_get_all_cats_invalid_sort():
+    async def scenario(db):
+        await CatService.get_all_cats(db=db, limit=2, sort="id")
+
+    with pytest.raises(ValueError):
+        run_with_session(scenario)
+
+
+def test_cat_filters_use_indexes():
+    async def scenario(db):
+        stmt = apply_filters(select(Cat), CatFilter(breed="mix", age_min=3), CAT_FILTERS)
+        compiled = stmt.compile(db.bind, compile_kwargs={"literal_binds": True})
+        result = await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return " ".join(row[-1] for row in result)
+
+    plan = run_with_session(scenario)
+    assert "USING INDEX ix_cats_breed_age" in plan
+
+
+def test_stream_cats_yields_every_row_in_id_order():
+    async def scenario(db):
+        created = [
+            await CatService.create_cat(db=db, cat_data=CatCreate(name=f"Cat {i}"))
+            for i in range(7)
+        ]
+        streamed = [cat.id async for cat in CatService.stream_cats(db=db, batch_size=3)]
+        return created, streamed
+
+    created, streamed = run_with_session(scenario)
+    assert streamed == sorted(cat.id for cat in created)
+
+
+def test_bulk_create_update_delete_cats():
+    async def scenario(db):
+        created = await CatService.create_cats(
+            db=db,
+            cats_data=[CatCreate(name="Tama", breed="Mix"), CatCreate(name="Mike", age=2)],
+        )
+        updated = await CatService.update_cats(
+            db=db,
+            updates=[
+                (created[0].id, UpdateCatRequest(age=5)),
+                ("01H000000000000000000000XX", UpdateCatRequest(age=1)),
+            ],
+        )
+        deleted = await CatService.delete_cats(
+            db=db, cat_ids=[created[1].id, "01H000000000000000000000XX"]
+        )
+        remaining = await CatService.get_all_cats(db=db)
+        return created, updated, deleted, remaining
+
+    created, updated, deleted, remaining = run_with_session(scenario)
+    assert [cat.name for cat in created] == ["Tama", "Mike"]
+    assert all(cat.id and cat.created_at for cat in created)
+    assert set(updated) == {created[0].id}
+    assert updated[created[0].id].age == 5
+    assert updated[created[0].id].breed == "Mix"
+    assert deleted == {created[1].id}
+    assert [cat.id for cat in remaining.cats] == [created[0].id]
+
+
+@pytest.mark.parametrize("returning", [True, False], ids=["returning", "emulated"])
+def test_update_and_delete_cat_single_statement(monkeypatch, returning):
+    async def scenario(db):
+        dialect = db.get_bind().dialect
+        monkeypatch.setattr(dialect, "update_returning", returning)
+        monkeypatch.setattr(dialect, "delete_returning", returning)
+
+        cat = await CatService.create_cat(db=db, cat_data=CatCreate(name="Tama", age=1))
+        updated = await CatService.update_cat(cat_id=cat.id, update_data=UpdateCatRequest(age=2), db=db)
+        unchanged = await CatService.update_cat(cat_id=cat.id, update_data=UpdateCatRequest(), db=db)
+        with pytest.raises(ValueError):
+            await CatService.update_cat(cat_id="missing", update_data=UpdateCatRequest(age=3), db=db)
+
+        deleted = await CatService.delete_cat(cat_id=cat.id, db=db)
+        with pytest.raises(ValueError):
+            await CatService.delete_cat(cat_id=cat.id, db=db)
+        return cat, updated, unchanged, deleted
+
+    cat, updated, unchanged, deleted = run_with_session(scenario)
+    assert (updated.id, updated.name, updated.age) == (cat.id, "Tama", 2)
+    assert unchanged.age == 2
+    assert deleted.id == cat.id
+
+
+def test_get_cats_version_tracks_count_and_last_update():
+    async def scenario(db):
+        empty = await CatService.get_cats_version(db=db)
+        cat = await CatService.create_cat(db=db, cat_data=CatCreate(name="Tama"))
+        created = await CatService.get_cats_version(db=db)
+        await CatService.update_cat(cat.id, UpdateCatRequest(age=1), db=db)
+        updated = await CatService.get_cats_version(db=db)
+        return cat, empty, created, updated
+
+    cat, empty, created, updated = run_with_session(scenario)
+    assert empty == ((0, 0, None), None)
+    assert created[0] == (1, 1, cat.id)
+    assert created[1] is not None
+    # updated_at may not move within the same second; the version sum always does
+    assert updated[0] == (1, 2, cat.id)
+
+
+@pytest.fixture
+def client(tmp_path):
+    """猫とボットの実際のルーターを、ファイルのSQLiteにつないで動かす"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    asyncio.run(create_tables())
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.include_router(bot_router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    yield TestClient(app)
+    asyncio.run(engine.dispose())
+
+
+def test_same_second_updates_are_not_answered_with_304(client):
+    cat_id = client.post("/api/v1/cat/", json={"name": "Tama"}).json()["id"]
+    client.put(f"/api/v1/cat/{cat_id}", json={"age": 1})
+    item = client.get(f"/api/v1/cat/{cat_id}")
+    listing = client.get("/api/v1/cat/")
+    # A second update well within the same second as the first
+    client.put(f"/api/v1/cat/{cat_id}", json={"age": 2})
+
+    revalidated = client.get(f"/api/v1/cat/{cat_id}", headers={"If-None-Match": item.headers["etag"]})
+    assert revalidated.status_code == 200
+    assert revalidated.json()["age"] == 2
+    assert "version" not in revalidated.json()
+    relisted = client.get("/api/v1/cat/", headers={"If-None-Match": listing.headers["etag"]})
+    assert relisted.status_code == 200
+    assert relisted.json()["cats"][0]["age"] == 2
+    # Nothing changed since: the new validators still produce 304s
+    assert client.get(
+        f"/api/v1/cat/{cat_id}", headers={"If-None-Match": revalidated.headers["etag"]}
+    ).status_code == 304
+    assert client.get("/api/v1/cat/", headers={"If-None-Match": relisted.headers["etag"]}).status_code == 304
+
+
+def test_cursor_that_is_not_a_ulid_is_rejected_instead_of_ending_the_list(client):
+    client.post("/api/v1/cat/", json={"name": "Tama"})
+    response = client.get("/api/v1/cat/", params={"cursor": "QUJD"})
+    assert response.status_code == 400
+
+
+def test_lowercase_ids_reach_the_stored_rows_in_bulk_routes(client):
+    subscription = asyncio.run(broadcaster.subscribe())
+    cat_id = client.post("/api/v1/cat/", json={"name": "Tama"}).json()["id"]
+    bot_id = client.post("/api/v1/bot/", json={"name": "Bot", "color": "red"}).json()["id"]
+
+    patched = client.patch("/api/v1/cat/bulk", json=[{"id": cat_id.lower(), "age": 3}]).json()["results"]
+    assert [(r["id"], r["status"], r["item"]["age"]) for r in patched] == [(cat_id, 200, 3)]
+    patched = client.patch("/api/v1/bot/bulk", json=[{"id": bot_id.lower(), "color": "blue"}]).json()["results"]
+    assert [(r["id"], r["status"], r["item"]["color"]) for r in patched] == [(bot_id, 200, "blue")]
+    assert client.get(f"/api/v1/cat/{cat_id.lower()}").json()["age"] == 3
+
+    deleted = client.request("DELETE", "/api/v1/cat/bulk", json={"ids": [cat_id.lower()]}).json()["results"]
+    assert [(r["id"], r["status"]) for r in deleted] == [(cat_id, 200)]
+    assert client.get(f"/api/v1/cat/{cat_id}").status_code == 404
+
+    events = []
+    while not subscription.queue.empty():
+        events.append(json.loads(subscription.queue.get_nowait()[1]))
+    broadcaster.unsubscribe(subscription)
+    assert [(event["entity"], event["op"], event["id"]) for event in events] == [
+        ("cat", "created", cat_id),
+        ("bot", "created", bot_id),
+        ("cat", "updated", cat_id),
+        ("bot", "updated", bot_id),
+        ("cat", "deleted", cat_id),
+    ]
+
+
+@pytest.mark.parametrize("returning", [True, False], ids=["returning", "emulated"])
+def test_cat_stats_are_maintained_incrementally(monkeypatch, returning):
+    async def scenario(db):
+        dialect = db.get_bind().dialect
+        monkeypatch.setattr(dialect, "update_returning", returning)
+        monkeypatch.setattr(dialect, "delete_returning", returning)
+
+        tama = await CatService.create_cat(db=db, cat_data=CatCreate(name="Tama", breed="mix", age=3, weight=4.0))
+        mike = await CatService.create_cat(db=db, cat_data=CatCreate(name="Mike", breed="mix", age=3))
+        kuro = await CatService.create_cat(db=db, cat_data=CatCreate(name="Kuro", weight=5.0))
+        bulk = await CatService.create_cats(
+            db=db,
+            cats_data=[CatCreate(name="Taro", breed="persian", age=1, weight=3.0), CatCreate(name="Hana", breed="mix")],
+        )
+        await CatService.update_cat(cat_id=mike.id, update_data=UpdateCatRequest(age=4, weight=6.0), db=db)
+        await CatService.update_cat(cat_id=tama.id, update_data=UpdateCatRequest(name="Tama2"), db=db)
+        await CatService.update_cats(
+            db=db, updates=[(kuro.id, UpdateCatRequest(breed="persian")), (bulk[1].id, UpdateCatRequest(name="Hana2"))]
+        )
+        await CatService.delete_cat(cat_id=tama.id, db=db)
+        await CatService.delete_cats(db=db, cat_ids=[bulk[1].id])
+
+        incremental = await CatService.get_cat_stats(db=db)
+        await CatStatsService.rebuild(db)
+        rebuilt = await CatService.get_cat_stats(db=db)
+        return incremental, rebuilt
+
+    incremental, rebuilt = run_with_session(scenario)
+    # 残り: Mike(mix, 4, 6.0) / Kuro(persian, None, 5.0) / Taro(persian, 1, 3.0)
+    assert incremental == rebuilt
+    assert incremental.total == 3
+    assert incremental.average_weight == pytest.approx(14.0 / 3)
+    assert [(b.breed, b.count, b.average_weight) for b in incremental.breeds] == [
+        ("mix", 1, pytest.approx(6.0)),
+        ("persian", 2, pytest.approx(4.0)),
+    ]
+    assert [(a.age, a.count) for a in incremental.age_histogram] == [(1, 1), (4, 1), (None, 1)]
+
+
+def test_cat_stats_are_empty_without_cats():
+    stats = run_with_session(CatService.get_cat_stats)
+    assert (stats.total, stats.average_weight, stats.breeds, stats.age_histogram) == (0, None, [], [])
@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import CompressionMiddleware, choose_encoding
+
+ROWS = [{"id": i, "name": f"Cat {i}"} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return ROWS
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("x" * 5000)
+
+    @app.get("/stream")
+    async def stream():
+        async def rows():
+            for row in ROWS:
+                yield json.dumps(row).encode() + b"\n"
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def raw_get(client, path, accept_encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_large_json_is_compressed(client):
+    response, raw = raw_get(client, "/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert json.loads(gzip.decompress(raw)) == ROWS
+
+
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/large", "identity"),
+    ("/large", "gzip;q=0"),
+    ("/small", "gzip"),
+    ("/text", "gzip"),
+    ("/stream", "gzip"),
+])
+def test_other_responses_are_passed_through(client, path, accept_encoding):
+    response, _ = raw_get(client, path, accept_encoding)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_choose_encoding_prefers_highest_quality():
+    assert choose_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("gzip;q=1, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("*;q=0.2, gzip;q=0", ["gzip"]) is None
+    assert choose_encoding("*", ["br", "gzip"]) == "br"
+    assert choose_encoding(None, ["gzip"]) is None
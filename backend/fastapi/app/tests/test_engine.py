@@ -0,0 +1,20 @@
+import pytest
+
+from app.db.engine import ENGINE_PROFILES, resolve_profile
+from app.settings import Settings
+
+
+def test_resolve_profile_applies_overrides():
+    profile = resolve_profile(Settings(db_engine_profile="server", db_pool_size=50))
+    assert profile.pool_size == 50
+    assert profile.max_overflow == ENGINE_PROFILES["server"].max_overflow
+    assert ENGINE_PROFILES["server"].pool_size != 50  # the shared profile is not mutated
+
+
+def test_lambda_profile_does_not_pool_connections():
+    assert resolve_profile(Settings(db_engine_profile="lambda")).null_pool
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_profile(Settings(db_engine_profile="serverless"))
@@ -0,0 +1,82 @@
+import uuid
+
+import pytest
+import ulid
+from sqlalchemy import Column, MetaData, Table, create_engine, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.types import ULIDType, ensure_binary_ids
+from app.utils import id_generator
+from app.utils.id_generator import MonotonicULIDGenerator, canonical_ulid, ulid_from_bytes, ulid_to_bytes
+
+
+def test_ids_increase_within_the_same_millisecond_and_blocks_are_consecutive():
+    generator = MonotonicULIDGenerator(clock=lambda: 1_700_000_000_000)
+    first = generator.new()
+    block = generator.block(3)
+    ids = [first, *block]
+    assert ids == sorted(ids)
+    values = [ulid.from_str(value).int for value in ids]
+    assert values == list(range(values[0], values[0] + 4))
+    assert generator.block(0) == []
+
+
+def test_ids_stay_monotonic_when_the_clock_goes_back_or_randomness_runs_out():
+    now = [1_700_000_000_000]
+    generator = MonotonicULIDGenerator(clock=lambda: now[0])
+    first = generator.new()
+    now[0] -= 5
+    second = generator.new()
+    assert second > first
+    assert ulid.from_str(second).timestamp().int == 1_700_000_000_000
+
+    # ランダム部を使い切るとミリ秒を進めて続ける
+    generator._last_random = (1 << 80) - 2
+    third, fourth = generator.block(2)
+    assert third < fourth
+    assert second < third
+    assert ulid.from_str(fourth).timestamp().int == 1_700_000_000_001
+
+    assert id_generator.generate_ulids(2)[0] < id_generator.generate_ulid()
+
+
+def test_only_canonical_ulids_convert_to_bytes():
+    value = id_generator.generate_ulid()
+    raw = ulid_to_bytes(value)
+    assert len(raw) == 16
+    assert ulid_from_bytes(raw) == value
+    # 小文字で送られてきたIDも同じ行を指す
+    assert ulid_to_bytes(value.lower()) == raw
+    assert canonical_ulid(value.lower()) == value
+    assert canonical_ulid("missing") == "missing"
+    assert ulid_to_bytes("missing") is None
+    assert ulid_to_bytes(123) is None
+
+
+def test_ulid_type_binds_bytes_on_sqlite_and_uuid_on_postgresql():
+    value = id_generator.generate_ulid()
+    column_type = ULIDType()
+    for dialect, expected in (
+        (sqlite.dialect(), ulid_to_bytes(value)),
+        (postgresql.dialect(), uuid.UUID(bytes=ulid_to_bytes(value))),
+    ):
+        bound = column_type.process_bind_param(value, dialect)
+        assert bound == expected
+        assert column_type.process_result_value(bound, dialect) == value
+        assert column_type.process_bind_param("not-an-id", dialect) is None
+    assert isinstance(column_type.load_dialect_impl(postgresql.dialect()), postgresql.UUID)
+
+
+def test_text_ids_left_by_a_missing_migration_are_read_and_reported():
+    metadata = MetaData()
+    table = Table("legacy", metadata, Column("id", ULIDType(), primary_key=True))
+    engine = create_engine("sqlite://")
+    value = id_generator.generate_ulid()
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+        ensure_binary_ids(conn, metadata)
+        # マイグレーション 006 の前に書かれた行（IDが TEXT のまま）
+        conn.execute(text("INSERT INTO legacy (id) VALUES (:id)"), {"id": value})
+        assert conn.execute(select(table.c.id)).scalar() == value
+        with pytest.raises(RuntimeError, match="legacy.id に文字列のままのIDが 1 件"):
+            ensure_binary_ids(conn, metadata)
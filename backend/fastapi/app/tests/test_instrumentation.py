@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.instrumentation import (
+    QueryTimingMiddleware,
+    install_query_hooks,
+    query_budget,
+    track_queries,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    install_query_hooks(engine)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def make_client(engine, strict: bool) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(QueryTimingMiddleware, strict=strict)
+
+    @app.get("/queries/{n}", dependencies=[Depends(query_budget(2))])
+    async def run_queries(n: int):
+        async with engine.connect() as conn:
+            for i in range(n):
+                await conn.execute(text(f"SELECT {i}"))
+        return {"n": n}
+
+    return TestClient(app)
+
+
+def test_track_queries_counts_statements_run_in_greenlets(engine):
+    async def run():
+        with track_queries() as stats:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats.count == 2
+    assert stats.total_seconds >= stats.slowest_seconds > 0
+    assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+
+
+def test_server_timing_header_reports_query_count(engine):
+    response = make_client(engine, strict=True).get("/queries/2")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def test_strict_mode_fails_when_route_exceeds_budget(engine):
+    # The over-budget response is replaced before any of it is sent
+    response = make_client(engine, strict=True).get("/queries/3")
+    assert response.status_code == 500
+    assert "executed 3 queries (budget 2)" in response.json()["detail"]
+
+
+def test_non_strict_mode_only_warns(engine):
+    assert make_client(engine, strict=False).get("/queries/3").status_code == 200
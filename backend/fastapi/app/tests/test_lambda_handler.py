@@ -0,0 +1,52 @@
+import time
+
+from app import lambda_handler
+from app.utils import logging as app_logging
+from app.utils.logging import logger
+
+
+def make_event(path: str) -> dict:
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost"},
+        "requestContext": {"http": {"method": "GET", "path": path, "sourceIp": "127.0.0.1"}, "stage": "$default"},
+        "isBase64Encoded": False,
+    }
+
+
+def test_handler_is_built_once_and_reused_across_invocations():
+    lambda_handler._handler = None
+    first = lambda_handler.handler(make_event("/metrics"), None)
+    handler = lambda_handler._handler
+    second = lambda_handler.handler(make_event("/metrics"), None)
+
+    assert first["statusCode"] == second["statusCode"] == 200
+    assert "http_requests_total" in second["body"]
+    assert lambda_handler._handler is handler
+
+
+def test_logs_are_written_before_the_invocation_returns(monkeypatch):
+    written = []
+
+    def slow_emit(record):
+        time.sleep(0.05)
+        written.append(record.getMessage())
+
+    def fake_handler(event, context):
+        logger.info("呼び出しました")
+        return {"statusCode": 200}
+
+    monkeypatch.setattr(app_logging.handler, "emit", slow_emit)
+    monkeypatch.setattr(lambda_handler, "_handler", fake_handler)
+    lambda_handler.handler(make_event("/metrics"), None)
+    assert "呼び出しました" in written
+
+
+def test_legacy_main_handler_delegates_to_the_lambda_entrypoint(monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(lambda_handler, "_handler", lambda event, context: {"statusCode": 204})
+    assert main.handler(make_event("/metrics"), None) == {"statusCode": 204}
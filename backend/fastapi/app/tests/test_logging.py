@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from app.utils.logging import (
+    ErrorDeduplicationFilter,
+    HotPathSamplingFilter,
+    JsonFormatter,
+    NonFormattingQueueHandler,
+)
+
+
+def make_record(
+    level: int = logging.ERROR, lineno: int = 10, created: float = 0.0, msg: str = "失敗しました", **extra
+) -> logging.LogRecord:
+    record = logging.LogRecord("app", level, "/app/services/cat.py", lineno, msg, None, None)
+    record.created = created
+    record.__dict__.update(extra)
+    return record
+
+
+def test_identical_errors_are_logged_once_per_window_then_counted():
+    dedup = ErrorDeduplicationFilter(window_seconds=60)
+    assert dedup.filter(make_record(created=0))
+    assert not dedup.filter(make_record(created=1))
+    assert not dedup.filter(make_record(created=2))
+    # 別の箇所からのエラーは別に扱う
+    assert dedup.filter(make_record(created=3, lineno=20))
+
+    record = make_record(created=61)
+    assert dedup.filter(record)
+    assert record.suppressed == 2
+    assert dedup.suppressed_total == 2
+    # INFO 以下は対象外
+    assert all(dedup.filter(make_record(level=logging.INFO, created=62)) for _ in range(3))
+
+
+def test_different_errors_from_the_same_line_are_not_merged():
+    dedup = ErrorDeduplicationFilter(window_seconds=60)
+    assert dedup.filter(make_record(msg="cat 1 が見つかりません"))
+    assert dedup.filter(make_record(msg="cat 2 が見つかりません"))
+    for exc in (ValueError, KeyError):
+        try:
+            raise exc("boom")
+        except exc:
+            assert dedup.filter(make_record(exc_info=sys.exc_info()))
+    assert dedup.suppressed_total == 0
+
+
+def test_errors_differing_only_in_arguments_are_deduplicated():
+    dedup = ErrorDeduplicationFilter(window_seconds=60)
+    records = [make_record(msg="Error updating item %s: %s", created=i) for i in range(3)]
+    for i, record in enumerate(records):
+        record.args = (f"id-{i}", "connection refused")
+    assert [dedup.filter(record) for record in records] == [True, False, False]
+    assert dedup.suppressed_total == 2
+
+
+def test_suppressed_counts_are_reported_when_errors_stop():
+    emitted = []
+    dedup = ErrorDeduplicationFilter(window_seconds=60, emit=emitted.append)
+    assert dedup.filter(make_record(created=0))
+    assert not dedup.filter(make_record(created=1))
+    assert not dedup.filter(make_record(created=2))
+    # 別のエラーが来た時点で、ウィンドウが過ぎた分を報告する
+    assert dedup.filter(make_record(created=70, lineno=20))
+    assert [(r.lineno, r.suppressed) for r in emitted] == [(10, 2)]
+    assert emitted[0].exc_info is None
+
+    # 終了時には、ウィンドウの途中でも報告する
+    assert not dedup.filter(make_record(created=71, lineno=20))
+    dedup.flush()
+    assert [(r.lineno, r.suppressed) for r in emitted] == [(10, 2), (20, 1)]
+    dedup.flush()
+    assert len(emitted) == 2
+
+
+def test_hot_path_info_logs_are_sampled():
+    sampler = HotPathSamplingFilter(sample_rate=0.25)
+    passed = [sampler.filter(make_record(level=logging.INFO, hot_path=True)) for _ in range(8)]
+    assert passed == [True, False, False, False, True, False, False, False]
+    assert sampler.dropped_total == 6
+    assert sampler.filter(make_record(level=logging.INFO))
+    assert sampler.filter(make_record(level=logging.WARNING, hot_path=True))
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=1)
+    handler = NonFormattingQueueHandler(log_queue)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record(exc_info=sys.exc_info())
+    handler.handle(record)
+    handler.handle(make_record())
+
+    queued = log_queue.get_nowait()
+    assert queued is record
+    assert queued.exc_info is not None and queued.exc_text is None
+    assert handler.dropped_total == 1
+
+
+def test_json_formatter_includes_extra_fields_and_traceback():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record(exc_info=sys.exc_info(), suppressed=3, hot_path=True)
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "失敗しました"
+    assert payload["level"] == "ERROR"
+    assert payload["suppressed"] == 3
+    assert "hot_path" not in payload
+    assert "RuntimeError: boom" in payload["exc_info"]
+
+
+def test_shutdown_writes_to_the_current_stderr_without_logging_errors():
+    # pytest と同じく、読み込み時の sys.stderr（キャプチャ）を終了前に閉じて差し戻す
+    script = textwrap.dedent(
+        """
+        import sys
+        import tempfile
+
+        capture = tempfile.TemporaryFile("w+")
+        real, sys.stderr = sys.stderr, capture
+        from app.utils.logging import logger
+        for _ in range(3):
+            logger.error("失敗しました", exc_info=False)
+        sys.stderr = real
+        capture.close()
+        """
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parents[2],
+        env={**os.environ, "LOG_FORMAT": "json"},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0
+    assert "Logging error" not in result.stderr
+    # 抑止した件数は終了時に報告される
+    lines = [json.loads(line) for line in result.stderr.splitlines()]
+    assert [line.get("suppressed") for line in lines] == [None, 2]
@@ -0,0 +1,55 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.utils.metrics import Histogram, MetricsMiddleware, MetricsRegistry
+
+
+def make_client(registry: MetricsRegistry) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        if item_id == "boom":
+            raise RuntimeError("boom")
+        return {"id": item_id}
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert list(histogram.counts) == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.total[0] == pytest.approx(2.65)
+
+
+def test_requests_are_recorded_by_route_template_and_status_class():
+    registry = MetricsRegistry()
+    client = make_client(registry)
+    for item_id in ("a", "b", "missing", "boom"):
+        client.get(f"/items/{item_id}")
+    client.get("/unknown")
+
+    text = registry.render()
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="2xx"} 2' in text
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="4xx"} 1' in text
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="5xx"} 1' in text
+    assert 'http_requests_total{route="unmatched",method="GET",status="4xx"} 1' in text
+    assert 'route="/items/a"' not in text
+    assert (
+        'http_request_duration_seconds_bucket{route="/items/{item_id}",method="GET",status="2xx",le="+Inf"} 2'
+        in text
+    )
+    assert "http_requests_in_flight 0" in text
+
+
+def test_collectors_are_appended_to_output():
+    registry = MetricsRegistry()
+    registry.add_collector(lambda: ["custom_metric 1"])
+    assert registry.render().endswith("custom_metric 1\n")
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.api.v1.cat import router, stats_router
+from app.db import database
+from app.db.database import Base, get_db, get_session_factory
+from app.db.replica import STICKY_COOKIE, ReadYourWritesMiddleware, reads_from_primary
+from app.settings import settings
+
+
+def _factory(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    # プライマリとレプリカを別々のSQLiteファイルにする（レプリケーションしない = 遅延したレプリカ）
+    primary_engine, primary = _factory(tmp_path / "primary.db")
+    replica_engine, replica = _factory(tmp_path / "replica.db")
+    monkeypatch.setattr(settings, "read_database_url", f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "_read_session_factory", replica)
+    yield primary, replica
+    asyncio.run(primary_engine.dispose())
+    asyncio.run(replica_engine.dispose())
+
+
+@pytest.fixture
+def app(databases):
+    primary, _ = databases
+
+    async def override_get_db():
+        async with primary() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(stats_router, prefix="/api/v1")
+    app.include_router(router, prefix="/api/v1")
+    app.add_middleware(ReadYourWritesMiddleware, seconds=30)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: primary
+    return app
+
+
+def test_reads_go_to_the_replica_unless_the_client_just_wrote(app):
+    writer = TestClient(app)
+    created = writer.post("/api/v1/cat/", json={"name": "Tama"})
+    assert created.status_code == 201
+    assert STICKY_COOKIE in created.cookies
+
+    # 書き込んだクライアントは自分の書き込みを読める（プライマリ）
+    assert [cat["name"] for cat in writer.get("/api/v1/cat/").json()["cats"]] == ["Tama"]
+    assert writer.get(f"/api/v1/cat/{created.json()['id']}").status_code == 200
+    assert writer.get("/api/v1/cat/?stream=1").text.count("\n") == 1
+
+    # 他のクライアントはレプリカから読む（まだ反映されていない）
+    reader = TestClient(app)
+    assert reader.get("/api/v1/cat/").json()["cats"] == []
+    assert reader.get("/api/v1/cat/stats").json()["total"] == 0
+    assert STICKY_COOKIE not in reader.get("/api/v1/cat/").cookies
+
+
+def test_failed_writes_do_not_pin_reads_to_the_primary(app):
+    response = TestClient(app).put("/api/v1/cat/01M56HQ1TBE1KRTAKQ1RRZ95E7", json={"age": 1})
+    assert response.status_code == 404
+    assert STICKY_COOKIE not in response.cookies
+
+
+def _request(cookie=None):
+    headers = [(b"cookie", f"{STICKY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_stickiness_expires(databases):
+    assert reads_from_primary(_request("100.0"), now=99.0)
+    assert not reads_from_primary(_request("100.0"), now=101.0)
+    assert not reads_from_primary(_request("garbage"), now=0.0)
+    assert not reads_from_primary(_request(), now=0.0)
+
+
+def test_everything_reads_from_the_primary_without_a_replica(monkeypatch):
+    monkeypatch.setattr(settings, "read_database_url", None)
+    assert reads_from_primary(_request())
@@ -0,0 +1,145 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app import server
+from app.db import database
+from app.utils import logging as app_logging
+
+
+def test_available_cpus_respects_the_cgroup_quota(tmp_path):
+    affinity = len(os.sched_getaffinity(0))
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert server.available_cpus(str(tmp_path)) == min(affinity, 2)
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert server.available_cpus(str(tmp_path)) == affinity
+    assert server.available_cpus(str(tmp_path / "missing")) == affinity
+
+
+def test_server_profile_enables_the_cross_worker_feed_and_entity_cache():
+    # Settings は import 時に読み込まれるので、ランチャーの既定値は別プロセスで確認する
+    env = {k: v for k, v in os.environ.items() if k not in ("EVENTS_BACKEND", "ENTITY_CACHE_ENABLED")}
+    script = "import app.server; from app.settings import settings; print(settings.events_backend, settings.entity_cache_enabled)"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parents[2],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["unix", "True"]
+
+
+def test_respawn_delay_backs_off_exponentially_up_to_a_cap(monkeypatch):
+    monkeypatch.setattr(server, "RESPAWN_DELAY_SECONDS", 1.0)
+    monkeypatch.setattr(server, "MAX_RESPAWN_DELAY_SECONDS", 5.0)
+    assert [server.respawn_delay(failures) for failures in range(6)] == [0.0, 1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_worker_creates_its_own_engine_and_log_listener(monkeypatch):
+    parent_engine = object()
+    monkeypatch.setattr(database, "_engine", parent_engine)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = database._engine is None and app_logging.listener._thread.is_alive()
+        os.write(write_fd, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    os.close(read_fd)
+    # 親のエンジンはそのまま
+    assert database._engine is parent_engine
+
+
+def test_supervisor_restarts_crashed_workers_and_drains_on_sigterm(tmp_path, monkeypatch):
+    starts = tmp_path / "starts"
+    crashed = tmp_path / "crashed"
+
+    def fake_worker(app, sock, args):
+        with open(starts, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        if not crashed.exists():
+            crashed.touch()
+            return 3
+        # SIGTERM（既定の動作）で終了するまで待つ
+        while True:
+            time.sleep(0.05)
+
+    monkeypatch.setattr(server, "_run_worker", fake_worker)
+    monkeypatch.setattr(server, "RESPAWN_DELAY_SECONDS", 0.01)
+    args = argparse.Namespace(workers=2, graceful_timeout=1, host="127.0.0.1", port=0)
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = server.Supervisor(None, None, args).run()
+        finally:
+            os._exit(code)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if starts.exists() and len(starts.read_text().split()) >= 3:
+            break
+        time.sleep(0.05)
+    assert len(starts.read_text().split()) == 3
+
+    os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            break
+        time.sleep(0.05)
+    else:
+        os.kill(pid, signal.SIGKILL)
+        raise AssertionError("supervisor did not stop")
+    assert os.waitstatus_to_exitcode(status) == 0
+    for worker in map(int, starts.read_text().split()):
+        try:
+            os.kill(worker, 0)
+        except ProcessLookupError:
+            continue
+        raise AssertionError(f"worker {worker} is still running")
+
+
+def test_supervisor_gives_up_when_workers_keep_failing_at_startup(tmp_path, monkeypatch):
+    starts = tmp_path / "starts"
+
+    def failing_worker(app, sock, args):
+        with open(starts, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return 1
+
+    monkeypatch.setattr(server, "_run_worker", failing_worker)
+    monkeypatch.setattr(server, "RESPAWN_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(server, "MAX_STARTUP_FAILURES", 3)
+    args = argparse.Namespace(workers=1, graceful_timeout=1, host="127.0.0.1", port=0)
+
+    pid = os.fork()
+    if pid == 0:
+        code = 2
+        try:
+            code = server.Supervisor(None, None, args).run()
+        finally:
+            os._exit(code)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            break
+        time.sleep(0.05)
+    else:
+        os.kill(pid, signal.SIGKILL)
+        raise AssertionError("supervisor kept restarting the worker")
+    assert os.waitstatus_to_exitcode(status) == 1
+    assert len(starts.read_text().split()) == 3
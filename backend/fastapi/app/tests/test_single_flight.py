@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("a", lambda: load("a")) for _ in range(5)), flight.do("b", lambda: load("b")))
+        # 完了後の呼び出しは改めて実行する（結果は保持しない）
+        again = await flight.do("a", lambda: load("a2"))
+        return flight, results, again
+
+    flight, results, again = asyncio.run(scenario())
+    assert results == ["a"] * 5 + ["b"]
+    assert again == "a2"
+    assert calls == ["a", "b", "a2"]
+    assert flight.stats() == {"in_flight": 0, "executions": 3, "coalesced": 4, "coalesce_ratio": 4 / 7}
+
+
+def test_errors_are_shared_and_not_remembered():
+    attempts = 0
+
+    async def failing():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True), flight
+
+    results, flight = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert attempts == 1
+    assert len(flight) == 0
+
+
+def test_follower_takes_over_when_leader_is_cancelled():
+    started = []
+
+    async def load():
+        started.append(len(started))
+        await asyncio.sleep(0.01)
+        return len(started)
+
+    async def scenario():
+        flight = SingleFlight()
+        leader = asyncio.ensure_future(flight.do("k", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == 2
+    assert started == [0, 1]
+
+
+def test_forgotten_calls_are_not_joined():
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario():
+        flight = SingleFlight()
+        before = asyncio.ensure_future(flight.do(("item", "1"), lambda: load("before")))
+        other = asyncio.ensure_future(flight.do(("item", "2"), lambda: load("other")))
+        await asyncio.sleep(0)
+        assert flight.forget(lambda key: key[1] == "1") == 1
+        # 忘れた後の呼び出しは改めて実行し、忘れていないキーには合流する
+        after, joined = await asyncio.gather(
+            flight.do(("item", "1"), lambda: load("after")), flight.do(("item", "2"), lambda: load("unused"))
+        )
+        return await before, await other, after, joined
+
+    assert asyncio.run(scenario()) == ("before", "other", "after", "other")
+    assert calls == ["before", "other", "after"]
@@ -0,0 +1,65 @@
+import gzip
+import re
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.static_assets import IMMUTABLE_CACHE_CONTROL, StaticAssets
+
+
+def make_client(tmp_path):
+    (tmp_path / "app.js").write_text("console.log('kanban');\n" * 50)
+    (tmp_path / "tiny.css").write_text("body{}")
+    (tmp_path / "index.html").write_text(
+        '<link rel="stylesheet" href="/static/tiny.css"><script src="/static/app.js"></script>'
+    )
+    assets = StaticAssets(str(tmp_path))
+    app = FastAPI()
+
+    @app.get("/")
+    async def root(request: Request):
+        return assets.response("index.html", request)
+
+    app.mount("/static", assets)
+    return assets, TestClient(app)
+
+
+def test_html_references_fingerprinted_assets(tmp_path):
+    assets, client = make_client(tmp_path)
+    page = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert page.status_code == 200
+    assert page.headers["cache-control"] == "no-cache"
+    urls = re.findall(r'"(/static/[^"]+)"', page.text)
+    assert urls == [assets.url_for("tiny.css"), assets.url_for("app.js")]
+    assert re.fullmatch(r"/static/app\.[0-9a-f]{12}\.js", assets.url_for("app.js"))
+
+    hashed = client.get(assets.url_for("app.js"), headers={"Accept-Encoding": "identity"})
+    assert hashed.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert hashed.text == (tmp_path / "app.js").read_text()
+    # 元のファイル名でも取得できる（毎回再検証）
+    assert client.get("/static/app.js").headers["cache-control"] == "no-cache"
+    assert client.get("/static/missing.js").status_code == 404
+    assert client.post("/static/app.js").status_code == 405
+
+
+def test_precompressed_variant_is_chosen_by_accept_encoding(tmp_path):
+    assets, client = make_client(tmp_path)
+    url = assets.url_for("app.js")
+    # TestClient が自動で展開しないよう stream で生の本文を読む
+    with client.stream("GET", url, headers={"Accept-Encoding": "gzip;q=0.5, identity;q=0.1"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(raw) == (tmp_path / "app.js").read_bytes()
+
+    identity = client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != response.headers["etag"]
+
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    # 小さいファイルは圧縮版を持たない
+    tiny = client.get(assets.url_for("tiny.css"), headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in tiny.headers
+    assert "vary" not in tiny.headers
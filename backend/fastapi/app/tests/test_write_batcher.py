@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.database import Base
+from app.models.cat_stats import CatStats
+from app.schemas.cat import CatCreate
+from app.services.cat import CatService
+from app.utils.write_batcher import WriteBatcher
+
+
+def test_concurrent_submits_share_one_flush_and_get_their_own_result():
+    batches = []
+
+    async def flush(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        batcher = WriteBatcher(flush, max_size=3, window_seconds=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert results == [0, 10, 20, 30, 40]
+    # 3件で上限に達したら時間枠を待たずに書き込み、残りは時間枠で書き込む
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert batcher.batch_sizes.count == 2
+
+
+def test_flush_runs_outside_the_submitting_request_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+    seen = []
+
+    async def flush(items):
+        seen.append(request_id.get())
+        return items
+
+    batcher = WriteBatcher(flush, max_size=10, window_seconds=0.001)
+
+    async def submit(value):
+        request_id.set(value)
+        return await batcher.submit(value)
+
+    async def scenario():
+        return await asyncio.gather(submit("a"), submit("b"))
+
+    results = asyncio.run(scenario())
+    assert results == ["a", "b"]
+    # 時間枠を開始したリクエスト（"a"）のコンテキストでは実行しない
+    assert seen == [None]
+    assert not batcher._tasks
+
+
+def test_failed_batch_is_retried_row_by_row():
+    calls = []
+
+    async def flush(items):
+        calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad row")
+        return [item.upper() for item in items]
+
+    async def scenario():
+        batcher = WriteBatcher(flush, window_seconds=0.001)
+        results = await asyncio.gather(*(batcher.submit(item) for item in ("a", "bad", "c")), return_exceptions=True)
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], ValueError)
+    assert calls == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    assert batcher.retried_batches == 1
+
+
+def test_batched_cat_creates_use_one_transaction(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create_cats(cats):
+        async with session_factory() as db:
+            return await CatService.create_cats(db=db, cats_data=cats)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        batcher = WriteBatcher(create_cats, window_seconds=0.005)
+        created = await asyncio.gather(
+            *(batcher.submit(CatCreate(name=f"cat{i}", breed="mix")) for i in range(20))
+        )
+        async with session_factory() as db:
+            stats = (await db.scalars(select(CatStats))).all()
+        await engine.dispose()
+        return batcher, created, stats
+
+    batcher, created, stats = asyncio.run(scenario())
+    assert [cat.name for cat in created] == [f"cat{i}" for i in range(20)]
+    assert len({cat.id for cat in created}) == 20
+    assert batcher.batch_sizes.count == 1
+    assert [(row.breed, row.cat_count) for row in stats] == [("mix", 20)]
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        WriteBatcher(lambda items: items, max_size=0)
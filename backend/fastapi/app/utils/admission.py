@@ -0,0 +1,280 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from time import perf_counter
+from typing import Deque, Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.settings import settings
+from app.utils.metrics import Histogram, escape_label, histogram_lines, metric_lines
+
+# キューで待った秒数のバケット
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 同時実行数を制限するリクエストの区分
+READ = "read"
+WRITE = "write"
+CAT_IMAGES = "cat_images"
+
+_READ_METHODS = frozenset({"GET", "HEAD"})
+# 長時間つながったままのストリーム（枠を占有し続ける）は制限しない
+_EXEMPT_PREFIXES = ("/api/v1/events",)
+_CAT_IMAGES_PREFIX = "/api/v1/cat-images"
+
+
+class AdmissionLimiter:
+    """同時実行数の上限と、上限を超えた分の長さ付きキュー
+
+    空きが無ければ先着順に最大 queue_size 件まで待たせ、queue_timeout 秒以内に
+    枠が空かなければ諦めさせる。キューが一杯なら待たせずに即座に断る。
+    DBのプール待ちでタイムアウトするまで途中の処理を進めるより、入口で早く断る方が
+    受け付けたリクエストのレイテンシを保てる。
+    """
+
+    def __init__(self, limit: int, queue_size: int = 100, queue_timeout: float = 1.0) -> None:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        # 結果が True なら枠を受け取った、False なら時間切れ
+        self._waiters: Deque["asyncio.Future[bool]"] = deque()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """枠を取れたら True（release を呼ぶこと）、断る場合は False"""
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            self.admitted += 1
+            self.queue_wait.observe(0.0)
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected["queue_full"] += 1
+            return False
+
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[bool]" = loop.create_future()
+        self._waiters.append(future)
+        timer = loop.call_later(self.queue_timeout, self._expire, future)
+        start = perf_counter()
+        try:
+            granted = await future
+        except asyncio.CancelledError:
+            # クライアントが切断した。直前に枠を渡されていたら次の待ち手に回す
+            timer.cancel()
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+        timer.cancel()
+        if not granted:
+            self.rejected["timeout"] += 1
+            return False
+        self.admitted += 1
+        self.queue_wait.observe(perf_counter() - start)
+        return True
+
+    def _expire(self, future: "asyncio.Future[bool]") -> None:
+        if not future.done():
+            self._waiters.remove(future)
+            future.set_result(False)
+
+    def release(self) -> None:
+        # 待ち手がいれば枠をそのまま渡す（in_use は変わらない）
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.in_use -= 1
+
+
+class TokenBucket:
+    """rate 個/秒で補充され、最大 burst 個まで貯まるトークン"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """1個取れたら 0、取れなければ次の1個が貯まるまでの秒数"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """クライアントごとのトークンバケット（直近に来た max_clients 件分だけ保持する）"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.limited = 0
+
+    def check(self, client: str, now: Optional[float] = None) -> float:
+        """許可なら 0、制限中なら再試行までの秒数"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                # 最も長く来ていないクライアントを忘れる（次に来たら満タンから）
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take(now)
+        if wait:
+            self.limited += 1
+        return wait
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """同時実行数を制限する区分。制限しないリクエスト（API以外・ストリーム・preflight）は None"""
+    path = scope["path"]
+    method = scope["method"]
+    if not path.startswith("/api/") or path.startswith(_EXEMPT_PREFIXES) or method == "OPTIONS":
+        return None
+    if path.startswith(_CAT_IMAGES_PREFIX):
+        return CAT_IMAGES
+    return READ if method in _READ_METHODS else WRITE
+
+
+# 区分ごとのリミッターとクライアントごとのレート制限（統計の収集用）
+admission_limiters: Dict[str, AdmissionLimiter] = {}
+rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def make_admission_limiters() -> Dict[str, AdmissionLimiter]:
+    """設定に従って区分ごとのリミッターを作る"""
+    limits = {
+        READ: settings.admission_read_limit,
+        WRITE: settings.admission_write_limit,
+        CAT_IMAGES: settings.admission_cat_images_limit,
+    }
+    for name, limit in limits.items():
+        admission_limiters[name] = AdmissionLimiter(
+            limit,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+        )
+    return dict(admission_limiters)
+
+
+def make_rate_limiter() -> Optional[RateLimiter]:
+    """設定に従ってクライアントごとのレート制限を作る。rate_limit_per_second が未設定なら None"""
+    if not settings.rate_limit_per_second:
+        return None
+    limiter = RateLimiter(settings.rate_limit_per_second, settings.rate_limit_burst)
+    rate_limiters["client"] = limiter
+    return limiter
+
+
+def _client_key(scope: Scope) -> str:
+    # プロキシ経由では uvicorn の proxy_headers が X-Forwarded-For から client を設定する
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionControlMiddleware:
+    """区分ごとの同時実行数の制限と、クライアントごとのレート制限を行う ASGI ミドルウェア
+
+    レート制限を超えたら 429、枠が空かなければ 503 を Retry-After 付きで返す。
+    枠はレスポンスを送り終えるまで保持する。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Optional[Dict[str, AdmissionLimiter]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_after: Optional[int] = None,
+    ) -> None:
+        self.app = app
+        self.limiters = make_admission_limiters() if limiters is None else limiters
+        self.rate_limiter = rate_limiter
+        self.retry_after = settings.admission_retry_after_seconds if retry_after is None else retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope)
+        limiter = self.limiters.get(name) if name is not None else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.check(_client_key(scope))
+            if wait:
+                await _reject(scope, receive, send, 429, "Too many requests", math.ceil(wait))
+                return
+
+        if not await limiter.acquire():
+            await _reject(scope, receive, send, 503, "Server is busy, retry later", self.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+async def _reject(scope: Scope, receive: Receive, send: Send, status: int, detail: str, retry_after: int) -> None:
+    response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(retry_after)})
+    await response(scope, receive, send)
+
+
+def admission_metric_lines() -> List[str]:
+    """/metrics 用の区分ごとの処理中・待ち・受け付け・拒否の数と、キューで待った時間の分布"""
+    lines = [
+        *metric_lines(
+            "admission_in_flight", "Requests holding an admission slot.",
+            "gauge", "class", {name: limiter.in_use for name, limiter in admission_limiters.items()},
+        ),
+        *metric_lines(
+            "admission_queued", "Requests waiting for an admission slot.",
+            "gauge", "class", {name: limiter.queued for name, limiter in admission_limiters.items()},
+        ),
+        *metric_lines(
+            "admission_admitted_total", "Requests admitted.",
+            "counter", "class", {name: limiter.admitted for name, limiter in admission_limiters.items()},
+        ),
+        "# HELP admission_rejected_total Requests shed with 503 (queue full or queue timeout).",
+        "# TYPE admission_rejected_total counter",
+    ]
+    for name, limiter in admission_limiters.items():
+        for reason, count in limiter.rejected.items():
+            lines.append(f'admission_rejected_total{{class="{escape_label(name)}",reason="{reason}"}} {count}')
+    lines.extend([
+        "# HELP admission_queue_wait_seconds Time spent waiting for an admission slot.",
+        "# TYPE admission_queue_wait_seconds histogram",
+    ])
+    for name, limiter in admission_limiters.items():
+        lines.extend(histogram_lines("admission_queue_wait_seconds", f'class="{escape_label(name)}"', limiter.queue_wait))
+    lines.extend(metric_lines(
+        "rate_limited_total", "Requests rejected with 429 by the per-client rate limit.",
+        "counter", "limiter", {name: limiter.limited for name, limiter in rate_limiters.items()},
+    ))
+    return lines
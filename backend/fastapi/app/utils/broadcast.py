@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import socket
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from app.settings import settings
+from app.utils.logging import logger
+from app.utils.metrics import metric_lines
+from app.utils.serialization import json_bytes
+
+# (イベントID, JSON文字列)
+Event = Tuple[str, str]
+
+# 購読者に渡す制御用の値
+RESYNC = object()  # 取りこぼしがあったので全件を読み直す必要がある
+CLOSED = object()  # サーバーの終了
+
+
+class MemoryBackend:
+    """プロセス内だけで配信するバックエンド（既定）
+
+    外部のメッセージブローカー（Redis の pub/sub、PostgreSQL の LISTEN/NOTIFY 等）と
+    同じ start / publish / stop のインターフェースを持つ。
+    """
+
+    def __init__(self) -> None:
+        self._deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, message: str) -> None:
+        if self._deliver is not None:
+            self._deliver(message)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, deliver: Callable[[str], None]) -> None:
+        self.deliver = deliver
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        self.deliver(data.decode("utf-8"))
+
+
+class UnixSocketBackend:
+    """同じホストのワーカー間で配信するバックエンド（メッセージブローカーの代わり）
+
+    購読者のいるワーカーは directory に <pid>.sock の Unix ドメインソケット
+    （データグラム）を作る。publish は directory 内の全ソケットに送るので、
+    どのワーカーでの変更もすべてのワーカーの購読者に届く。
+    応答しないソケット（終了したワーカー）は削除する。
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        # ソケットはワーカーのプロセスで作る（import 後に fork されても pid がずれない）
+        self.path: Optional[Path] = None
+        self._sender: Optional[socket.socket] = None
+        self._transport: Optional[asyncio.BaseTransport] = None
+        self.dropped_total = 0
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"{os.getpid()}.sock"
+        self.path.unlink(missing_ok=True)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(deliver), local_addr=str(self.path), family=socket.AF_UNIX
+        )
+
+    def publish(self, message: str) -> None:
+        data = message.encode("utf-8")
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        try:
+            peers = list(self.directory.glob("*.sock"))
+        except FileNotFoundError:
+            return
+        for peer in peers:
+            try:
+                self._sender.sendto(data, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                peer.unlink(missing_ok=True)
+            except OSError:
+                # 受信側のバッファが一杯（BlockingIOError）、大きすぎるイベント（EMSGSIZE）、
+                # 送信側のバッファ不足（ENOBUFS）など。そのワーカーの購読者はイベントを取りこぼす
+                self.dropped_total += 1
+
+    async def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class Subscription:
+    """1購読者分の上限付きキュー
+
+    キューが一杯になったら（購読者が遅い）溜まっているイベントを捨てて RESYNC を入れる。
+    配信側は待たされず、購読者は読み直せば整合した状態に戻れる。
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.queue: "asyncio.Queue[Union[Event, object]]" = asyncio.Queue(maxsize)
+        self.resync_total = 0
+
+    def put(self, item: Union[Event, object]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.resync_total += 1
+
+    async def get(self) -> Union[Event, object]:
+        return await self.queue.get()
+
+
+class Broadcaster:
+    """行単位の変更イベントを購読者に配信する
+
+    publish は待たずに戻る（キューへの投入だけ）。イベントIDは「プロセスごとの
+    エポック-連番」で、再接続時の Last-Event-ID が同じプロセスの履歴に残っていれば
+    続きから再送し、そうでなければ RESYNC を返す。
+
+    add_listener で登録した関数には、他のワーカーのものも含めすべてのイベントを
+    dict で渡す（キャッシュの無効化用。受け取るには start しておく）。
+    """
+
+    def __init__(
+        self,
+        backend: Any = None,
+        queue_size: int = 256,
+        history_size: int = 1000,
+    ) -> None:
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.queue_size = queue_size
+        self._epoch = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._history: Deque[Tuple[int, Event]] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._started = False
+        self.published_total = 0
+        self.resync_total = 0
+
+    async def start(self) -> None:
+        if not self._started:
+            self._started = True
+            await self.backend.start(self._deliver)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        self._listeners.append(listener)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """イベント（JSONにできる dict。Pydantic モデルを含んでよい）を送る"""
+        self.published_total += 1
+        self.backend.publish(json_bytes(event).decode("utf-8"))
+
+    def _deliver(self, message: str) -> None:
+        self._sequence += 1
+        event = (f"{self._epoch}-{self._sequence}", message)
+        self._history.append((self._sequence, event))
+        for subscription in list(self._subscribers):
+            subscription.put(event)
+        if self._listeners:
+            payload = json.loads(message)
+            for listener in self._listeners:
+                try:
+                    listener(payload)
+                except Exception as e:
+                    logger.error(f"変更イベントのリスナーでエラーが発生しました: {str(e)}")
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        await self.start()
+        subscription = Subscription(self.queue_size)
+        if last_event_id:
+            for event in self._replay(last_event_id):
+                subscription.put(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def _replay(self, last_event_id: str) -> List[Union[Event, object]]:
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self._epoch or not sequence.isdigit():
+            return [RESYNC]
+        last = int(sequence)
+        if last >= self._sequence:
+            return []
+        if not self._history or self._history[0][0] > last + 1:
+            # 履歴から消えたイベントがある
+            return [RESYNC]
+        return [event for number, event in self._history if number > last]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.discard(subscription)
+            self.resync_total += subscription.resync_total
+
+    async def close(self) -> None:
+        """購読中のストリームを終わらせる（アプリの終了時）"""
+        for subscription in list(self._subscribers):
+            subscription.put(CLOSED)
+        if self._started:
+            self._started = False
+            await self.backend.stop()
+
+    def metric_lines(self) -> List[str]:
+        """/metrics 用の購読者数とイベント数"""
+        resyncs = self.resync_total + sum(s.resync_total for s in self._subscribers)
+        return [
+            *metric_lines(
+                "change_feed_subscribers", "Connected change feed subscribers.", "gauge", "backend",
+                {type(self.backend).__name__: len(self._subscribers)},
+            ),
+            *metric_lines(
+                "change_feed_events_total", "Change feed events published and resyncs sent to slow subscribers.",
+                "counter", "kind", {"published": self.published_total, "resync": resyncs},
+            ),
+        ]
+
+
+def _build_backend() -> Any:
+    if settings.events_backend == "unix":
+        return UnixSocketBackend(settings.events_socket_dir)
+    if settings.events_backend != "memory":
+        logger.warning(f"不明な events_backend です: {settings.events_backend}（memory を使います）")
+    return MemoryBackend()
+
+
+broadcaster = Broadcaster(
+    _build_backend(),
+    queue_size=settings.events_queue_size,
+    history_size=settings.events_history_size,
+)
@@ -0,0 +1,132 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.settings import settings
+from app.utils.metrics import metric_lines
+
+
+class TTLCache:
+    """LRU + TTL のインプロセスキャッシュ
+
+    エントリ数は maxsize で上限を設け、超えた分は最も古く使われたものから追い出す。
+    イベントループ上からのみ使う前提なのでロックは取らない。
+
+    読み込みの前に generation() を取って set に渡すと、読み込み中にそのキーが
+    invalidate されていた場合は保存しない（書き込み前に読んだ古い値で上書きしない）。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, value)。末尾が最近使われたエントリ
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_sets = 0
+        # invalidate のたびに進める世代と、キーごとの最後に invalidate された世代
+        self._generation = 0
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        # 記録を追い出したキーの世代。これより古い世代で読んだ値は保存しない
+        self._generation_floor = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        """読み込みを始める前に取り、set の generation に渡す"""
+        return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if value is None:
+            return
+        if generation is not None and (
+            generation < self._generation_floor or self._invalidated.get(key, -1) > generation
+        ):
+            # 読み込み中に書き込まれた（読んだ値は古いかもしれない）
+            self.stale_sets += 1
+            return
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        self._generation += 1
+        self._invalidated[key] = self._generation
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self.maxsize:
+            _, generation = self._invalidated.popitem(last=False)
+            self._generation_floor = generation
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_sets": self.stale_sets,
+        }
+
+
+# 名前付きで作成したキャッシュ（統計の収集用）
+entity_caches: Dict[str, TTLCache] = {}
+
+
+def make_entity_cache(name: str) -> Optional[TTLCache]:
+    """設定に従ってエンティティキャッシュを作成する。無効化されていれば None"""
+    if not settings.entity_cache_enabled:
+        return None
+    cache = TTLCache(
+        maxsize=settings.entity_cache_maxsize,
+        ttl=settings.entity_cache_ttl_seconds,
+    )
+    entity_caches[name] = cache
+    return cache
+
+
+def entity_cache_metric_lines() -> List[str]:
+    """/metrics 用のエンティティキャッシュ統計"""
+    stats = {name: cache.stats() for name, cache in entity_caches.items()}
+    lines = metric_lines(
+        "entity_cache_size", "Entries held by the entity cache.", "gauge", "cache",
+        {name: s["size"] for name, s in stats.items()},
+    )
+    for key in ("hits", "misses", "evictions", "expirations", "stale_sets"):
+        lines.extend(metric_lines(
+            f"entity_cache_{key}_total", f"Entity cache {key}.", "counter", "cache",
+            {name: s[key] for name, s in stats.items()},
+        ))
+    return lines
@@ -0,0 +1,133 @@
+import gzip
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli は任意。無ければ gzip だけを使う
+    brotli = None
+
+# サーバー側で優先するエンコーディングの順（同じ q 値なら前のものを選ぶ）
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# これより小さい本文は圧縮しない（ヘッダとCPUのコストに見合わない）
+DEFAULT_MINIMUM_SIZE = 1024
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding をエンコーディング -> q 値にする"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available: Iterable[str] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """クライアントが受け付ける中で q 値が最も高いエンコーディングを選ぶ（無ければ None）"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best: Optional[str] = None
+    best_quality = 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """body を指定のエンコーディングで圧縮する（level 省略時は各形式の最大）"""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if level is None else level)
+    if encoding == "gzip":
+        # mtime を固定して同じ入力から同じ出力にする（ETag・ハッシュを安定させる）
+        return gzip.compress(body, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def is_json(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+class CompressionMiddleware:
+    """JSONレスポンスを Accept-Encoding に応じて brotli / gzip で圧縮する
+
+    圧縮するのは本文が1回で送られ、minimum_size 以上で、まだ Content-Encoding が
+    付いていないレスポンスだけ。ストリーミング（NDJSON など）は最初のバイトを
+    遅らせないようにそのまま流す。API向けなので圧縮レベルは速度寄りにする。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # 本文を見るまでヘッダの送信を保留する
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            pending, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=pending)
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not is_json(headers.get("content-type", ""))
+            ):
+                await send(pending)
+                await send(message)
+                return
+
+            body = compress(body, encoding, self.levels[encoding])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            # 圧縮前の本文に対する強いETagは圧縮後の表現には使えない
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(pending)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,43 @@
+from typing import Any, Mapping, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+# フィルタ項目 -> (列, 演算子)
+FilterSpec = Mapping[str, Tuple[Any, str]]
+
+_OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ge": lambda column, value: column >= value,
+    "le": lambda column, value: column <= value,
+    "gt": lambda column, value: column > value,
+    "lt": lambda column, value: column < value,
+    # LIKE 'prefix%'。% と _ はエスケープする
+    "prefix": lambda column, value: column.startswith(value, autoescape=True),
+}
+
+
+def apply_filters(stmt: Select, filters: Optional[BaseModel], spec: FilterSpec) -> Select:
+    """フィルタのスキーマで指定された項目だけを WHERE 句にする"""
+    if filters is None:
+        return stmt
+    for name, value in filters.model_dump(exclude_none=True).items():
+        column, operator = spec[name]
+        stmt = stmt.where(_OPERATORS[operator](column, value))
+    return stmt
+
+
+def sort_options(fields: Sequence[str]) -> Tuple[str, ...]:
+    """並べ替えに指定できる値（"age" は昇順、"-age" は降順）"""
+    return tuple(option for field in fields for option in (field, f"-{field}"))
+
+
+def parse_sort(sort: Optional[str], columns: Mapping[str, Any]) -> Tuple[Any, bool, Optional[str]]:
+    """sort パラメータを (列, 降順か, 列名) にする。未指定ならID順"""
+    if not sort:
+        return None, False, None
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in columns:
+        raise ValueError(f"Unsupported sort field: {name}")
+    return columns[name], descending, name
@@ -1,5 +1,94 @@
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
 import ulid
 
+# ULID の下位80ビット（ランダム部）
+_RANDOM_BITS = 80
+# 新しいミリ秒のランダム部は上位1ビットを0にして、同じミリ秒内で
+# 少なくとも 2**79 個は連番で払い出せる余裕を残す
+_FRESH_RANDOM_BITS = _RANDOM_BITS - 1
+_RANDOM_LIMIT = 1 << _RANDOM_BITS
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class MonotonicULIDGenerator:
+    """単調増加する ULID を払い出す（同じプロセス内で後に作ったIDほど大きい）
+
+    同じミリ秒内ではランダム部を1ずつ増やす。主キーが常にインデックスの末尾に
+    追加されるので、B-tree のページ分割が起きにくい。時計が戻ったときや、
+    ランダム部を使い切ったときは前回のミリ秒を進めて続ける。
+    """
+
+    def __init__(self, clock: Callable[[], int] = _now_ms) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def block(self, count: int) -> List[str]:
+        """連続した count 個のIDをまとめて払い出す（一括INSERT用）"""
+        if count <= 0:
+            return []
+        with self._lock:
+            now = self._clock()
+            if now > self._last_ms:
+                start = int.from_bytes(os.urandom(10), "big") >> (_RANDOM_BITS - _FRESH_RANDOM_BITS)
+                self._last_ms = now
+            else:
+                start = self._last_random + 1
+            if start + count > _RANDOM_LIMIT:
+                start = int.from_bytes(os.urandom(10), "big") >> (_RANDOM_BITS - _FRESH_RANDOM_BITS)
+                self._last_ms += 1
+            self._last_random = start + count - 1
+            timestamp = self._last_ms << _RANDOM_BITS
+        return [str(ulid.from_int(timestamp | (start + offset))) for offset in range(count)]
+
+    def new(self) -> str:
+        return self.block(1)[0]
+
+
+_generator = MonotonicULIDGenerator()
+
 
 def generate_ulid() -> str:
-    return str(ulid.new())
+    return _generator.new()
+
+
+def generate_ulids(count: int) -> List[str]:
+    """一括作成用に連続したIDを count 個払い出す"""
+    return _generator.block(count)
+
+
+def ulid_to_bytes(value: str) -> Optional[bytes]:
+    """26文字の ULID を16バイトにする。大文字に直して正規の表記（Crockford Base32）でなければ None"""
+    if not isinstance(value, str):
+        return None
+    value = value.upper()
+    try:
+        parsed = ulid.from_str(value)
+    except ValueError:
+        return None
+    if str(parsed) != value:
+        return None
+    return parsed.bytes
+
+
+def canonical_ulid(value: Any) -> Any:
+    """ULID として読める文字列は正規の表記（大文字）にする。それ以外はそのまま返す
+
+    保存されているIDは大文字なので、リクエストのIDは受け取った時点でこの形にそろえ、
+    結果の突き合わせ・キャッシュ・変更イベントのキーにもこちらを使う。
+    """
+    if isinstance(value, str) and ulid_to_bytes(value) is not None:
+        return value.upper()
+    return value
+
+
+def ulid_from_bytes(value: bytes) -> str:
+    return str(ulid.from_bytes(value))
@@ -1,4 +1,21 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.settings import settings
+from app.utils.metrics import metric_lines
+
+# リクエストごとに出るINFOログに付ける（settings.log_hot_path_sample_rate で間引く）
+HOT_PATH: Dict[str, Any] = {"hot_path": True}
+
+# LogRecord の標準属性（JSON出力で extra の項目と区別する）
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
 
 
 class ExecInfoLogger(logging.Logger):
@@ -11,17 +28,248 @@ class ExecInfoLogger(logging.Logger):
         super().exception(msg, *args, **kwargs)
 
 
+# 抑止した件数の報告漏れを探す間隔（秒）
+_DEDUP_SWEEP_INTERVAL = 1.0
+
+_DedupKey = Tuple[str, int, Optional[str], str]
+
+
+class ErrorDeduplicationFilter(logging.Filter):
+    """同じ箇所から出る同じエラーは window 秒に1回だけ通し、残りは件数だけ数える
+
+    箇所・例外の型・メッセージのテンプレート（引数を埋める前の msg）が同じものを
+    同じエラーとみなす。IDなど呼び出しごとに変わる値は logger.error("... %s", value) の
+    ように引数で渡すと、障害時に同じエラーが1行にまとまる。通したレコードには
+    前回以降に抑止した件数を suppressed として付ける。次が来ないままウィンドウが
+    過ぎた分と、flush を呼んだ時点の分は、最初のレコードを元にした要約レコードを
+    emit に渡して報告する。
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        emit: Optional[Callable[[logging.LogRecord], None]] = None,
+    ) -> None:
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.emit = emit
+        # キー -> [ウィンドウ開始時刻, 抑止した件数, 通したレコード]
+        self._seen: Dict[_DedupKey, List[Any]] = {}
+        self._last_sweep = 0.0
+        self.suppressed_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.pathname, record.lineno, exc_type, str(record.msg))
+        now = record.created
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.window_seconds:
+            entry[1] += 1
+            self.suppressed_total += 1
+            return False
+        if entry is not None and entry[1]:
+            record.suppressed = int(entry[1])
+        self._seen[key] = [now, 0, record]
+        if now - self._last_sweep >= _DEDUP_SWEEP_INTERVAL:
+            self._last_sweep = now
+            self._sweep(now)
+        return True
+
+    def flush(self, now: Optional[float] = None) -> None:
+        """抑止中の件数を報告する。now を渡すとウィンドウが過ぎた分だけ、省略するとすべて"""
+        self._sweep(now)
+
+    def _sweep(self, now: Optional[float]) -> None:
+        # 別スレッドからのログで辞書が変わってもよいようにコピーを回す
+        for key, (started, suppressed, first) in list(self._seen.items()):
+            if now is not None and now - started < self.window_seconds:
+                continue
+            self._seen.pop(key, None)
+            if suppressed and self.emit is not None:
+                self.emit(_summary_record(first, int(suppressed)))
+
+
+def _summary_record(first: logging.LogRecord, suppressed: int) -> logging.LogRecord:
+    # トレースバックは最初のレコードで出しているので付けない
+    summary = logging.makeLogRecord(vars(first))
+    summary.msg = first.getMessage()
+    summary.args = None
+    summary.exc_info = None
+    summary.exc_text = None
+    summary.suppressed = suppressed
+    return summary
+
+
+class HotPathSamplingFilter(logging.Filter):
+    """hot_path を付けた INFO 以下のログを箇所ごとに 1/N 件だけ通す"""
+
+    def __init__(self, sample_rate: float = 0.01) -> None:
+        super().__init__()
+        self.interval = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self.dropped_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "hot_path", False):
+            return True
+        key = (record.pathname, record.lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if self.interval and count % self.interval == 0:
+            if count:
+                record.sampled = self.interval
+            return True
+        self.dropped_total += 1
+        return False
+
+
+class NonFormattingQueueHandler(QueueHandler):
+    """レコードを整形せずにキューへ積む（整形と書き込みはリスナーのスレッドで行う）
+
+    標準の QueueHandler.prepare はイベントループ上でメッセージとトレースバックを
+    整形してしまうため使わない。キューが一杯なら捨てて件数だけ数える。
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped_total = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_total += 1
+
+
+class StderrHandler(logging.StreamHandler):
+    """書き込むたびにその時点の sys.stderr に出す
+
+    作成時の sys.stderr を持ち続けると、差し替えられた後で閉じられたストリーム
+    （テストの出力のキャプチャなど）に終了時の書き出しが向かってしまう。
+    """
+
+    def __init__(self) -> None:
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self) -> Any:  # type: ignore[override]
+        return sys.stderr
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行のJSONにする"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.module}:{record.lineno}",
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "hot_path":
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """従来のテキスト形式。抑止・間引きした件数があれば末尾に付ける"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            text += f" (同じエラーを {suppressed} 件省略しました)"
+        return text
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
 # カスタムロガークラスを登録
 logging.setLoggerClass(ExecInfoLogger)
 
 # ロガーインスタンスを作成
 logger = logging.getLogger("app")
-logger.setLevel(logging.INFO)
-
-# コンソールハンドラを追加
-handler = logging.StreamHandler()
-handler.setLevel(logging.INFO)
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+logger.setLevel(settings.log_level)
+
+# ロガー側（イベントループ上）では絞り込みとキューへの投入だけを行う
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.log_queue_size)
+error_dedup_filter = ErrorDeduplicationFilter(settings.log_error_dedup_seconds)
+hot_path_filter = HotPathSamplingFilter(settings.log_hot_path_sample_rate)
+queue_handler = NonFormattingQueueHandler(_queue)
+queue_handler.addFilter(hot_path_filter)
+queue_handler.addFilter(error_dedup_filter)
+# 抑止した件数の要約はフィルタを通さずにキューへ積む
+error_dedup_filter.emit = queue_handler.enqueue
+logger.addHandler(queue_handler)
+
+# 整形と出力はリスナーのスレッドで行う
+handler = StderrHandler()
+handler.setFormatter(_build_formatter(settings.log_format))
+listener = QueueListener(_queue, handler, respect_handler_level=True)
+listener.start()
+_listener_running = True
+
+
+def stop_listener() -> None:
+    """抑止中の件数を報告し、キューに残ったログを書き出してリスナーを止める（2回目以降は何もしない）"""
+    global _listener_running
+    if not _listener_running:
+        return
+    _listener_running = False
+    error_dedup_filter.flush()
+    listener.stop()
+
+
+# 終了時にキューに残ったログを書き出す
+atexit.register(stop_listener)
+
+
+def flush_logs() -> None:
+    """ウィンドウが過ぎた抑止件数を報告し、キューに積んだログが書き出されるまで待つ
+
+    リスナーは止めない。呼び出しの合間にプロセスが凍結される Lambda で、
+    レスポンスを返す前にログを出し切るために使う。
+    """
+    if not _listener_running:
+        return
+    error_dedup_filter.flush(time.time())
+    _queue.join()
+
+
+def _restart_listener_after_fork() -> None:
+    # fork した子プロセスにはリスナーのスレッドが無く、キューのロックも
+    # 親のスレッドが持ったままかもしれないので、キューとリスナーを作り直す
+    global _queue, listener, _listener_running
+    _queue = queue.Queue(maxsize=settings.log_queue_size)
+    queue_handler.queue = _queue
+    listener = QueueListener(_queue, handler, respect_handler_level=True)
+    listener.start()
+    _listener_running = True
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def logging_metric_lines() -> List[str]:
+    """/metrics 用のログ抑止・破棄の件数"""
+    return metric_lines(
+        "log_records_dropped_total", "Log records not written.", "counter", "reason",
+        {
+            "error_deduplicated": error_dedup_filter.suppressed_total,
+            "hot_path_sampled": hot_path_filter.dropped_total,
+            "queue_full": queue_handler.dropped_total,
+        },
+    )
@@ -0,0 +1,179 @@
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒単位。Prometheus クライアントの既定値と同じ
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+# どのルートにも一致しなかったリクエスト（404）は1系列にまとめる
+UNMATCHED_ROUTE = "unmatched"
+
+Collector = Callable[[], Iterable[str]]
+
+
+class Histogram:
+    """固定バケットのヒストグラム（記録時に確保を行わないよう配列を先に取る）"""
+
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        # 最後の要素は +Inf
+        self.counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        self.total = array("d", [0.0])
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total[0] += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class RouteSeries:
+    """1ルート・1メソッド分のステータス区分ごとのヒストグラム"""
+
+    __slots__ = ("histograms",)
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.histograms = tuple(Histogram(bounds) for _ in STATUS_CLASSES)
+
+    def observe(self, status_code: int, seconds: float) -> None:
+        index = status_code // 100 - 1
+        if not 0 <= index < len(STATUS_CLASSES):
+            index = 4
+        self.histograms[index].observe(seconds)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    """ヒストグラム1系列分の _bucket / _sum / _count 行（labels は整形済みの文字列）"""
+    lines = []
+    cumulative = 0
+    for bound, bucket in zip(histogram.bounds, histogram.counts):
+        cumulative += bucket
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    count = cumulative + histogram.counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total[0]}")
+    lines.append(f"{name}_count{{{labels}}} {count}")
+    return lines
+
+
+class MetricsRegistry:
+    """HTTPメトリクスと、外部から登録された集計関数をまとめて出力する"""
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        # route -> method -> series。系列はルートごとに初回だけ作る
+        self._series: Dict[str, Dict[str, RouteSeries]] = {}
+        self.in_flight = 0
+        self._collectors: List[Collector] = []
+
+    def series(self, route: str, method: str) -> RouteSeries:
+        by_method = self._series.get(route)
+        if by_method is None:
+            by_method = self._series[route] = {}
+        series = by_method.get(method)
+        if series is None:
+            series = by_method[method] = RouteSeries(self.bounds)
+        return series
+
+    def add_collector(self, collector: Collector) -> None:
+        """/metrics の出力に行を追加する関数を登録する"""
+        self._collectors.append(collector)
+
+    def clear(self) -> None:
+        self._series.clear()
+        self.in_flight = 0
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        counts = []
+        for route, by_method in sorted(self._series.items()):
+            for method, series in sorted(by_method.items()):
+                for status, histogram in zip(STATUS_CLASSES, series.histograms):
+                    count = histogram.count
+                    if not count:
+                        continue
+                    labels = f'route="{escape_label(route)}",method="{method}",status="{status}"'
+                    lines.extend(histogram_lines("http_request_duration_seconds", labels, histogram))
+                    counts.append(f"http_requests_total{{{labels}}} {count}")
+        lines.append("# HELP http_requests_total Requests by route template and status class.")
+        lines.append("# TYPE http_requests_total counter")
+        lines.extend(counts)
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def route_label(scope: Scope) -> str:
+    """生のパスではなくルートのテンプレート（/api/v1/cat/{item_id}）を返す"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # StaticFiles などのマウントは route を設定しないので、マウント先のパスを使う
+    if "endpoint" in scope:
+        return scope.get("root_path") or UNMATCHED_ROUTE
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ルートごとのリクエスト数・処理中の数・レイテンシを記録する ASGI ミドルウェア"""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics_registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            registry.in_flight -= 1
+            # ルーティング後の scope からテンプレートを取る
+            registry.series(route_label(scope), scope["method"]).observe(status_code, elapsed)
+
+
+def metric_lines(
+    name: str, help_text: str, kind: str, label: str, samples: Dict[str, float]
+) -> List[str]:
+    """{ラベル値: 値} を Prometheus のテキスト形式の行にする"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f'{name}{{{label}="{escape_label(key)}"}} {value}' for key, value in samples.items())
+    return lines
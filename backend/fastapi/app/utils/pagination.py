@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, and_, or_
+
+from app.utils.id_generator import ulid_to_bytes
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# ストリーミング時にサーバーサイドカーソルから一度に取り出す行数
+STREAM_BATCH_SIZE = 500
+
+
+# 並べ替えキーの値が None（NULL）の場合と区別するための既定値
+_NO_SORT_VALUE = object()
+
+
+def encode_cursor(last_id: str, sort_value: Any = _NO_SORT_VALUE) -> str:
+    """ページ末尾のIDから不透明なカーソル文字列を作る
+
+    ID以外で並べ替えている場合は、末尾行の並べ替えキーの値も渡す。
+    """
+    raw = last_id
+    if sort_value is not _NO_SORT_VALUE:
+        value = sort_value
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([value, last_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_raw(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.b64decode(padded.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not raw:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return raw
+
+
+def decode_cursor(cursor: str) -> str:
+    """カーソル文字列をIDに戻す。不正な値は ValueError
+
+    ULID でない値は ULIDType で NULL としてバインドされ、どの行にも一致しない。
+    一覧の終わり（空のページ）と区別できるように、ここで不正なカーソルとして断る。
+    並べ替えキー付きのカーソル（JSON配列）もID順のページには使えない。
+    """
+    last_id = _decode_raw(cursor)
+    if ulid_to_bytes(last_id) is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_id
+
+
+def decode_sort_cursor(cursor: str) -> Tuple[Any, str]:
+    """並べ替えキー付きのカーソルを (キーの値, ID) に戻す。不正な値は ValueError"""
+    raw = _decode_raw(cursor)
+    try:
+        value, last_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if ulid_to_bytes(last_id) is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return value, last_id
+
+
+def _cursor_value(column: Any, value: Any) -> Any:
+    # カーソルには JSON で持つので、日時は列の型に戻して比較する
+    if value is not None and column.type.python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor value: {value}") from e
+    return value
+
+
+def keyset_page(
+    stmt: Select,
+    id_column: Any,
+    cursor: Optional[str],
+    limit: int,
+    sort_column: Any = None,
+    descending: bool = False,
+) -> Select:
+    """キーセットページングの条件と並び順を付与する
+
+    既定はULID順。sort_column を指定すると (sort_column, id) の順に並べ、
+    NULL は昇順・降順どちらでも末尾に置く。
+    次ページの有無を判定するため limit + 1 行を取得する。
+    """
+    if sort_column is None:
+        if cursor:
+            stmt = stmt.where(id_column > decode_cursor(cursor))
+        return stmt.order_by(id_column).limit(limit + 1)
+
+    if cursor:
+        value, last_id = decode_sort_cursor(cursor)
+        value = _cursor_value(sort_column, value)
+        if value is None:
+            # 末尾の NULL の並びの途中から
+            stmt = stmt.where(sort_column.is_(None), id_column > last_id)
+        else:
+            beyond = sort_column < value if descending else sort_column > value
+            stmt = stmt.where(
+                or_(
+                    beyond,
+                    and_(sort_column == value, id_column > last_id),
+                    sort_column.is_(None),
+                )
+            )
+    order = sort_column.desc() if descending else sort_column.asc()
+    return stmt.order_by(order.nulls_last(), id_column).limit(limit + 1)
+
+
+def split_page(
+    rows: Sequence[Any], limit: int, sort_key: Optional[str] = None
+) -> tuple[Sequence[Any], Optional[str]]:
+    """keyset_page の結果をページ本体と next_cursor に分ける"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if sort_key is None:
+            return rows, encode_cursor(last.id)
+        return rows, encode_cursor(last.id, getattr(last, sort_key))
+    return rows, None
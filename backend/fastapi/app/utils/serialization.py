@@ -0,0 +1,47 @@
+from typing import Any, Mapping, Optional, Type
+
+import pydantic_core
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson は任意依存
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def json_bytes(value: Any) -> bytes:
+    """値をJSONのバイト列にする
+
+    Pydanticモデルは pydantic-core のシリアライザで直接バイト列にし、
+    それ以外は orjson があれば orjson、無ければ pydantic-core を使う。
+    """
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_json(value)
+    if orjson is not None:
+        return orjson.dumps(value, default=pydantic_core.to_jsonable_python)
+    return pydantic_core.to_json(value)
+
+
+def fast_json_response(
+    value: Any,
+    model: Type[BaseModel],
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Optional[Response]:
+    """value が宣言されたレスポンスモデルそのものなら、再検証せずに応答を作る
+
+    サービス層で既に model_validate 済みの値を FastAPI がもう一度
+    dump → validate → encode するのを避ける。型が一致しない場合は None を返し、
+    通常の response_model 処理に任せる。
+    """
+    if type(value) is not model:
+        return None
+    return Response(
+        content=json_bytes(value),
+        status_code=status_code,
+        headers=headers,
+        media_type=JSON_MEDIA_TYPE,
+    )
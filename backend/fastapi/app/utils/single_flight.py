@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from app.utils.metrics import metric_lines
+
+
+class SingleFlight:
+    """同じキーの同時実行を1回にまとめる
+
+    実行中の呼び出しがあれば、後から来た呼び出し（フォロワー）は新しく実行せずに
+    その結果（例外も含む）を待つ。結果は保持しないので、完了後に来た呼び出しは
+    改めて実行する（キャッシュではない）。
+
+    最初の呼び出し（リーダー）がキャンセルされると実行も取り消され、
+    待っていたフォロワーのうち最初のものが改めて実行する。
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            call = self._calls.get(key)
+            if call is None or call.cancelled():
+                self.executions += 1
+                call = asyncio.ensure_future(fn())
+                self._calls[key] = call
+                call.add_done_callback(lambda done, key=key: self._forget(key, done))
+                # リーダーが待つのをやめたら（切断など）実行も取り消す
+                return await call
+
+            self.coalesced += 1
+            try:
+                # フォロワーが待つのをやめても共有の実行は取り消さない
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+                # リーダーが取り消された。まだ誰も実行していなければ自分が実行する
+                self.coalesced -= 1
+
+    def forget(self, matches: Callable[[Hashable], bool]) -> int:
+        """条件に合うキーの実行中の呼び出しを忘れる（取り消しはしない）
+
+        既に待っている呼び出しはその結果を受け取り、以降に来た呼び出しは改めて実行する。
+        書き込みの後の読み取りが、書き込み前に始まった読み取りに合流しないようにする。
+        """
+        keys = [key for key in self._calls if matches(key)]
+        for key in keys:
+            del self._calls[key]
+        return len(keys)
+
+    def _forget(self, key: Hashable, call: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # 待っている呼び出しが無くても "exception was never retrieved" を出さない
+            call.exception()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_ratio": self.coalesced / total if total else 0.0,
+        }
+
+
+# ルートごとの SingleFlight（統計の収集用）
+single_flights: Dict[str, SingleFlight] = {}
+
+
+def make_single_flight(route: str) -> SingleFlight:
+    flight = SingleFlight()
+    single_flights[route] = flight
+    return flight
+
+
+def single_flight_metric_lines() -> List[str]:
+    """/metrics 用のまとめた読み取りの統計（coalesce_ratio = まとめた数 / 呼び出し数）"""
+    stats = {route: flight.stats() for route, flight in single_flights.items()}
+    return [
+        *metric_lines(
+            "single_flight_executions_total", "Read handler executions (one per coalesced group).",
+            "counter", "route", {route: s["executions"] for route, s in stats.items()},
+        ),
+        *metric_lines(
+            "single_flight_coalesced_total", "Reads answered by joining an identical in-flight read.",
+            "counter", "route", {route: s["coalesced"] for route, s in stats.items()},
+        ),
+        *metric_lines(
+            "single_flight_coalesce_ratio", "Share of reads that were coalesced.",
+            "gauge", "route", {route: s["coalesce_ratio"] for route, s in stats.items()},
+        ),
+    ]
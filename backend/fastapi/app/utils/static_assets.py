@@ -0,0 +1,142 @@
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.utils.compression import SUPPORTED_ENCODINGS, choose_encoding, compress
+from app.utils.http_cache import CACHE_CONTROL, is_not_modified
+
+# ファイル名に内容のハッシュを含むURLは内容が変わらないので、1年間再検証させない
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# これより小さいファイルは圧縮版を作らない
+PRECOMPRESS_MINIMUM_SIZE = 256
+
+_TEXT_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def _content_type(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith(("text/", "application/javascript")):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:12]
+
+
+class StaticAsset:
+    """1ファイル分の本文と圧縮版（エンコーディング -> 本文）"""
+
+    __slots__ = ("content_type", "cache_control", "digest", "variants")
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str) -> None:
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = _fingerprint(body)
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        if len(body) >= PRECOMPRESS_MINIMUM_SIZE and content_type.startswith(_TEXT_TYPES):
+            for encoding in SUPPORTED_ENCODINGS:
+                compressed = compress(body, encoding)
+                # 小さくならない圧縮版は持たない
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+
+    def response(self, request: Request) -> Response:
+        """Accept-Encoding に合う版を返す（If-None-Match が一致すれば 304）"""
+        encodings = [encoding for encoding in self.variants if encoding is not None]
+        encoding = choose_encoding(request.headers.get("accept-encoding"), encodings)
+        # 圧縮版ごとに表現が違うので ETag も分ける
+        etag = f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], headers=headers, media_type=self.content_type)
+
+
+class StaticAssets:
+    """静的ファイルをメモリに載せて配信する ASGI アプリ（/static にマウントする）
+
+    最初に使われたときに directory を読み込み、各ファイルに内容のハッシュを付けた名前
+    （script.js -> script.3f2a9c1b7d4e.js）と gzip / brotli 版を用意する。
+    HTML 中の参照はハッシュ付きのURLに書き換えるので、ブラウザはアセットを
+    immutable でキャッシュし、HTML だけを再検証すればよい。
+    元のファイル名でも配信する（no-cache で毎回再検証）。
+    """
+
+    def __init__(self, directory: str, url_prefix: str = "/static") -> None:
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self._assets: Optional[Dict[str, StaticAsset]] = None
+        # 元の相対パス -> ハッシュ付きURL
+        self.urls: Dict[str, str] = {}
+
+    @property
+    def assets(self) -> Dict[str, StaticAsset]:
+        if self._assets is None:
+            self._assets = self._build()
+        return self._assets
+
+    def _build(self) -> Dict[str, StaticAsset]:
+        assets: Dict[str, StaticAsset] = {}
+        files = sorted(path for path in self.directory.rglob("*") if path.is_file())
+        # HTML は他のファイルのハッシュが決まってから参照を書き換える
+        pages = [path for path in files if path.suffix == ".html"]
+        for path in files:
+            if path in pages:
+                continue
+            name = path.relative_to(self.directory).as_posix()
+            body = path.read_bytes()
+            content_type = _content_type(path)
+            hashed = f"{Path(name).with_suffix('').as_posix()}.{_fingerprint(body)}{path.suffix}"
+            assets[name] = StaticAsset(body, content_type, CACHE_CONTROL)
+            assets[hashed] = StaticAsset(body, content_type, IMMUTABLE_CACHE_CONTROL)
+            self.urls[name] = f"{self.url_prefix}/{hashed}"
+
+        for path in pages:
+            name = path.relative_to(self.directory).as_posix()
+            html = path.read_text(encoding="utf-8")
+            # 長い名前から置き換えて、名前の一部が重なる場合に誤って書き換えない
+            for original in sorted(self.urls, key=len, reverse=True):
+                for quote in ('"', "'"):
+                    html = html.replace(
+                        f"{quote}{self.url_prefix}/{original}{quote}", f"{quote}{self.urls[original]}{quote}"
+                    )
+            assets[name] = StaticAsset(html.encode("utf-8"), _content_type(path), CACHE_CONTROL)
+        return assets
+
+    def url_for(self, name: str) -> str:
+        """テンプレート等から使うハッシュ付きURL"""
+        if self._assets is None:
+            self._assets = self._build()
+        return self.urls.get(name, f"{self.url_prefix}/{name}")
+
+    def response(self, name: str, request: Request) -> Response:
+        asset = self.assets.get(name)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+        return asset.response(request)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response: Response = PlainTextResponse(
+                "Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"}
+            )
+        else:
+            # マウント先では root_path にマウントのパスが入っている
+            path = scope["path"]
+            root_path = scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            response = self.response(path.lstrip("/"), request)
+        await response(scope, receive, send)
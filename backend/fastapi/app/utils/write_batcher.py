@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from app.settings import settings
+from app.utils.logging import logger
+from app.utils.metrics import Histogram, histogram_lines, metric_lines
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+# バッチの行数のバケット
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class WriteBatcher(Generic[ItemT, ResultT]):
+    """短い時間枠に届いた書き込みを1回の複数行 INSERT にまとめる
+
+    最初の1件が届いてから window_seconds 経つか、max_size 件たまった時点で
+    flush（items を受け取り、同じ順序で結果を返す）を1回呼び、各呼び出し元に
+    自分の行を返す。flush が失敗した場合は1件ずつやり直し、失敗した行の
+    呼び出し元にだけ例外を返す（他の行は巻き込まない）。
+
+    flush はどのリクエストのものでもない空のコンテキストで実行する（時間枠を
+    開始したリクエストのクエリ数などに、バッチ全体のクエリを数えない）。
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[ItemT]], Awaitable[List[ResultT]]],
+        max_size: int = 100,
+        window_seconds: float = 0.002,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.flush = flush
+        self.max_size = max_size
+        self.window_seconds = window_seconds
+        self._items: List[ItemT] = []
+        self._futures: List["asyncio.Future[ResultT]"] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 実行中のバッチ（イベントループはタスクを弱参照でしか持たないので、完了まで保持する）
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.retried_batches = 0
+
+    async def submit(self, item: ItemT) -> ResultT:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[ResultT]" = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._start_flush)
+        # 呼び出し元が待つのをやめても、バッチの書き込み自体は取り消さない
+        return await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if items:
+            task = asyncio.get_running_loop().create_task(
+                self._run(items, futures), context=contextvars.Context()
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[ItemT], futures: List["asyncio.Future[ResultT]"]) -> None:
+        self.batch_sizes.observe(len(items))
+        try:
+            results = await self.flush(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"flush returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            if len(items) == 1:
+                _resolve(futures[0], error=e)
+                return
+            # どの行が原因か分からないので1件ずつ書き直す
+            self.retried_batches += 1
+            logger.warning(f"{len(items)}件のバッチ書き込みに失敗したため1件ずつ再実行します: {str(e)}")
+            for item, future in zip(items, futures):
+                try:
+                    (result,) = await self.flush([item])
+                except Exception as item_error:
+                    _resolve(future, error=item_error)
+                else:
+                    _resolve(future, result=result)
+            return
+        for future, result in zip(futures, results):
+            _resolve(future, result=result)
+
+
+def _resolve(future: "asyncio.Future[Any]", result: Any = None, error: Optional[BaseException] = None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+# 名前付きで作成したバッチャー（統計の収集用）
+write_batchers: Dict[str, WriteBatcher] = {}
+
+
+def make_write_batcher(
+    name: str, flush: Callable[[List[Any]], Awaitable[List[Any]]]
+) -> Optional[WriteBatcher]:
+    """設定に従って作成のバッチャーを作る。無効（既定）なら None"""
+    if not settings.write_batching_enabled:
+        return None
+    batcher = WriteBatcher(
+        flush,
+        max_size=settings.write_batch_max_size,
+        window_seconds=settings.write_batch_window_ms / 1000,
+    )
+    write_batchers[name] = batcher
+    return batcher
+
+
+def write_batcher_metric_lines() -> List[str]:
+    """/metrics 用のバッチの行数の分布と、1件ずつ再実行したバッチ数"""
+    lines = [
+        "# HELP write_batch_size Rows per batched INSERT.",
+        "# TYPE write_batch_size histogram",
+    ]
+    for name, batcher in write_batchers.items():
+        lines.extend(histogram_lines("write_batch_size", f'entity="{name}"', batcher.batch_sizes))
+    lines.extend(metric_lines(
+        "write_batch_retries_total", "Batches that failed and were re-run one row at a time.",
+        "counter", "entity", {name: batcher.retried_batches for name, batcher in write_batchers.items()},
+    ))
+    return lines
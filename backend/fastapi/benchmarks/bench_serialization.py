@@ -0,0 +1,77 @@
+"""一覧レスポンスのシリアライズ時間を比較するマイクロベンチマーク
+
+    python -m benchmarks.bench_serialization --items 1000 --rounds 50
+
+FastAPI 既定の経路（response_model で再検証 → jsonable_encoder → json.dumps）と
+app.utils.serialization.json_bytes の直接シリアライズを比べる。
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.schemas.cat import CatAllResponse, CatResponse
+from app.utils.serialization import json_bytes
+
+
+def build_payload(n: int) -> CatAllResponse:
+    now = datetime.now(timezone.utc)
+    return CatAllResponse(
+        cats=[
+            CatResponse(
+                id=f"{i:026d}",
+                name=f"cat-{i}",
+                breed="mixed",
+                age=i % 20,
+                weight=4.2,
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(n)
+        ],
+        next_cursor=None,
+    )
+
+
+def bench(fn, rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = build_payload(args.items)
+    field = create_model_field(name="Response", type_=CatAllResponse, mode="serialization")
+
+    def default_path() -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=payload))
+        return JSONResponse(content).body
+
+    def fast_path() -> bytes:
+        return json_bytes(payload)
+
+    results = {
+        "default": bench(default_path, args.rounds),
+        "fast": bench(fast_path, args.rounds),
+    }
+    for name, seconds in results.items():
+        print(
+            f"{name:>8}: {seconds * 1000:8.2f} ms/response  "
+            f"{seconds / args.items * 1e6:6.2f} us/item"
+        )
+    print(f"speedup: {results['default'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""2つのベンチマーク結果（benchmarks.routes の JSON）をルートごとに比較する
+
+    python -m benchmarks.compare results/base.json results/head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def change(base: float, head: float) -> float:
+    return (head - base) / base * 100 if base else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="exit 1 if p95 gets slower or rps drops by more than this percentage",
+    )
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text())
+    head = json.loads(args.head.read_text())
+    base_results = {result["route"]: result for result in base["results"]}
+
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    print(f"{'route':<28}" + "".join(f"{metric:>18}" for metric in METRICS))
+    regressions = []
+    for result in head["results"]:
+        previous = base_results.get(result["route"])
+        if previous is None:
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = change(previous[metric], result[metric])
+            cells.append(f"{result[metric]:>9.2f} ({delta:+5.1f}%)")
+        print(f"{result['route']:<28}" + "".join(f"{cell:>18}" for cell in cells))
+        if (
+            change(previous["p95_ms"], result["p95_ms"]) > args.threshold
+            or change(previous["rps"], result["rps"]) < -args.threshold
+        ):
+            regressions.append(result["route"])
+    print(
+        f"peak RSS {base['meta']['peak_rss_mb']:.1f}MB -> {head['meta']['peak_rss_mb']:.1f}MB"
+    )
+
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,14 +10,75 @@ class KanbanBoard {
             progress: [],
             done: []
         };
+        // Change events received while a full load is in flight are applied after it
+        this.pendingChanges = null;
+        this.events = null;
         this.init();
     }
 
     init() {
         this.bindEvents();
+        this.connectEvents();
         this.loadData();
     }
 
+    connectEvents() {
+        // Server-pushed row-level changes; EventSource reconnects on its own and
+        // resumes from Last-Event-ID
+        if (!window.EventSource) {
+            return;
+        }
+        this.events = new EventSource('/api/v1/events');
+        this.events.onmessage = (e) => this.handleChange(JSON.parse(e.data));
+        // Sent when this client fell behind and events were dropped
+        this.events.addEventListener('resync', () => this.loadData());
+    }
+
+    isLive() {
+        return this.events !== null && this.events.readyState === EventSource.OPEN;
+    }
+
+    handleChange(change) {
+        if (this.pendingChanges !== null) {
+            this.pendingChanges.push(change);
+            return;
+        }
+        this.applyChange(change);
+        this.renderBoard();
+    }
+
+    applyChange({ entity, op, id, item }) {
+        const key = entity === 'bot' ? 'bots' : 'cats';
+        const list = this.items[key];
+        const index = list.findIndex(existing => existing.id === id);
+        const status = Object.keys(this.columnStates).find(
+            column => this.columnStates[column].some(card => card.id === id && card.type === entity)
+        );
+
+        if (op === 'deleted') {
+            if (index !== -1) list.splice(index, 1);
+            if (status) {
+                this.columnStates[status] = this.columnStates[status].filter(
+                    card => !(card.id === id && card.type === entity)
+                );
+            }
+            return;
+        }
+
+        // created / updated: upsert, so replayed or duplicate events are harmless
+        if (index !== -1) {
+            Object.assign(list[index], item);
+        } else {
+            list.push(item);
+        }
+        if (status) {
+            const card = this.columnStates[status].find(card => card.id === id && card.type === entity);
+            Object.assign(card, item);
+        } else {
+            this.columnStates.todo.push({...item, type: entity});
+        }
+    }
+
     bindEvents() {
         // Add item buttons
         document.getElementById('addBotBtn').addEventListener('click', () => this.showAddModal('bot'));
@@ -44,35 +105,50 @@ class KanbanBoard {
     }
 
     async loadData() {
+        this.pendingChanges = [];
         try {
             this.showLoading();
             
-            // Fetch bots and cats from API
-            const [botsResponse, catsResponse] = await Promise.all([
-                fetch('/api/v1/bot/'),
-                fetch('/api/v1/cat/')
-            ]);
-
-            if (botsResponse.ok) {
-                const botsData = await botsResponse.json();
-                this.items.bots = botsData.bots || [];
+            // Bots and cats in one request; the browser revalidates with the
+            // board's ETag, so an unchanged board comes back as a 304
+            const response = await fetch('/api/v1/board');
+            if (!response.ok) {
+                throw new Error(`Failed to load board: ${response.status}`);
             }
+            const board = await response.json();
 
-            if (catsResponse.ok) {
-                const catsData = await catsResponse.json();
-                this.items.cats = catsData.cats || [];
-            }
+            // The board holds the first page of each list; the rest comes
+            // from the list routes, one keyset page at a time
+            this.items.bots = board.bots.concat(await this.loadRemaining('bot', 'bots', board.bots_next_cursor));
+            this.items.cats = board.cats.concat(await this.loadRemaining('cat', 'cats', board.cats_next_cursor));
 
             this.initializeColumnStates();
+            this.pendingChanges.forEach(change => this.applyChange(change));
+            this.pendingChanges = null;
             this.renderBoard();
             this.hideLoading();
         } catch (error) {
             console.error('Error loading data:', error);
+            this.pendingChanges = null;
             this.showMessage('データの読み込みに失敗しました', 'error');
             this.hideLoading();
         }
     }
 
+    async loadRemaining(itemType, key, cursor) {
+        const items = [];
+        while (cursor) {
+            const response = await fetch(`/api/v1/${itemType}/?cursor=${encodeURIComponent(cursor)}`);
+            if (!response.ok) {
+                throw new Error(`Failed to load ${key}: ${response.status}`);
+            }
+            const page = await response.json();
+            items.push(...page[key]);
+            cursor = page.next_cursor;
+        }
+        return items;
+    }
+
     initializeColumnStates() {
         // Initialize column states with some sample distribution
         this.columnStates = {
@@ -310,7 +386,8 @@ class KanbanBoard {
             if (response.ok) {
                 this.hideModal();
                 this.showMessage(`${itemType === 'bot' ? 'ボット' : '猫'}を追加しました`, 'success');
-                this.loadData();
+                // With the change feed connected the new card arrives as an event
+                if (!this.isLive()) this.loadData();
             } else {
                 throw new Error('Failed to create item');
             }
@@ -332,7 +409,7 @@ class KanbanBoard {
 
             if (response.ok) {
                 this.showMessage('アイテムを削除しました', 'success');
-                this.loadData();
+                if (!this.isLive()) this.loadData();
             } else {
                 throw new Error('Failed to delete item');
             }